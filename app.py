@@ -1,5 +1,5 @@
 from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
 from apscheduler.schedulers.background import BackgroundScheduler
 
 import datetime
@@ -8,6 +8,7 @@ import threading
 import psutil
 import pyautogui
 import base64
+import re
 from io import BytesIO
 
 # --- abrir programas python ---
@@ -16,13 +17,16 @@ import sys
 
 # --- IMPORTS HÍBRIDOS ---
 from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
 from langchain_core.callbacks import BaseCallbackHandler
 from dotenv import load_dotenv
 
 # --- IMPORT DA PACOTES ---
 from skills import automation, organizer
-from brain import model_manager, personas, memory_core
+from brain import model_manager, personas, memory_core, knowledge_router, embedding_provider, context_builder
+from brain import prompt_cache, single_flight, conversation_memory, sessions, generation_jobs, stream_batcher
+from brain import video_relay
+from brain import knowledge_watcher
+from brain.answer_cache import SemanticCache, fingerprint_contexto
 from core.vocal_core import VocalCore
 from data.database import DataManager
 
@@ -33,7 +37,13 @@ load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "argus_secret")
-socketio = SocketIO(app, cors_allowed_origins="*", ping_timeout=600, ping_interval=25)
+# Modo threading de propósito: a geração (loop asyncio do model_manager), o Whisper, o
+# Kokoro e o Chroma bloqueiam em código C e precisam de threads de verdade; com
+# eventlet/gevent eles travariam o hub e, com ele, todas as telas. Cada evento roda na
+# sua thread (async_handlers) e o trabalho longo vai para background tasks.
+# WebSocket de verdade (sem long-polling) precisa do simple-websocket instalado.
+socketio = SocketIO(app, async_mode="threading", async_handlers=True,
+                    cors_allowed_origins="*", ping_timeout=600, ping_interval=25)
 db = DataManager()
 
 # --- INICIALIZAÇÃO DA VOZ ---
@@ -46,9 +56,29 @@ except Exception as e:
 
 # --- MEMÓRIA & CONFIGURAÇÕES ---
 ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-embeddings = OllamaEmbeddings(model="nomic-embed-text", base_url=ollama_host)
+embeddings = embedding_provider.get_embeddings()  # Mesmo provedor do Córtex e do trainer
 DB_DIR = "chroma_db_local"
-user_session = {"active_brain": "strategist", "chat_history": [], "focus_task": None}
+sessoes = sessions.get_sessions()  # Persona, tarefa em foco e conversa de cada tela
+
+semantic_cache = SemanticCache()
+memoria_conversa = conversation_memory.get_memory()  # Últimos turnos + resumo corrido (SQLite)
+
+# Abre o Córtex (RAG) uma vez só, em background, para o 1º turno não travar
+threading.Thread(target=memory_core.get_retriever().aquecer, daemon=True).start()
+# Idem para o Gemini: abre a conexão (TLS) do 1º modelo do roster antes do 1º turno
+threading.Thread(target=model_manager.aquecer_clientes, daemon=True).start()
+
+# Vigia do knowledge_base: documento novo entra no Córtex sozinho (ARGUS_WATCHER=0 desliga)
+watcher = knowledge_watcher.get_watcher(ao_mudar=lambda status: socketio.emit('ingest_status', status))
+if knowledge_watcher.WATCHER_ENABLED:
+    watcher.iniciar()
+
+# Telemetria de geração: cada turno do LLM vai pro SQLite e ao vivo pro dashboard
+def registrar_telemetria(registro):
+    db.registrar_geracao(registro)
+    socketio.emit('generation_telemetry', registro)
+
+model_manager.configurar_telemetria(registrar_telemetria)
 
 # --- SCHEDULER (AUTONOMIA) ---
 scheduler = BackgroundScheduler()
@@ -71,22 +101,34 @@ if not scheduler.running:
 
 
 # --- CONTROLE DE PROCESSOS (VISION) ---
+# Câmera, microfone e alto-falante são da máquina do Argus: valem para todas as sessões
 vision_process = None
 voice_active = True    # Começa falando
 mic_active = True      # Começa ouvindo
 notion_brain = NotionManager() # O Argus já nasce conectado
 
 
+# --- AGRUPADOR DO 'ai_stream': tokens saem em frames (janela curta / buffer cheio) com seq ---
+batcher = stream_batcher.get_batcher(lambda evento, dados, destino: socketio.emit(evento, dados, to=destino))
+
+def abrir_canal(destino, job):
+    return batcher.abrir(destino, job.id if job else None, job.sessao if job else None)
+
 # --- CLASSE DE STREAMING (VISUAL + ÁUDIO) ---
 class VoiceSocketCallback(BaseCallbackHandler):
-    def __init__(self, brain_name):
+    def __init__(self, brain_name, destino=None, job=None):
         self.brain_name = brain_name
+        self.destino = destino  # sid do cliente (None = todos)
+        self.job = job          # Job cancelado/substituído = token atrasado, descarta
+        self.canal = abrir_canal(destino, job)
         self.text_buffer = ""
         # Debug: Avisa que iniciou
         print(f"🎤 [VOICE DEBUG] Callback iniciado para o cérebro: {brain_name}")
         
     def on_llm_new_token(self, token: str, **kwargs) -> None:
-        socketio.emit('ai_stream', {'chunk': token})
+        if self.job and not self.job.aceitar(token):
+            return
+        self.canal.enviar(token)
         
         # --- SÓ FALA SE O BOTÃO ESTIVER LIGADO ---
         global voice_active
@@ -99,6 +141,8 @@ class VoiceSocketCallback(BaseCallbackHandler):
                 # --- FILTRO ANTI-GARGALO ---
                 if len(texto_limpo) > 15 or '\n' in token:
                     voice_id = vocal.get_voice_for_brain(self.brain_name)
+                    if self.job:
+                        self.job.falou = True
                     try:
                         vocal._generate_and_queue(self.text_buffer, voice_id)
                     except Exception as e:
@@ -107,12 +151,73 @@ class VoiceSocketCallback(BaseCallbackHandler):
         else:
             pass
 
+def replay_resposta(texto, callback):
+    """Reenvia uma resposta do cache pelo mesmo caminho dos tokens do LLM (chat + voz)."""
+    for token in re.findall(r"\S+\s*|\s+", texto):
+        callback.on_llm_new_token(token)
+
 # --- CLASSE DE STREAMING SILENCIOSA (SÓ TEXTO) ---
 # Usada para textos longos (Planos, Códigos) para não travar a geração
 class SilentSocketCallback(BaseCallbackHandler):
+    def __init__(self, destino=None, job=None):
+        self.destino = destino  # sid do cliente (None = todos)
+        self.job = job
+        self.canal = abrir_canal(destino, job)
+
     def on_llm_new_token(self, token: str, **kwargs) -> None:
         # Só manda pro site, não chama o vocal_core
-        socketio.emit('ai_stream', {'chunk': token})
+        if self.job and not self.job.aceitar(token):
+            return
+        self.canal.enviar(token)
+
+
+# --- SINGLE-FLIGHT: PEDIDO REPETIDO PEGA CARONA NA GERAÇÃO EM ANDAMENTO ---
+voos = single_flight.get_single_flight()
+
+# --- JOBS: MENSAGEM NOVA SUBSTITUI A RESPOSTA EM ANDAMENTO DA MESMA SESSÃO ---
+def calar_job(job):
+    """Job parado que já estava falando: corta a voz (fila do Kokoro + áudio tocando)."""
+    if vocal and job.falou:
+        vocal.stop()
+
+jobs = generation_jobs.get_jobs(ao_cancelar=calar_job)
+
+def pegar_carona(voo, destino, job, ao_pousar=None):
+    """
+    Pendura o cliente no voo (com replay do que já saiu). False = o voo já pousou.
+    ao_pousar(resultado) roda no pouso se o job da carona terminou normalmente.
+    """
+    carona = SilentSocketCallback(destino, job)  # Sem voz: o líder já está falando
+    carona.ao_pousar = ao_pousar
+    anexado = voo.anexar(
+        destino, carona,
+        iniciar=lambda: socketio.emit('ai_stream_start', {'job': job.id}, to=destino)
+    )
+    # A carona também segura a geração: o líder ser substituído não corta a resposta dela
+    geracao = getattr(voo, 'geracao', None)
+    if anexado and geracao is not None:
+        jobs.vincular(geracao, job)
+    if anexado:
+        print("🔗 [SINGLE-FLIGHT] Pedido repetido anexado à geração em andamento.")
+    return anexado
+
+def pousar(voo, resultado=None, extra=None):
+    """Conclui o voo e fecha o balão de todo mundo que estava assistindo."""
+    if voo.concluido.is_set():
+        return
+    destinos = voos.concluir(voo, resultado)
+    for assinante in voo.assinantes:
+        if assinante.destino in destinos:
+            if assinante.job:
+                jobs.concluir(assinante.job)
+                ao_pousar = getattr(assinante, 'ao_pousar', None)
+                if ao_pousar and resultado and assinante.job.estado == "concluido" and not (extra or {}).get('cancelado'):
+                    try:
+                        ao_pousar(resultado)
+                    except Exception as e:
+                        print(f"⚠️ [SINGLE-FLIGHT] Falha ao concluir carona: {e}")
+            # Esvazia o buffer do canal antes do fim (o 'ai_stream_end' leva o último seq)
+            assinante.canal.fechar({'full_text': voo.texto(), **(extra or {})})
 
 
 # --- SENTIDOS DO ARGUS ---
@@ -177,8 +282,8 @@ def handle_check_tasks(data):
     altas = [t for t in tarefas if t['priority'] == 'Alta']
     top_task = altas[0] if altas else tarefas[0]
     
-    # SALVA NA SESSÃO
-    user_session["focus_task"] = top_task
+    # SALVA NA SESSÃO (desta tela)
+    sessoes.de(request.sid).focus_task = top_task
     print(f"🎯 [FOCO] Tarefa Prioritária definida: {top_task['title']}")
     # -------------------------------
 
@@ -216,12 +321,8 @@ def handle_voice_toggle(data):
 # --- ROTAS FLASK ---
 @app.route('/')
 def home():
+    # A persona da sessão chega no connect (brain_change); aqui vai a padrão
     brain = personas.get_active_brain()
-    if isinstance(user_session.get("active_brain"), dict):
-        brain = user_session["active_brain"]
-    else:
-        user_session["active_brain"] = brain
-        
     return render_template('index.html', 
                           brain_name=brain["name"], 
                           brain_color=brain["color"])
@@ -243,14 +344,51 @@ def registrar_recompensa():
     return jsonify({"status": "feedback_registrado"})
 
 # --- SOCKET EVENTS ---
+@socketio.on('get_cache_stats')
+def handle_cache_stats(data=None):
+    emit('cache_stats', {
+        **semantic_cache.stats(),
+        'contexto': context_builder.stats(),
+        'prompt': model_manager.prefix_cache.stats(),
+        'single_flight': voos.stats(),
+        'conversa': memoria_conversa.stats(),
+        'sessoes': sessoes.stats(),
+        'stream': batcher.stats(),
+        'video': relay.stats(),
+    })
+
+@socketio.on('get_model_health')
+def handle_model_health(data=None):
+    emit('model_health', {'modelos': model_manager.health.stats(), 'hedge': model_manager.hedge_stats()})
+
+@socketio.on('get_generation_stats')
+def handle_generation_stats(data=None):
+    dias = int((data or {}).get('dias', 7))
+    emit('generation_stats', {'dias': dias, 'modelos': db.rollup_geracao(dias)})
+
+@socketio.on('get_ingest_status')
+def handle_ingest_status(data=None):
+    emit('ingest_status', watcher.status())
+
+def persona_da(sessao):
+    if not isinstance(sessao.active_brain, dict):
+        sessao.active_brain = personas.get_active_brain()
+    return sessao.active_brain
+
 @socketio.on('connect')
-def handle_connect():
-    brain = user_session.get("active_brain")
-    if not isinstance(brain, dict):
-        brain = personas.get_active_brain()
-        user_session["active_brain"] = brain
-        
+def handle_connect(auth=None):
+    sessao = sessoes.conectar(request.sid, (auth or {}).get('cliente'))
+    brain = persona_da(sessao)
+    emit('brain_change', {'name': brain["name"], 'color': brain["color"]})
     emit('status_update', {'msg': f'Conectado. Cérebro: {brain["name"]}', 'color': brain["color"]})
+    # Tela nova com a visão já rodando: liga o painel (e a assinatura do vídeo)
+    emit('vision_status', {'status': 'online' if vision_process else 'offline'})
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    sessoes.desconectar(request.sid)
+    if relay.sair(request.sid):
+        avisar_fonte(False)
 
 @socketio.on('vision_event')
 def handle_vision(data):
@@ -265,47 +403,80 @@ def handle_vision(data):
         
     elif tipo == 'GESTURE_SCREEN':
         print("📸 Iniciando captura de tela via Gesto...")
-        analisar_tela_agora()
-
-@socketio.on('video_stream')
-def handle_video_stream(data):
-    emit('video_stream', data, broadcast=True)
-
-def analisar_tela_agora():
-    """Função auxiliar para tirar print e mandar pro Gemini"""
+        # Fora do handler: a análise leva segundos e não pode segurar os outros clientes
+        sessao = sessoes.de(request.sid)
+        socketio.start_background_task(analisar_tela_agora, sessao, jobs.novo(sessao.cliente, tipo="tela"))
+
+# --- VÍDEO DA VISÃO: binário, só para quem assina, sempre o quadro mais recente ---
+relay = video_relay.get_relay(lambda sid, frame, ack: socketio.emit('video_frame', frame, to=sid, callback=ack))
+
+def avisar_fonte(ativo):
+    socketio.emit('video_demand', {'ativo': ativo}, to=video_relay.SOURCE_ROOM)
+
+@socketio.on('video_source')
+def handle_video_source(data=None):
+    """O vision_core se apresenta: entra na sala das fontes e já sabe se tem alguém assistindo."""
+    join_room(video_relay.SOURCE_ROOM)
+    emit('video_demand', {'ativo': relay.tem_espectadores()})
+
+@socketio.on('video_subscribe')
+def handle_video_subscribe(data=None):
+    if relay.assinar(request.sid):
+        print("🎥 [VÍDEO] Primeiro espectador: fonte volta a transmitir.")
+        avisar_fonte(True)
+
+@socketio.on('video_unsubscribe')
+def handle_video_unsubscribe(data=None):
+    if relay.sair(request.sid):
+        print("🎥 [VÍDEO] Ninguém assistindo: fonte para de codificar.")
+        avisar_fonte(False)
+
+@socketio.on('video_frame')
+def handle_video_frame(frame):
+    if isinstance(frame, (bytes, bytearray)):
+        relay.publicar(frame)
+
+def analisar_tela_agora(sessao, job):
+    """Função auxiliar para tirar print e mandar pro Gemini (vai para todas as telas)"""
     try:
         screenshot = pyautogui.screenshot()
         buffered = BytesIO()
         screenshot.save(buffered, format="PNG")
         img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
         
-        brain = user_session.get("active_brain", personas.BRAINS["architect"])
-        prompt_text = f"""
+        brain = persona_da(sessao)
+        # Prefixo fixo (persona + tarefa) e a imagem no sufixo
+        prompt_text = prompt_cache.montar(
+            prefixo=f"""
         PERSONA: {brain['instruction']}
         TAREFA: O usuário mandou um print da tela dele. Analise o código, o erro ou o gráfico.
         Seja direto.
-        """
+        """,
+            sufixo="Print da tela em anexo."
+        )
         
         print("🚀 Enviando imagem para o Gemini...")
-        emit('ai_stream_start', {})
+        socketio.emit('ai_stream_start', {'job': job.id})
         
-        voice_callback = VoiceSocketCallback(brain["name"])
-        generate_function = model_manager.get_fallback_model(callbacks=[voice_callback])
+        voice_callback = VoiceSocketCallback(brain["name"], job=job)
+        generate_function = model_manager.get_fallback_model(callbacks=[voice_callback], persona=brain["name"])
         
-        response = generate_function(prompt_text, image_data=img_str)
+        response = generate_function(prompt_text, image_data=img_str, ao_iniciar=job.vincular)
         final_text = response.content
-        emit('ai_stream_end', {'full_text': final_text})
+        jobs.concluir(job, falhou=response.falhou)
+        voice_callback.canal.fechar({'full_text': final_text, 'cancelado': job.estado != "concluido"})
         
     except Exception as e:
         print(f"❌ Erro ao analisar tela: {e}")
-        emit('ai_response', {'text': "Não consegui ver sua tela, chefe."})
+        jobs.concluir(job, falhou=True)
+        socketio.emit('ai_response', {'text': "Não consegui ver sua tela, chefe."})
 
 @socketio.on('manual_brain_switch')
 def handle_manual_switch(data):
     key = data.get('brain_key')
     if key in personas.BRAINS:
         brain_data = personas.BRAINS[key]
-        user_session["active_brain"] = brain_data
+        sessoes.de(request.sid).active_brain = brain_data
         
         emit('brain_change', {'name': brain_data["name"], 'color': brain_data["color"]})
         emit('status_update', {'msg': f'🔄 Modulação Manual: {brain_data["name"]} Ativado.'})
@@ -325,9 +496,14 @@ def handle_message(data):
     if source == 'audio' and not mic_active:
         return
 
+    # Quem recebe a resposta: o cliente que perguntou. A voz vem do listen_core
+    # (outro cliente, sem tela), então vai para todas as telas abertas.
+    destino = None if source == 'audio' else request.sid
+    sessao = sessoes.de(request.sid)
+
     # --- 3. ESPELHO DE ÁUDIO NO CHAT ---
     if source == 'audio':
-        emit('mirror_user_message', {'message': user_text})
+        socketio.emit('mirror_user_message', {'message': user_text}, to=destino)
     
     texto_lower = user_text.lower()
 
@@ -336,64 +512,17 @@ def handle_message(data):
     # ============================================================
     if "plano" in texto_lower and ("ação" in texto_lower or "gerar" in texto_lower):
         
-        task = user_session.get("focus_task")
+        # Falado (sessão host): vale a tarefa que alguma tela acabou de pôr em foco
+        task = sessao.focus_task or (sessoes.foco_recente() if source == 'audio' else None)
         
         if not task:
-            emit('ai_stream_start', {})
-            emit('ai_stream', {'chunk': "⚠️ Não tenho nenhuma tarefa prioritária na memória. Por favor, use o comando **/notion** primeiro."})
-            emit('ai_stream_end', {})
+            socketio.emit('ai_stream_start', {}, to=destino)
+            socketio.emit('ai_stream', {'chunk': "⚠️ Não tenho nenhuma tarefa prioritária na memória. Por favor, use o comando **/notion** primeiro."}, to=destino)
+            socketio.emit('ai_stream_end', {}, to=destino)
             if voice_active and vocal: vocal.generate_audio("Não sei de qual tarefa você está falando. Rode o comando notion primeiro.")
             return
 
-        print(f"🏗️ [ARGUS] Analisando demanda: {task['title']}...")
-
-        # --- TRAVA DE DUPLICIDADE ---
-        if notion_brain.check_existing_plan(task['title']):
-            msg = f"⚠️ Já encontrei um plano estratégico salvo para **'{task['title']}'** no seu Notion.\n\nNão vou gerar duplicado para economizar recursos."
-            emit('ai_stream_start', {})
-            emit('ai_stream', {'chunk': msg})
-            emit('ai_stream_end', {})
-            if voice_active and vocal: vocal.generate_audio("Senhor, já existe um plano para essa tarefa no seu arquivo. Operação cancelada.")
-            return
-        # ---------------------------
-
-        emit('ai_stream_start', {})
-        emit('ai_stream', {'chunk': f"⚙️ **Iniciando Protocolo The Strategist...**\n\nCriando plano tático para: *{task['title']}*...\n\n"})
-        
-        prompt_plano = f"""
-        ATUE COMO: The Strategist.
-        TAREFA: Crie um Plano de Ação Técnico detalhado para a seguinte demanda.
-        DEMANDA: {task['title']}
-        CONTEXTO: O usuário é Data Scientist e Analista de TI na Brasfort.
-        FORMATO: Markdown (Checklists e Etapas).
-        """
-        
-        try:
-            # --- MODO SILENCIOSO ATIVADO PARA VELOCIDADE ---
-            print("🤫 [ARGUS] Gerando em Modo Silencioso (Texto Longo)...")
-            silent_callback = SilentSocketCallback() 
-            
-            # Passa o callback silencioso pro modelo (SEM VOZ)
-            generate_function = model_manager.get_fallback_model(callbacks=[silent_callback])
-            response = generate_function(prompt_plano)
-            conteudo_plano = response.content
-            
-            # Posta no Notion
-            emit('ai_stream', {'chunk': "\n\n💾 *Salvando no Notion Playground...*"})
-            url = notion_brain.create_insight(title=f"Plano: {task['title']}", content=conteudo_plano)
-            
-            if url:
-                final_msg = f"\n\n✅ **Plano Criado com Sucesso!**\nAcesse aqui: [Ver no Notion]({url})"
-                emit('ai_stream', {'chunk': final_msg})
-                if voice_active and vocal: vocal.generate_audio("Plano criado e salvo no seu Notion pessoal.")
-            else:
-                emit('ai_stream', {'chunk': "\n\n❌ Erro ao salvar no Notion."})
-        
-        except Exception as e:
-            print(f"Erro ao gerar plano: {e}")
-            emit('ai_stream', {'chunk': f"Erro: {str(e)}"})
-            
-        emit('ai_stream_end', {})
+        socketio.start_background_task(gerar_plano, destino, task, jobs.novo(sessao.cliente, tipo="plano", substituivel=False))
         return # Encerra aqui, não passa pro chat normal
     # ============================================================
 
@@ -407,59 +536,248 @@ def handle_message(data):
     elif "inglês" in texto_lower or "postura" in texto_lower:
         brain_data = personas.BRAINS["polymath"]
     else:
-        current = user_session.get("active_brain")
-        if isinstance(current, dict):
-            brain_data = current
-        else:
-            brain_data = personas.get_active_brain()
+        brain_data = persona_da(sessao)
 
-    user_session["active_brain"] = brain_data
-    emit('brain_change', {'name': brain_data["name"], 'color': brain_data["color"]})
+    sessao.active_brain = brain_data
+    socketio.emit('brain_change', {'name': brain_data["name"], 'color': brain_data["color"]}, to=destino)
 
     # --- 6. GERAÇÃO DE RESPOSTA (LLM + RAG) ---
+    # O job nasce aqui, na ordem de chegada; a resposta anterior desta sessão só é substituída
+    # quando o job novo entra no voo (reenvio da mesma pergunta pega carona, não corta a geração)
+    job = jobs.novo(sessao.cliente, adiar=True)
+    # Roda fora do handler: o worker do Socket.IO fica livre para os outros clientes
+    socketio.start_background_task(responder_chat, destino, user_text, brain_data, sessao.conversa, job)
+
+
+def entrar_no_voo(chave_voo, destino, job, ao_pousar=None):
+    """Devolve o voo se quem chamou vai gerar (líder); None se pegou carona num voo em andamento."""
+    while True:
+        voo, lider = voos.entrar(chave_voo)
+        if lider:
+            jobs.assumir(job)
+            return voo
+        if pegar_carona(voo, destino, job, ao_pousar):
+            jobs.assumir(job)  # Já segura a geração: substituir o anterior não cancela o que ele assiste
+            return None
+
+def gerar_plano(destino, task, job):
+    """Plano de ação no Notion. Pedidos repetidos da mesma tarefa viram um só (nada de página duplicada)."""
+    voo = entrar_no_voo(single_flight.chave("plano", task['title']), destino, job)
+    if voo is None:
+        return
+    voo.anexar(destino, SilentSocketCallback(destino, job),
+               iniciar=lambda: socketio.emit('ai_stream_start', {'job': job.id}, to=destino))
+    url = None
+
     try:
-        emit('ai_stream_start', {})
+        print(f"🏗️ [ARGUS] Analisando demanda: {task['title']}...")
+
+        # --- TRAVA DE DUPLICIDADE ---
+        if notion_brain.check_existing_plan(task['title']):
+            msg = f"⚠️ Já encontrei um plano estratégico salvo para **'{task['title']}'** no seu Notion.\n\nNão vou gerar duplicado para economizar recursos."
+            voo.on_llm_new_token(msg)
+            if voice_active and vocal: vocal.generate_audio("Senhor, já existe um plano para essa tarefa no seu arquivo. Operação cancelada.")
+            return
+        # ---------------------------
+
+        voo.on_llm_new_token(f"⚙️ **Iniciando Protocolo The Strategist...**\n\nCriando plano tático para: *{task['title']}*...\n\n")
+        
+        # Preâmbulo fixo no prefixo (cacheável); só a demanda muda entre planos
+        prompt_plano = prompt_cache.montar(
+            prefixo="""
+        ATUE COMO: The Strategist.
+        TAREFA: Crie um Plano de Ação Técnico detalhado para a demanda abaixo.
+        CONTEXTO: O usuário é Data Scientist e Analista de TI na Brasfort.
+        FORMATO: Markdown (Checklists e Etapas).
+        """,
+            sufixo=f"DEMANDA: {task['title']}"
+        )
         
+        # --- MODO SILENCIOSO ATIVADO PARA VELOCIDADE ---
+        print("🤫 [ARGUS] Gerando em Modo Silencioso (Texto Longo)...")
+        
+        # Os tokens vão pro voo, que repassa a todos os clientes pendurados (SEM VOZ)
+        generate_function = model_manager.get_fallback_model(
+            callbacks=[voo], persona=personas.BRAINS["strategist"]["name"]
+        )
+        response = generate_function(prompt_plano, ao_iniciar=job.vincular)
+        conteudo_plano = response.content
+        if not job.ativo:
+            return  # Cancelado: nada vai pro Notion
+        if getattr(response, "falhou", False):
+            jobs.concluir(job, falhou=True)
+            # Não publica a mensagem de erro (nem plano pela metade) no Notion
+            voo.on_llm_new_token("\n\n❌ Não consegui gerar o plano agora. Nada foi salvo no Notion.")
+            return
+        
+        # Posta no Notion (idempotente: a mesma tarefa nunca vira duas páginas)
+        voo.on_llm_new_token("\n\n💾 *Salvando no Notion Playground...*")
+        url = notion_brain.create_plan(task['title'], conteudo_plano)
+        
+        if url:
+            final_msg = f"\n\n✅ **Plano Criado com Sucesso!**\nAcesse aqui: [Ver no Notion]({url})"
+            voo.on_llm_new_token(final_msg)
+            if voice_active and vocal: vocal.generate_audio("Plano criado e salvo no seu Notion pessoal.")
+        else:
+            voo.on_llm_new_token("\n\n❌ Erro ao salvar no Notion.")
+    
+    except Exception as e:
+        print(f"Erro ao gerar plano: {e}")
+        voo.on_llm_new_token(f"Erro: {str(e)}")
+    finally:
+        pousar(voo, url)
+
+
+# --- JOBS EM ANDAMENTO (cancelar / consultar) ---
+@socketio.on('cancel_generation')
+def handle_cancel_generation(data=None):
+    job_id = (data or {}).get('job')
+    if job_id:
+        parados = int(jobs.cancelar(job_id))
+    else:
+        # Sem id: tudo desta sessão; se ela não tem nada rodando, a resposta falada (sessão host)
+        parados = jobs.cancelar_sessao(sessoes.de(request.sid).cliente) or jobs.cancelar_sessao(sessions.HOST_CLIENT)
+    if parados:
+        print("✋ [ARGUS] Geração cancelada pelo usuário.")
+
+@socketio.on('stream_resume')
+def handle_stream_resume(data):
+    """Navegador reconectou (ou viu buraco no seq): reenvia os frames do job depois do último que chegou."""
+    retomada = batcher.retomar(data.get('job'), sessoes.de(request.sid).cliente, request.sid, int(data.get('seq') or 0))
+    if retomada:
+        print(f"🔁 [STREAM] {data.get('job')}: {retomada[0]} frames reenviados.")
+
+@socketio.on('get_jobs')
+def handle_get_jobs(data=None):
+    job_id = (data or {}).get('job')
+    if job_id:
+        emit('jobs', {'job': jobs.consultar(job_id)})
+    else:
+        emit('jobs', {'jobs': jobs.listar(sessoes.de(request.sid).cliente), 'stats': jobs.stats()})
+
+def responder_chat(destino, user_text, brain_data, conversa, job):
+    """RAG + cache + LLM em streaming para um cliente (roda como background task)."""
+    texto_lower = user_text.lower()
+    voo = None
+    try:
         if vocal: vocal.stop()
         
-        # Automação rápida
-        system_log = ""
-        if "bloquear" in texto_lower:
-            automation.bloquear_windows()
-            system_log = "[AÇÃO: Windows Bloqueado]"
+        # Automação rápida (a ação em si só roda no líder do voo, lá embaixo)
+        system_log = "[AÇÃO: Windows Bloqueado]" if "bloquear" in texto_lower else ""
         
         # RAG
         contexto_memoria = ""
+        docs = []
         try:
-            docs = memory_core.buscar_memoria(user_text)
-            if docs:
-                contexto_memoria = "\nCONHECIMENTO RECUPERADO:\n"
-                for i, doc in enumerate(docs):
-                    contexto_memoria += f"-- {doc.page_content}\n"
-                print(f"🧠 [RAG] Encontrei {len(docs)} referências.")
+            candidatos = knowledge_router.buscar_conhecimento(
+                user_text, brain_data, k=context_builder.CONTEXT_CANDIDATES
+            )
+            if candidatos:
+                contexto_memoria, docs, relatorio = context_builder.construir_contexto(
+                    candidatos, context_builder.orcamento_da_persona(brain_data),
+                    vetores=knowledge_router.vetores_salvos(candidatos)
+                )
+                print(f"🧠 [RAG] {relatorio['usados']}/{relatorio['candidatos']} referências | "
+                      f"{relatorio['tokens_usados']} tokens ({relatorio['tokens_economizados']} economizados).")
         except Exception as e:
             print(f"⚠️ Erro no RAG: {e}")
 
-        # Prompt Final
-        prompt_final = f"""
-        PERSONA: {brain_data['instruction']}
+        # Mensagem nova chegou enquanto buscava o contexto: nem começa a gerar
+        if not job.ativo:
+            return
+
+        # Memória da conversa: resumo + últimos turnos, com teto de tokens
+        historico, relatorio_memoria = memoria_conversa.contexto(conversa)
+        if relatorio_memoria["tokens"]:
+            print(f"💬 [MEMÓRIA] {relatorio_memoria['turnos']} turnos + resumo | {relatorio_memoria['tokens']} tokens.")
+
+        # Single-flight: mesma pergunta + persona + contexto + histórico já em geração? Pega carona.
+        # O histórico só entra na chave do voo ("e ele?" em outra conversa é outra pergunta);
+        # o cache semântico usa só o contexto, senão do 2º turno em diante nunca acertaria
+        contexto_hash = fingerprint_contexto(docs, extra=system_log)
+        voo = entrar_no_voo(
+            single_flight.chave(user_text, brain_data["name"], contexto_hash, fingerprint_contexto([], extra=historico)),
+            destino, job,
+            # Quem pegou carona também guarda o turno na PRÓPRIA conversa
+            ao_pousar=lambda resposta: memoria_conversa.registrar_turno(conversa, user_text, resposta)
+        )
+        if voo is None:
+            return
+        voice_callback = VoiceSocketCallback(brain_data["name"], destino, job)
+        voo.anexar(destino, voice_callback, iniciar=lambda: socketio.emit('ai_stream_start', {'job': job.id}, to=destino))
+
+        if system_log:
+            automation.bloquear_windows()
+
+        # Cache Semântico (mesma persona + mesmo contexto + pergunta parecida)
+        query_embedding = None
+        try:
+            query_embedding = memory_core.get_retriever().embed_query(user_text)
+            cache_hit = semantic_cache.buscar(query_embedding, brain_data["name"], contexto_hash)
+        except Exception as e:
+            print(f"⚠️ Erro no Cache Semântico: {e}")
+            cache_hit = None
+
+        if cache_hit:
+            final_text, similaridade = cache_hit
+            print(f"⚡ [CACHE] Resposta reaproveitada (similaridade {similaridade:.3f}).")
+            replay_resposta(final_text, voo)
+            pousar(voo, final_text)
+            if job.estado == "concluido":
+                memoria_conversa.registrar_turno(conversa, user_text, final_text)
+            return
+
+        # Prompt Final: persona no prefixo estável, o que muda a cada turno no sufixo
+        prompt_final = prompt_cache.montar(
+            prefixo=f"PERSONA: {brain_data['instruction']}",
+            sufixo=f"""
+        {historico}
         {contexto_memoria}
         LOG DE SISTEMA: {system_log}
         USUÁRIO: {user_text}
         """
-
-        voice_callback = VoiceSocketCallback(brain_data["name"])
-        generate_function = model_manager.get_fallback_model(callbacks=[voice_callback])
-        
-        response_obj = generate_function(prompt_final)
-        final_text = response_obj.content if hasattr(response_obj, 'content') else str(response_obj)
-        
-        emit('ai_stream_end', {'full_text': final_text})
+        )
+
+        # Tokens puxados um a um do astream (o job cancela: botão ou mensagem nova da sessão)
+        geracao = model_manager.GeracaoStream(prompt_final, persona=brain_data["name"])
+        with voo.lock:
+            voo.geracao = geracao
+            caronas = [a.job for a in voo.assinantes if getattr(a, 'job', None) and a.job is not job]
+        # Todos os jobs do voo seguram a geração (ela só é cancelada quando o último parar)
+        jobs.vincular(geracao, job, *caronas)
+        falhou = False
+        try:
+            for token in geracao:
+                voo.on_llm_new_token(token)
+        except Exception as e:
+            print(f"⚠️ [ARGUS] Geração interrompida: {e}")
+            falhou = True
+            if not geracao.texto:
+                voo.on_llm_new_token(f"Desculpe, chefe. Todos os sistemas neurais estão fora do ar. {e}")
+        if falhou:
+            jobs.concluir(job, falhou=True)
+
+        final_text = geracao.texto
+        # Resposta que falhou não é resultado (as caronas não guardam o turno)
+        pousar(voo, None if falhou else final_text, extra={'cancelado': geracao.cancelado})
+
+        if final_text and not falhou and not geracao.cancelado:
+            if job.estado == "concluido":  # Líder substituído (com caronas assistindo) não guarda o turno
+                memoria_conversa.registrar_turno(conversa, user_text, final_text)
+            if query_embedding is not None:
+                semantic_cache.guardar(user_text, query_embedding, brain_data["name"], contexto_hash, final_text)
         
     except Exception as e:
         print(f"Erro: {e}")
-        emit('ai_stream', {'chunk': f"Erro fatal no núcleo: {str(e)}"})
-        emit('ai_stream_end', {})
+        if voo is None:
+            jobs.assumir(job)  # Falhou antes do voo: a resposta anterior é substituída do mesmo jeito
+            jobs.concluir(job, falhou=True)
+            socketio.emit('ai_stream_start', {'job': job.id}, to=destino)
+            socketio.emit('ai_stream', {'chunk': f"Erro fatal no núcleo: {str(e)}", 'job': job.id}, to=destino)
+            socketio.emit('ai_stream_end', {'job': job.id}, to=destino)
+        else:
+            voo.on_llm_new_token(f"Erro fatal no núcleo: {str(e)}")
+            pousar(voo)
 
 # --- THREAD DE MONITORAMENTO DE SISTEMA ---
 def monitor_system():
@@ -489,4 +807,8 @@ if __name__ == '__main__':
         creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
     )
 
-    socketio.run(app, debug=False, port=5000, use_reloader=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # Servidor embutido (Werkzeug com uma thread por conexão), que também roda no Windows.
+    # Em Linux, para servir várias máquinas: gunicorn -k gthread -w 1 --threads 64 -b 0.0.0.0:5000 app:app
+    # (1 worker só: sessões, voos e gerações vivem na memória deste processo)
+    socketio.run(app, host=os.getenv("ARGUS_HOST", "127.0.0.1"), port=int(os.getenv("ARGUS_PORT", "5000")),
+                 debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
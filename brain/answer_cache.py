@@ -0,0 +1,165 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+# ==========================================
+# ⚡ CACHE SEMÂNTICO DE RESPOSTAS
+# ==========================================
+# Perguntas quase repetidas ("quais minhas pendências", "status do servidor")
+# com a mesma persona e o mesmo contexto recuperado reaproveitam a resposta
+# anterior, sem passar pela cascata do Gemini.
+CACHE_DB_NAME = "semantic_cache.db"  # Fica ao lado do jarvis_memory.db
+CACHE_THRESHOLD = float(os.getenv("ARGUS_CACHE_THRESHOLD", "0.92"))  # Similaridade de cosseno mínima
+CACHE_TTL_S = float(os.getenv("ARGUS_CACHE_TTL", "600"))             # Validade de uma resposta
+CACHE_MAX_ENTRIES = int(os.getenv("ARGUS_CACHE_MAX", "500"))         # Acima disso, sai o menos usado
+
+
+def fingerprint_contexto(docs, extra=""):
+    """Impressão digital do contexto recuperado (muda se o RAG trouxer outros trechos)."""
+    sha = hashlib.sha256(extra.encode("utf-8"))
+    for doc in docs or []:
+        sha.update(hashlib.sha256(doc.page_content.encode("utf-8")).digest())
+    return sha.hexdigest()
+
+
+class SemanticCache:
+    def __init__(self, db_path=CACHE_DB_NAME, threshold=CACHE_THRESHOLD, ttl=CACHE_TTL_S, max_entries=CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.guardados = 0
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.create_tables()
+
+        # Espelho em RAM: (persona, contexto) -> [(id, vetor_normalizado, criado_em)]
+        self.indice = {}
+        self._carregar_indice()
+
+    def create_tables(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_respostas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                persona TEXT,
+                contexto_hash TEXT,
+                user_query TEXT,
+                embedding BLOB,
+                resposta TEXT,
+                criado_em REAL,
+                ultimo_uso REAL,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_cache_chave ON cache_respostas (persona, contexto_hash)
+        ''')
+        self.conn.commit()
+
+    def _carregar_indice(self):
+        limite = time.time() - self.ttl
+        self.cursor.execute("DELETE FROM cache_respostas WHERE criado_em < ?", (limite,))
+        self.conn.commit()
+        self.cursor.execute("SELECT id, persona, contexto_hash, embedding, criado_em FROM cache_respostas")
+        for entry_id, persona, contexto_hash, blob, criado_em in self.cursor.fetchall():
+            vetor = np.frombuffer(blob, dtype=np.float32)
+            self.indice.setdefault((persona, contexto_hash), []).append((entry_id, vetor, criado_em))
+
+    @staticmethod
+    def _normalizar(embedding):
+        vetor = np.asarray(embedding, dtype=np.float32)
+        norma = np.linalg.norm(vetor)
+        return vetor / norma if norma > 0 else vetor
+
+    def buscar(self, embedding, persona, contexto_hash):
+        """Devolve (resposta, similaridade) ou None."""
+        vetor = self._normalizar(embedding)
+        agora = time.time()
+
+        with self.lock:
+            melhor_id, melhor_sim = None, -1.0
+            vivos = []
+            for entry_id, salvo, criado_em in self.indice.get((persona, contexto_hash), []):
+                if agora - criado_em > self.ttl:
+                    continue  # Expirado: sai do índice, o DELETE acontece no próximo guardar()
+                vivos.append((entry_id, salvo, criado_em))
+                sim = float(np.dot(vetor, salvo))
+                if sim > melhor_sim:
+                    melhor_id, melhor_sim = entry_id, sim
+            if vivos:
+                self.indice[(persona, contexto_hash)] = vivos
+            else:
+                self.indice.pop((persona, contexto_hash), None)
+
+            if melhor_id is None or melhor_sim < self.threshold:
+                self.misses += 1
+                return None
+
+            self.cursor.execute("SELECT resposta FROM cache_respostas WHERE id = ?", (melhor_id,))
+            row = self.cursor.fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.cursor.execute(
+                "UPDATE cache_respostas SET hits = hits + 1, ultimo_uso = ? WHERE id = ?", (agora, melhor_id)
+            )
+            self.conn.commit()
+            self.hits += 1
+            return row[0], melhor_sim
+
+    def guardar(self, query, embedding, persona, contexto_hash, resposta):
+        vetor = self._normalizar(embedding)
+        agora = time.time()
+
+        with self.lock:
+            self.cursor.execute("DELETE FROM cache_respostas WHERE criado_em < ?", (agora - self.ttl,))
+            self.cursor.execute('''
+                INSERT INTO cache_respostas (persona, contexto_hash, user_query, embedding, resposta, criado_em, ultimo_uso)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (persona, contexto_hash, query, vetor.tobytes(), resposta, agora, agora))
+            novo_id = self.cursor.lastrowid
+            self.indice.setdefault((persona, contexto_hash), []).append((novo_id, vetor, agora))
+            self.guardados += 1
+
+            # Limite de tamanho: remove os menos usados recentemente
+            self.cursor.execute("SELECT COUNT(*) FROM cache_respostas")
+            excesso = self.cursor.fetchone()[0] - self.max_entries
+            if excesso > 0:
+                self.cursor.execute(
+                    "SELECT id FROM cache_respostas ORDER BY ultimo_uso ASC LIMIT ?", (excesso,)
+                )
+                removidos = {row[0] for row in self.cursor.fetchall()}
+                self.cursor.executemany("DELETE FROM cache_respostas WHERE id = ?", [(i,) for i in removidos])
+                for chave in list(self.indice):
+                    self.indice[chave] = [e for e in self.indice[chave] if e[0] not in removidos]
+                    if not self.indice[chave]:
+                        del self.indice[chave]
+            self.conn.commit()
+
+    def limpar(self):
+        with self.lock:
+            self.cursor.execute("DELETE FROM cache_respostas")
+            self.conn.commit()
+            self.indice.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "guardados": self.guardados,
+                "entradas": sum(len(v) for v in self.indice.values()),
+                "threshold": self.threshold,
+                "ttl_s": self.ttl,
+            }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,204 @@
+import os
+import math
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from brain.lexical_index import tokenizar
+
+# ==========================================
+# 📦 MONTAGEM DO CONTEXTO (ORÇAMENTO DE TOKENS)
+# ==========================================
+# O RAG traz candidatos a mais; aqui eles viram o trecho "CONHECIMENTO
+# RECUPERADO" do prompt:
+#   1. fragmentos vizinhos do mesmo documento (overlap do splitter) viram um só
+#   2. MMR (relevância x diversidade) descarta quase-duplicatas
+#   3. o resultado é empacotado no orçamento de tokens da persona
+CONTEXT_CANDIDATES = int(os.getenv("ARGUS_RAG_CANDIDATES", "12"))     # Quantos trechos pedir ao roteador
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("ARGUS_CONTEXT_TOKENS", "900"))  # Se a persona não definir "context_tokens"
+MMR_LAMBDA = 0.7           # 1.0 = só relevância, 0.0 = só diversidade
+DUPLICATE_SIM = 0.95       # Acima disso o candidato é cópia de um já escolhido
+CHARS_PER_TOKEN = 4        # Estimativa (Gemini ~4 caracteres por token)
+MIN_TRUNCATED_TOKENS = 60  # Sobra menor que isso não vale um trecho cortado
+OVERLAP_PROBE_CHARS = 40   # Tamanho da "âncora" usada para achar o overlap entre fragmentos
+OVERLAP_WINDOW_CHARS = 400 # Onde procurar a âncora (cobre o CHUNK_OVERLAP=200 com folga)
+
+HEADER = "\nCONHECIMENTO RECUPERADO:\n"
+
+
+def estimar_tokens(texto):
+    return math.ceil(len(texto) / CHARS_PER_TOKEN) if texto else 0
+
+
+def orcamento_da_persona(brain_data):
+    return int((brain_data or {}).get("context_tokens", DEFAULT_CONTEXT_TOKENS))
+
+
+# --- 1. FRAGMENTOS SOBREPOSTOS ---
+def _origem(doc):
+    return (doc.metadata.get("colecao"), doc.metadata.get("source"), doc.metadata.get("page"))
+
+
+def _juntar(a, b):
+    """Se o fim de 'a' é o começo de 'b' (overlap do splitter), devolve a união; senão None."""
+    if b in a:
+        return a
+    ancora = b[:OVERLAP_PROBE_CHARS]
+    if len(ancora) < OVERLAP_PROBE_CHARS:
+        return None
+    pos = a.find(ancora, max(0, len(a) - OVERLAP_WINDOW_CHARS))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return a + b[len(a) - pos:]
+        pos = a.find(ancora, pos + 1)
+    return None
+
+
+def colapsar_sobreposicoes(itens):
+    """
+    itens: [(Document, relevância, (assinatura, vetor) ou None)]. Junta fragmentos do
+    mesmo documento (mesma coleção/arquivo/página) cujo texto se sobrepõe.
+    """
+    itens = list(itens)
+    mudou = True
+    while mudou:
+        mudou = False
+        for i in range(len(itens)):
+            for j in range(len(itens)):
+                if i == j or _origem(itens[i][0]) != _origem(itens[j][0]):
+                    continue
+                texto = _juntar(itens[i][0].page_content, itens[j][0].page_content)
+                if texto is None:
+                    continue
+                (doc_a, rel_a, vet_a), (_, rel_b, vet_b) = itens[i], itens[j]
+                vetor = None
+                if vet_a is not None and vet_b is not None and vet_a[0] == vet_b[0]:
+                    soma = vet_a[1] + vet_b[1]
+                    vetor = (vet_a[0], soma / max(np.linalg.norm(soma), 1e-12))
+                unido = (Document(id=doc_a.id, page_content=texto, metadata=dict(doc_a.metadata)),
+                         max(rel_a, rel_b), vetor)
+                itens = [it for n, it in enumerate(itens) if n not in (i, j)] + [unido]
+                mudou = True
+                break
+            if mudou:
+                break
+    return itens
+
+
+# --- 2. MMR ---
+def _normalizar(vetores, n):
+    """Vetores gravados no banco -> (assinatura, vetor unitário float32); nada é reembedado aqui."""
+    if vetores is None:
+        return [None] * n
+    normalizados = []
+    for item in vetores:
+        if item is None:
+            normalizados.append(None)
+            continue
+        assinatura, vetor = item
+        vetor = np.asarray(vetor, dtype=np.float32)
+        normalizados.append((assinatura, vetor / max(np.linalg.norm(vetor), 1e-12)))
+    return normalizados
+
+
+def _similaridade(a, b):
+    (doc_a, _, vet_a), (doc_b, _, vet_b) = a, b
+    if vet_a is not None and vet_b is not None and vet_a[0] == vet_b[0]:
+        return float(np.dot(vet_a[1], vet_b[1]))
+    # Sem vetor (ou de espaços vetoriais diferentes): coeficiente de sobreposição dos termos
+    # (mesmo tokenizador do BM25).
+    # Trecho contido em outro dá 1.0, o que pega cópias parciais.
+    termos_a, termos_b = set(tokenizar(doc_a.page_content)), set(tokenizar(doc_b.page_content))
+    if not termos_a or not termos_b:
+        return 0.0
+    return len(termos_a & termos_b) / min(len(termos_a), len(termos_b))
+
+
+def ordenar_mmr(itens, lambda_=MMR_LAMBDA):
+    """Ordena por relevância marginal máxima, descartando quase-duplicatas."""
+    restantes = list(itens)
+    escolhidos = []
+    while restantes:
+        melhor, melhor_valor, melhor_sim = None, -math.inf, 0.0
+        for item in restantes:
+            sim = max((_similaridade(item, e) for e in escolhidos), default=0.0)
+            valor = lambda_ * item[1] - (1 - lambda_) * sim
+            if valor > melhor_valor:
+                melhor, melhor_valor, melhor_sim = item, valor, sim
+        restantes.remove(melhor)
+        if melhor_sim >= DUPLICATE_SIM:
+            continue
+        escolhidos.append(melhor)
+    return escolhidos
+
+
+# --- 3. EMPACOTAMENTO ---
+def _cortar(texto, tokens):
+    """Corta no último espaço antes do limite (não parte palavras)."""
+    limite = tokens * CHARS_PER_TOKEN - 1
+    corte = texto.rfind(" ", 0, limite)
+    return texto[:corte if corte > 0 else limite].rstrip() + "…"
+
+
+def construir_contexto(docs, budget_tokens=DEFAULT_CONTEXT_TOKENS, vetores=None):
+    """
+    Devolve (texto_do_contexto, docs_usados, relatorio).
+    A relevância de cada candidato vem do roteador (metadata["score"]) ou da posição.
+    vetores: [(assinatura, vetor) ou None] já gravados no banco (knowledge_router.vetores_salvos).
+    """
+    docs = list(docs or [])
+    brutos = sum(estimar_tokens(f"-- {d.page_content}\n") for d in docs) + (estimar_tokens(HEADER) if docs else 0)
+    if not docs:
+        return "", [], _registrar(0, 0, brutos, 0)
+
+    itens = [
+        (doc, float(doc.metadata.get("score", 1.0 / (1 + i))), vetor)
+        for i, (doc, vetor) in enumerate(zip(docs, _normalizar(vetores, len(docs))))
+    ]
+    itens = ordenar_mmr(colapsar_sobreposicoes(itens))
+
+    restante = budget_tokens - estimar_tokens(HEADER)
+    usados = []
+    linhas = []
+    for doc, _, _ in itens:
+        linha = f"-- {doc.page_content}\n"
+        custo = estimar_tokens(linha)
+        if custo > restante:
+            if restante < MIN_TRUNCATED_TOKENS:
+                continue  # Talvez um trecho menor ainda caiba
+            linha = _cortar(linha.rstrip("\n"), restante) + "\n"
+            custo = estimar_tokens(linha)
+        linhas.append(linha)
+        usados.append(doc)
+        restante -= custo
+
+    texto = HEADER + "".join(linhas) if linhas else ""
+    return texto, usados, _registrar(len(docs), len(usados), brutos, estimar_tokens(texto))
+
+
+# --- TELEMETRIA ---
+_stats = {"turnos": 0, "candidatos": 0, "usados": 0, "tokens_brutos": 0, "tokens_usados": 0}
+_stats_lock = threading.Lock()
+
+
+def _registrar(candidatos, usados, brutos, final):
+    relatorio = {
+        "candidatos": candidatos,
+        "usados": usados,
+        "tokens_brutos": brutos,
+        "tokens_usados": final,
+        "tokens_economizados": max(brutos - final, 0),
+    }
+    with _stats_lock:
+        _stats["turnos"] += 1
+        _stats["candidatos"] += candidatos
+        _stats["usados"] += usados
+        _stats["tokens_brutos"] += brutos
+        _stats["tokens_usados"] += final
+    return relatorio
+
+
+def stats():
+    with _stats_lock:
+        dados = dict(_stats)
+    dados["tokens_economizados"] = max(dados["tokens_brutos"] - dados["tokens_usados"], 0)
+    return dados
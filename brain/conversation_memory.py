@@ -0,0 +1,241 @@
+import os
+import time
+import sqlite3
+import threading
+
+# ==========================================
+# 💬 MEMÓRIA DA CONVERSA (CURTO PRAZO)
+# ==========================================
+# Os últimos turnos entram no prompt como estão; os mais antigos são dobrados num
+# resumo corrido, feito em segundo plano (fora do caminho da resposta). O bloco
+# que vai pro prompt tem teto duro de tokens, então a conversa pode durar o dia
+# todo sem o prompt crescer. Tudo fica em SQLite: reiniciar o Argus não apaga o contexto.
+MEMORY_DB_NAME = "conversation_memory.db"  # Fica ao lado do jarvis_memory.db
+RECENT_TURNS = int(os.getenv("ARGUS_MEMORY_TURNS", "6"))           # Turnos literais no prompt
+MAX_MEMORY_TOKENS = int(os.getenv("ARGUS_MEMORY_TOKENS", "800"))   # Teto do bloco de memória
+SUMMARY_MAX_TOKENS = 300     # Tamanho-alvo do resumo (e teto ao montar o prompt)
+SUMMARY_BATCH = 4            # Só resume quando sobram pelo menos isso de turnos antigos
+TURN_MAX_TOKENS = 250        # Resposta longa (plano, código) entra cortada
+MAX_STORED_TURNS = 500       # Turnos já resumidos guardados por conversa (histórico)
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """Você mantém o resumo de uma conversa entre o usuário e o Argus (assistente pessoal).
+Atualize o resumo anterior com os novos turnos. Guarde fatos, decisões, pendências,
+nomes e preferências do usuário; descarte cumprimentos e detalhes já resolvidos.
+Escreva em português, em tópicos curtos, com no máximo {palavras} palavras.
+
+RESUMO ANTERIOR:
+{resumo}
+
+NOVOS TURNOS:
+{turnos}
+
+RESUMO ATUALIZADO:"""
+
+
+def estimar_tokens(texto):
+    return len(texto) // CHARS_PER_TOKEN
+
+
+def _cortar(texto, max_tokens):
+    limite = max_tokens * CHARS_PER_TOKEN
+    return texto if len(texto) <= limite else texto[:limite].rsplit(" ", 1)[0] + " [...]"
+
+
+class ConversationMemory:
+    def __init__(self, db_path=MEMORY_DB_NAME, resumidor=None):
+        self.lock = threading.Lock()
+        self.resumidor = resumidor  # Callable(prompt) -> texto; None = usa a cascata do model_manager
+        self.conversas = {}         # Espelho em RAM: conversa -> {"resumo", "recentes": [(id, pergunta, resposta)]}
+        self.resumindo = set()      # Conversas com resumo em andamento (um por vez)
+        self.contadores = {"prompts": 0, "tokens_prompt": 0, "maior_prompt": 0, "cortes": 0,
+                           "resumos": 0, "resumos_falhos": 0, "tempo_resumo_ms": 0,
+                           "tokens_resumo_entrada": 0, "tokens_resumo_saida": 0}
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.create_tables()
+
+    def create_tables(self):
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS turnos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversa TEXT,
+                pergunta TEXT,
+                resposta TEXT,
+                criado_em REAL,
+                resumido INTEGER DEFAULT 0
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_turnos_conversa ON turnos (conversa, resumido, id)
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumos (
+                conversa TEXT PRIMARY KEY,
+                texto TEXT,
+                atualizado_em REAL
+            )
+        ''')
+        self.conn.commit()
+
+    def _carregar(self, conversa):
+        """Resumo + turnos ainda não resumidos (chamar com o lock)."""
+        if conversa not in self.conversas:
+            self.cursor.execute("SELECT texto FROM resumos WHERE conversa = ?", (conversa,))
+            linha = self.cursor.fetchone()
+            self.cursor.execute(
+                "SELECT id, pergunta, resposta FROM turnos WHERE conversa = ? AND resumido = 0 ORDER BY id",
+                (conversa,)
+            )
+            self.conversas[conversa] = {"resumo": linha[0] if linha else "", "recentes": self.cursor.fetchall()}
+        return self.conversas[conversa]
+
+    # --- CAMINHO QUENTE (cada turno) ---
+    def contexto(self, conversa, max_tokens=MAX_MEMORY_TOKENS):
+        """
+        Bloco de memória para o prompt (resumo + últimos turnos), nunca acima de max_tokens.
+        Devolve (texto, relatorio).
+        """
+        with self.lock:
+            dados = self._carregar(conversa)
+            resumo = dados["resumo"]
+            recentes = list(dados["recentes"][-RECENT_TURNS:])
+
+        # Turnos do mais novo pro mais velho até o teto; o resumo fica com o que sobrar
+        resumo = _cortar(resumo, min(SUMMARY_MAX_TOKENS, max_tokens // 3)) if resumo else ""
+        restante = max_tokens - estimar_tokens(resumo)
+        linhas = []
+        cortou = len(recentes) < len(dados["recentes"])
+        for _, pergunta, resposta in reversed(recentes):
+            bloco = f"Usuário: {_cortar(pergunta, TURN_MAX_TOKENS)}\nArgus: {_cortar(resposta, TURN_MAX_TOKENS)}"
+            custo = estimar_tokens(bloco)
+            if custo > restante:
+                cortou = True
+                break
+            linhas.insert(0, bloco)
+            restante -= custo
+
+        partes = []
+        if resumo:
+            partes.append(f"RESUMO DA CONVERSA ATÉ AQUI:\n{resumo}")
+        if linhas:
+            partes.append("ÚLTIMAS MENSAGENS:\n" + "\n".join(linhas))
+        texto = "\n\n".join(partes)
+        tokens = estimar_tokens(texto)
+
+        with self.lock:
+            self.contadores["prompts"] += 1
+            self.contadores["tokens_prompt"] += tokens
+            self.contadores["maior_prompt"] = max(self.contadores["maior_prompt"], tokens)
+            self.contadores["cortes"] += int(cortou)
+        return texto, {"tokens": tokens, "turnos": len(linhas), "resumo_tokens": estimar_tokens(resumo)}
+
+    def registrar_turno(self, conversa, pergunta, resposta):
+        with self.lock:
+            dados = self._carregar(conversa)
+            self.cursor.execute(
+                "INSERT INTO turnos (conversa, pergunta, resposta, criado_em) VALUES (?, ?, ?, ?)",
+                (conversa, pergunta, resposta, time.time())
+            )
+            self.conn.commit()
+            dados["recentes"].append((self.cursor.lastrowid, pergunta, resposta))
+            pendentes = len(dados["recentes"]) - RECENT_TURNS
+            disparar = pendentes >= SUMMARY_BATCH and conversa not in self.resumindo
+            if disparar:
+                self.resumindo.add(conversa)
+        if disparar:
+            threading.Thread(target=self._resumir, args=(conversa,), daemon=True, name="memoria-resumo").start()
+
+    # --- FORA DO CAMINHO QUENTE ---
+    def _resumir(self, conversa):
+        """Dobra os turnos antigos no resumo. Se o LLM falhar, tenta de novo no próximo turno."""
+        try:
+            with self.lock:
+                dados = self._carregar(conversa)
+                resumo_anterior = dados["resumo"]
+                antigos = list(dados["recentes"][:-RECENT_TURNS])
+            if not antigos:
+                return
+
+            turnos = "\n".join(
+                f"Usuário: {_cortar(p, TURN_MAX_TOKENS)}\nArgus: {_cortar(r, TURN_MAX_TOKENS)}" for _, p, r in antigos
+            )
+            prompt = SUMMARY_PROMPT.format(
+                palavras=int(SUMMARY_MAX_TOKENS * 0.75), resumo=resumo_anterior or "(vazio)", turnos=turnos
+            )
+            inicio = time.time()
+            novo_resumo = self._gerar_resumo(prompt)
+            duracao_ms = round((time.time() - inicio) * 1000)
+            if not novo_resumo:
+                with self.lock:
+                    self.contadores["resumos_falhos"] += 1
+                return
+
+            ultimo_id = antigos[-1][0]
+            with self.lock:
+                self.cursor.execute(
+                    "INSERT OR REPLACE INTO resumos (conversa, texto, atualizado_em) VALUES (?, ?, ?)",
+                    (conversa, novo_resumo, time.time())
+                )
+                self.cursor.execute(
+                    "UPDATE turnos SET resumido = 1 WHERE conversa = ? AND id <= ?", (conversa, ultimo_id)
+                )
+                # Histórico já resumido: guarda só os últimos MAX_STORED_TURNS
+                self.cursor.execute('''
+                    DELETE FROM turnos WHERE conversa = ? AND resumido = 1 AND id NOT IN (
+                        SELECT id FROM turnos WHERE conversa = ? AND resumido = 1 ORDER BY id DESC LIMIT ?
+                    )
+                ''', (conversa, conversa, MAX_STORED_TURNS))
+                self.conn.commit()
+                dados["resumo"] = novo_resumo
+                dados["recentes"] = [t for t in dados["recentes"] if t[0] > ultimo_id]
+                self.contadores["resumos"] += 1
+                self.contadores["tempo_resumo_ms"] += duracao_ms
+                self.contadores["tokens_resumo_entrada"] += estimar_tokens(prompt)
+                self.contadores["tokens_resumo_saida"] += estimar_tokens(novo_resumo)
+            print(f"💬 [MEMÓRIA] {len(antigos)} turnos dobrados no resumo em {duracao_ms}ms.")
+        except Exception as e:
+            print(f"⚠️ [MEMÓRIA] Falha ao resumir a conversa: {e}")
+        finally:
+            with self.lock:
+                self.resumindo.discard(conversa)
+
+    def _gerar_resumo(self, prompt):
+        if self.resumidor is not None:
+            return (self.resumidor(prompt) or "").strip()
+        from brain import model_manager
+        gerar = model_manager.get_fallback_model(persona="memoria")
+        if gerar is None:
+            return ""
+        resposta = gerar(prompt)
+        if getattr(resposta, "falhou", False):
+            return ""
+        return (resposta.content or "").strip()
+
+    def limpar(self, conversa):
+        """Esquece a conversa (comando do usuário ou troca de assunto)."""
+        with self.lock:
+            self.cursor.execute("DELETE FROM turnos WHERE conversa = ?", (conversa,))
+            self.cursor.execute("DELETE FROM resumos WHERE conversa = ?", (conversa,))
+            self.conn.commit()
+            self.conversas.pop(conversa, None)
+
+    def stats(self):
+        with self.lock:
+            dados = dict(self.contadores)
+        dados["tokens_prompt_medio"] = round(dados["tokens_prompt"] / dados["prompts"]) if dados["prompts"] else 0
+        dados["tempo_resumo_medio_ms"] = round(dados["tempo_resumo_ms"] / dados["resumos"]) if dados["resumos"] else 0
+        return dados
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+def get_memory():
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = ConversationMemory()
+    return _memory
@@ -0,0 +1,238 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ==========================================
+# 🧬 PROVEDOR ÚNICO DE EMBEDDINGS
+# ==========================================
+# memory_core, knowledge_router, app.py e testes/trainer.py usam TODOS este
+# provedor. O modelo só é carregado no primeiro embed (nada pesado no import).
+#
+# Backends (ARGUS_EMBEDDING_BACKEND):
+#   huggingface -> sentence-transformers fp32 via torch (padrão histórico do Córtex)
+#   onnx_int8   -> mesmo MiniLM quantizado int8 rodando em ONNX Runtime na CPU
+#   ollama      -> servidor Ollama (nomic-embed-text)
+EMBEDDING_BACKEND = os.getenv("ARGUS_EMBEDDING_BACKEND", "huggingface")
+DEFAULT_MODELS = {
+    "huggingface": "sentence-transformers/all-MiniLM-L6-v2",
+    "onnx_int8": "sentence-transformers/all-MiniLM-L6-v2",
+    "ollama": "nomic-embed-text",
+}
+ONNX_FILE = os.getenv("ARGUS_ONNX_FILE", "onnx/model_qint8_avx2.onnx")  # Pesos int8 publicados no Hub
+ENCODE_BATCH_SIZE = 64
+EMBED_TIMEOUT_S = float(os.getenv("ARGUS_EMBED_TIMEOUT", "10"))  # Chamada ao Ollama travada não prende a thread
+
+# Cache em disco só de FRAGMENTOS (documentos); perguntas ficam num LRU em RAM
+# e nunca vão pro disco (senão toda pergunta do usuário ficaria gravada pra sempre)
+EMBEDDING_CACHE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embedding_cache.db")
+QUERY_CACHE_SIZE = 512
+SIGNATURE_FILE = "embedding_signature.json"      # Fica dentro de cada pasta de banco vetorial
+
+
+class EmbeddingDiskCache:
+    """Cache em SQLite: (assinatura do modelo, sha256 do texto) -> vetor float32."""
+    def __init__(self, db_path=EMBEDDING_CACHE_DB):
+        self.db_path = db_path
+        self.conn = None
+        self.cursor = None
+        self.lock = threading.Lock()
+
+    def _conectar(self):
+        """Abre o SQLite no primeiro uso (importar o provedor não cria arquivo nenhum). Chamar com o lock."""
+        if self.conn is not None:
+            return
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                assinatura TEXT,
+                texto_hash TEXT,
+                vetor BLOB,
+                PRIMARY KEY (assinatura, texto_hash)
+            )
+        ''')
+        self.conn.commit()
+
+    def buscar(self, assinatura, hashes):
+        encontrados = {}
+        with self.lock:
+            self._conectar()
+            for i in range(0, len(hashes), 500):  # Limite de parâmetros do SQLite
+                lote = hashes[i:i + 500]
+                marcadores = ",".join("?" * len(lote))
+                self.cursor.execute(
+                    f"SELECT texto_hash, vetor FROM embeddings WHERE assinatura = ? AND texto_hash IN ({marcadores})",
+                    (assinatura, *lote)
+                )
+                for texto_hash, blob in self.cursor.fetchall():
+                    encontrados[texto_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return encontrados
+
+    def guardar(self, assinatura, itens):
+        with self.lock:
+            self._conectar()
+            self.cursor.executemany(
+                "INSERT OR REPLACE INTO embeddings (assinatura, texto_hash, vetor) VALUES (?, ?, ?)",
+                [(assinatura, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in itens]
+            )
+            self.conn.commit()
+
+
+class OnnxInt8Embeddings(Embeddings):
+    """MiniLM quantizado (int8) no ONNX Runtime: menor, mais rápido e sem torch na inferência."""
+    def __init__(self, model_name, onnx_file=ONNX_FILE):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(
+            model_name, device="cpu", backend="onnx", model_kwargs={"file_name": onnx_file}
+        )
+
+    def embed_documents(self, texts):
+        return self.model.encode(list(texts), batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _criar_backend(backend, model):
+    if backend == "huggingface":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model, encode_kwargs={"batch_size": ENCODE_BATCH_SIZE})
+    if backend == "onnx_int8":
+        return OnnxInt8Embeddings(model)
+    if backend == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+        ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        return OllamaEmbeddings(model=model, base_url=ollama_host, client_kwargs={"timeout": EMBED_TIMEOUT_S})
+    raise ValueError(f"Backend de embeddings desconhecido: '{backend}'")
+
+
+class ArgusEmbeddings(Embeddings):
+    """
+    Fachada única (compatível com LangChain/Chroma).
+    Carrega o backend sob demanda e consulta o cache em disco antes de calcular
+    os fragmentos; perguntas só passam pelo LRU em RAM.
+    """
+    def __init__(self, backend=EMBEDDING_BACKEND, model=None, disk_cache=True):
+        self.backend = backend
+        self.model = model or DEFAULT_MODELS.get(backend, "")
+        self.assinatura = f"{self.backend}:{self.model}"
+        self.lock = threading.Lock()
+        self._modelo = None
+        self.cache = EmbeddingDiskCache() if disk_cache else None
+        self.perguntas = OrderedDict()  # LRU em RAM: texto da pergunta -> vetor
+        self.perguntas_lock = threading.Lock()  # Separada: self.lock fica presa enquanto o modelo carrega
+
+    @property
+    def carregado(self):
+        return self._modelo is not None
+
+    def carregar(self):
+        if self._modelo is None:
+            with self.lock:
+                if self._modelo is None:
+                    print(f"🧬 [EMBEDDINGS] Carregando backend '{self.assinatura}'...")
+                    self._modelo = _criar_backend(self.backend, self.model)
+        return self._modelo
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        if self.cache is None:
+            return self.carregar().embed_documents(texts)
+
+        hashes = [hashlib.sha256(t.encode("utf-8")).hexdigest() for t in texts]
+        encontrados = self.cache.buscar(self.assinatura, list(set(hashes)))
+
+        faltando = {}
+        for texto, texto_hash in zip(texts, hashes):
+            if texto_hash not in encontrados:
+                faltando[texto_hash] = texto
+        if faltando:
+            modelo = self.carregar()
+            ordem = list(faltando)
+            vetores = []
+            for i in range(0, len(ordem), ENCODE_BATCH_SIZE):
+                vetores.extend(modelo.embed_documents([faltando[h] for h in ordem[i:i + ENCODE_BATCH_SIZE]]))
+            novos = list(zip(ordem, vetores))
+            self.cache.guardar(self.assinatura, novos)
+            encontrados.update(novos)
+
+        return [list(encontrados[h]) for h in hashes]
+
+    def embed_query(self, text):
+        with self.perguntas_lock:
+            vetor = self.perguntas.get(text)
+            if vetor is not None:
+                self.perguntas.move_to_end(text)
+                return vetor
+        vetor = self.carregar().embed_query(text)
+        with self.perguntas_lock:
+            self.perguntas[text] = vetor
+            while len(self.perguntas) > QUERY_CACHE_SIZE:
+                self.perguntas.popitem(last=False)
+        return vetor
+
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+_por_assinatura = {}
+
+def get_embeddings():
+    """Provedor único do processo (o modelo em si só carrega no primeiro uso)."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = ArgusEmbeddings()
+    return _embeddings
+
+
+def get_embeddings_da_assinatura(assinatura):
+    """
+    Provedor para consultar um banco gravado com OUTRO backend (ex: coleções antigas
+    do trainer em 'ollama:nomic-embed-text'). Um por assinatura, também sob demanda.
+    """
+    padrao = get_embeddings()
+    if not assinatura or assinatura == padrao.assinatura:
+        return padrao
+    with _embeddings_lock:
+        if assinatura not in _por_assinatura:
+            backend, _, model = assinatura.partition(":")
+            if backend not in DEFAULT_MODELS:
+                raise ValueError(f"Backend de embeddings desconhecido: '{backend}'")
+            _por_assinatura[assinatura] = ArgusEmbeddings(backend=backend, model=model or None)
+        return _por_assinatura[assinatura]
+
+
+# ==========================================
+# 🔏 ASSINATURA DO ESPAÇO VETORIAL
+# ==========================================
+# Cada banco guarda qual backend gerou seus vetores. Trocar de backend exige
+# reindexar: nunca misturamos vetores de modelos diferentes na mesma coleção.
+def ler_assinatura(store_dir, colecao, padrao=None):
+    path = os.path.join(store_dir, SIGNATURE_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get(colecao, padrao)
+    except (OSError, ValueError):
+        return padrao
+
+
+def gravar_assinatura(store_dir, colecao, assinatura):
+    path = os.path.join(store_dir, SIGNATURE_FILE)
+    dados = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except (OSError, ValueError):
+        pass
+    dados[colecao] = assinatura
+    os.makedirs(store_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=1)
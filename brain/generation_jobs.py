@@ -0,0 +1,191 @@
+import time
+import threading
+import itertools
+from collections import OrderedDict
+
+# ==========================================
+# 🧾 JOBS DE GERAÇÃO (CANCELÁVEIS)
+# ==========================================
+# Cada resposta (chat, plano, análise de tela) vira um job com id. Mensagem nova
+# da mesma sessão SUBSTITUI o job de chat em andamento: a geração é cancelada
+# (para de gastar cota), a fala é interrompida e tudo que ainda chegar do job
+# velho é descartado (no servidor pelo callback e no navegador pelo id do job).
+# Planos não são substituídos por uma conversa nova (só pelo botão de cancelar).
+# Uma geração pode ter vários jobs assistindo (caronas do single-flight): parar um
+# job só solta ele; a geração só é cancelada quando o último job dela para.
+MAX_HISTORY = 200   # Jobs terminados guardados para consulta
+
+
+class Job:
+    def __init__(self, job_id, sessao, tipo, substituivel):
+        self.id = job_id
+        self.sessao = sessao
+        self.tipo = tipo
+        self.substituivel = substituivel
+        self.estado = "pendente"   # pendente -> gerando -> concluido | falhou | cancelado | substituido
+        self.criado_em = time.time()
+        self.fim = None
+        self.tokens = 0
+        self.descartados = 0       # Tokens que chegaram depois do cancelamento
+        self.falou = False         # Mandou frase pro TTS (cancelar precisa calar a voz)
+        self.geracao = None
+        self.soltar = lambda geracao: geracao.cancelar()  # O registro troca pela contagem de jobs
+        self.anteriores = []       # Substituição adiada (ver JobRegistry.novo(adiar=True))
+        self.lock = threading.Lock()
+        self._parado = threading.Event()
+
+    @property
+    def ativo(self):
+        return not self._parado.is_set()
+
+    def vincular(self, geracao):
+        """Liga o GeracaoStream ao job (job já cancelado solta a geração na hora)."""
+        if not self._ligar(geracao):
+            self.soltar(geracao)
+
+    def _ligar(self, geracao):
+        with self.lock:
+            self.geracao = geracao
+            if self.ativo:
+                self.estado = "gerando"
+            return self.ativo
+
+    def aceitar(self, token):
+        """Os callbacks perguntam antes de emitir/falar: False = token atrasado, descarta."""
+        if self.ativo:
+            self.tokens += 1
+            return True
+        self.descartados += 1
+        return False
+
+    def _parar(self, estado):
+        with self.lock:
+            if not self.ativo:
+                return False
+            self._parado.set()
+            self.estado = estado
+            self.fim = time.time()
+            geracao = self.geracao
+        if geracao is not None and estado in ("cancelado", "substituido"):
+            self.soltar(geracao)
+        return True
+
+    def resumo(self):
+        fim = self.fim or time.time()
+        return {"id": self.id, "sessao": self.sessao, "tipo": self.tipo, "estado": self.estado,
+                "tokens": self.tokens, "descartados": self.descartados,
+                "duracao_ms": round((fim - self.criado_em) * 1000)}
+
+
+class JobRegistry:
+    def __init__(self, ao_cancelar=None):
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()    # id -> Job (ativos + histórico recente)
+        self.ao_cancelar = ao_cancelar  # Callable(job) depois de cancelar (ex: calar o TTS)
+        self._ids = itertools.count(1)
+        self.contadores = {"criados": 0, "concluidos": 0, "falhos": 0, "cancelados": 0, "substituidos": 0}
+
+    def novo(self, sessao, tipo="chat", substituivel=True, adiar=False):
+        """
+        Cria o job e substitui os jobs substituíveis da mesma sessão que ainda estão rodando.
+        adiar=True: os anteriores só são substituídos em assumir(job), depois que o job
+        novo já se ligou à geração que vai assistir (reenvio da mesma pergunta pega carona
+        na geração do anterior, que não pode ser cancelada no meio do caminho).
+        """
+        with self.lock:
+            job = Job(f"{tipo}-{next(self._ids)}", sessao, tipo, substituivel)
+            job.soltar = self._soltar_geracao
+            anteriores = [j for j in self.jobs.values() if j.sessao == sessao and j.ativo and j.substituivel]
+            self.jobs[job.id] = job
+            self.contadores["criados"] += 1
+            self._podar()
+        if substituivel:
+            job.anteriores = anteriores
+            if not adiar:
+                self.assumir(job)
+        return job
+
+    def assumir(self, job):
+        """Substitui os jobs que o job encontrou rodando na sessão quando nasceu (só uma vez)."""
+        with self.lock:
+            anteriores, job.anteriores = job.anteriores, []
+        for anterior in anteriores:
+            self._interromper(anterior, "substituido")
+
+    def cancelar_sessao(self, sessao):
+        """Botão de cancelar: para tudo que a sessão tem rodando. Devolve quantos jobs parou."""
+        with self.lock:
+            ativos = [j for j in self.jobs.values() if j.sessao == sessao and j.ativo]
+        return sum(self._interromper(job, "cancelado") for job in ativos)
+
+    def cancelar(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return bool(job) and self._interromper(job, "cancelado")
+
+    def vincular(self, geracao, *jobs_do_voo):
+        """Liga UMA geração a todos os jobs que assistem a ela (líder + caronas) antes de decidir se ela segue."""
+        for job in jobs_do_voo:
+            job._ligar(geracao)
+        self._soltar_geracao(geracao)
+
+    def _soltar_geracao(self, geracao):
+        """Job parou: cancela a geração só se nenhum outro job ativo ainda assiste a ela."""
+        with self.lock:
+            em_uso = any(j.ativo and j.geracao is geracao for j in self.jobs.values())
+        if not em_uso:
+            geracao.cancelar()
+
+    def _interromper(self, job, estado):
+        if not job._parar(estado):
+            return False
+        with self.lock:
+            self.contadores["cancelados" if estado == "cancelado" else "substituidos"] += 1
+        print(f"✋ [JOBS] {job.id} {estado} ({job.tokens} tokens entregues).")
+        if self.ao_cancelar:
+            try:
+                self.ao_cancelar(job)
+            except Exception as e:
+                print(f"⚠️ [JOBS] Falha ao encerrar {job.id}: {e}")
+        return True
+
+    def concluir(self, job, falhou=False):
+        """Fim normal do job (não faz nada se ele já foi cancelado/substituído)."""
+        if job._parar("falhou" if falhou else "concluido"):
+            with self.lock:
+                self.contadores["falhos" if falhou else "concluidos"] += 1
+
+    def _podar(self):
+        """Descarta os terminados mais antigos além de MAX_HISTORY (chamar com o lock)."""
+        excesso = len(self.jobs) - MAX_HISTORY
+        for job_id in [i for i, j in self.jobs.items() if not j.ativo][:max(excesso, 0)]:
+            del self.jobs[job_id]
+
+    def consultar(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job.resumo() if job else None
+
+    def listar(self, sessao=None, limite=20):
+        with self.lock:
+            jobs = [j for j in self.jobs.values() if sessao is None or j.sessao == sessao]
+        return [j.resumo() for j in reversed(jobs[-limite:])]
+
+    def stats(self):
+        with self.lock:
+            dados = dict(self.contadores)
+            dados["ativos"] = sum(1 for j in self.jobs.values() if j.ativo)
+            dados["tokens_descartados"] = sum(j.descartados for j in self.jobs.values())
+        return dados
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+def get_jobs(ao_cancelar=None):
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = JobRegistry(ao_cancelar)
+    return _jobs
@@ -0,0 +1,448 @@
+import os
+import re
+import gc
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+
+# Permite rodar direto (python brain/index_maintenance.py) importando os módulos da raiz
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from langchain_core.documents import Document
+from brain import memory_core, ingest_pipeline, embedding_provider, knowledge_router, personas
+from brain.lexical_index import LexicalIndex
+from brain.vector_store import MmapVectorStore
+
+# ==========================================
+# 🧹 MANUTENÇÃO DOS ÍNDICES
+# ==========================================
+# Uso (com o Argus DESLIGADO: VACUUM e troca de pastas precisam de acesso exclusivo):
+#   python brain/index_maintenance.py stats [--json]
+#   python brain/index_maintenance.py vacuum
+#   python brain/index_maintenance.py limpar [--aplicar] [--remover-colecoes]
+#   python brain/index_maintenance.py reconstruir --backend onnx_int8 --chunk-size 800
+#
+# "limpar" sem --aplicar só mostra o que seria removido.
+# "reconstruir" monta o Córtex numa pasta de obra ao lado e só troca no final;
+# se for interrompido, rodar de novo continua de onde parou.
+LEGACY_DIR = "chroma_db"  # Banco antigo, ninguém mais lê
+STORES = [
+    (memory_core.STORE_DIRS["chroma"], "chroma", memory_core.LEGACY_SIGNATURE),
+    (memory_core.STORE_DIRS["mmap"], "mmap", memory_core.LEGACY_SIGNATURE),
+    (knowledge_router.LOCAL_DB_DIR, "chroma", knowledge_router.LEGACY_SIGNATURE),
+    (LEGACY_DIR, "chroma", None),
+]
+SQLITE_CACHES = [embedding_provider.EMBEDDING_CACHE_DB, "semantic_cache.db"]
+SCAN_PAGE = 1000            # Documentos lidos por página ao procurar duplicatas
+REBUILD_FILES_PER_ROUND = 20  # Arquivos por rodada antes de salvar o progresso
+REBUILD_SUFFIX = ".reconstrucao"
+BACKUP_SUFFIX = ".antigo_"
+PROGRESS_FILE = "reconstrucao.json"
+SEGMENT_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def tamanho(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for raiz, _, arquivos in os.walk(path):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except OSError:
+                pass
+    return total
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def _colecoes_em_uso():
+    usadas = {memory_core.COLLECTION_NAME}
+    for brain in personas.BRAINS.values():
+        usadas.update(brain.get("collections", []))
+    return usadas
+
+
+def _segmentos(store_dir):
+    """{id_do_segmento_vetorial: id_da_coleção} direto do SQLite do Chroma (só leitura)."""
+    path = os.path.join(store_dir, "chroma.sqlite3")
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return dict(conn.execute("SELECT id, collection FROM segments WHERE scope = 'VECTOR'").fetchall())
+    finally:
+        conn.close()
+
+
+def _soltar_chroma():
+    """Fecha os clientes em cache do Chroma (no Windows não dá pra mexer nos arquivos abertos)."""
+    SharedSystemClient.clear_system_cache()
+    gc.collect()
+
+
+def _colecoes(client):
+    # chromadb >= 0.6 devolve objetos Collection; versões antigas, nomes
+    return [client.get_collection(getattr(c, "name", c)) for c in client.list_collections()]
+
+
+def _varrer_textos(colecao):
+    """Gera (id, texto, metadados) de uma coleção do Chroma, página por página."""
+    offset = 0
+    while True:
+        pagina = colecao.get(include=["documents", "metadatas"], limit=SCAN_PAGE, offset=offset)
+        if not pagina["ids"]:
+            return
+        yield from zip(pagina["ids"], pagina["documents"], pagina["metadatas"])
+        offset += len(pagina["ids"])
+
+
+def _coletando_ids(itens, ids):
+    """Repassa os itens de _varrer_textos guardando os ids vistos (a varredura só passa uma vez)."""
+    for item in itens:
+        ids.add(item[0])
+        yield item
+
+
+def _duplicatas(itens):
+    """
+    Devolve (total, ids_a_remover). Duplicata = mesmo texto do mesmo arquivo (o mesmo trecho
+    em dois arquivos fica: cada cópia tem o seu 'source'). Fica o id endereçado, ou o primeiro visto.
+    """
+    por_chave = {}
+    total = 0
+    for chunk_id, texto, meta in itens:
+        total += 1
+        chave = ingest_pipeline.id_fragmento(texto or "", (meta or {}).get("file_hash"))
+        por_chave.setdefault(chave, []).append(chunk_id)
+    remover = []
+    for chave, ids in por_chave.items():
+        if len(ids) > 1:
+            manter = chave if chave in ids else ids[0]
+            remover.extend(i for i in ids if i != manter)
+    return total, remover
+
+
+# ==========================================
+# 📊 STATS
+# ==========================================
+def coletar_stats():
+    usadas = _colecoes_em_uso()
+    relatorio = []
+    for store_dir, backend, padrao in STORES:
+        if not os.path.exists(store_dir):
+            continue
+        item = {"store": store_dir, "backend": backend, "bytes": tamanho(store_dir), "colecoes": []}
+
+        if backend == "mmap":
+            store = MmapVectorStore(store_dir, None)
+            stats = store.stats()
+            vivos = [(store.ids[r], store.textos[r], store.metas[r]) for r in store.linha_por_id.values()]
+            total, remover = _duplicatas(vivos)
+            item["colecoes"].append({
+                "nome": memory_core.COLLECTION_NAME,
+                "fragmentos": stats["vivas"],
+                "lapides": stats["linhas"] - stats["vivas"],
+                "dim": stats["dim"],
+                "bytes": stats["bytes"],
+                "duplicatas": round(len(remover) / total, 4) if total else 0.0,
+                "assinatura": embedding_provider.ler_assinatura(store_dir, memory_core.COLLECTION_NAME, padrao),
+                "em_uso": True,
+            })
+        else:
+            segmentos = _segmentos(store_dir)
+            client = chromadb.PersistentClient(path=store_dir)
+            for colecao in _colecoes(client):
+                amostra = colecao.get(limit=1, include=["embeddings"])
+                embeddings = amostra.get("embeddings")
+                dim = len(embeddings[0]) if embeddings is not None and len(embeddings) else None
+                total, remover = _duplicatas(_varrer_textos(colecao))
+                pastas = [s for s, c in segmentos.items() if c == str(colecao.id)]
+                item["colecoes"].append({
+                    "nome": colecao.name,
+                    "fragmentos": colecao.count(),
+                    "dim": dim,
+                    "bytes": sum(tamanho(os.path.join(store_dir, s)) for s in pastas),
+                    "duplicatas": round(len(remover) / total, 4) if total else 0.0,
+                    "assinatura": embedding_provider.ler_assinatura(store_dir, colecao.name, padrao),
+                    "em_uso": store_dir != LEGACY_DIR and colecao.name in usadas,
+                })
+            item["sqlite_bytes"] = tamanho(os.path.join(store_dir, "chroma.sqlite3"))
+        relatorio.append(item)
+    _soltar_chroma()
+    return relatorio
+
+
+def cmd_stats(args):
+    relatorio = coletar_stats()
+    if args.json:
+        print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        return
+    for item in relatorio:
+        print(f"\n🗄️ {item['store']} ({item['backend']}) - {_mb(item['bytes'])}")
+        if "sqlite_bytes" in item:
+            print(f"   SQLite: {_mb(item['sqlite_bytes'])}")
+        for col in item["colecoes"]:
+            extra = f" | lápides {col['lapides']}" if "lapides" in col else ""
+            uso = "" if col["em_uso"] else " | ⚠️ ninguém consulta"
+            print(f"   - {col['nome']}: {col['fragmentos']} fragmentos | dim {col['dim']} | {_mb(col['bytes'])} | "
+                  f"duplicatas {col['duplicatas']:.1%}{extra} | {col['assinatura']}{uso}")
+
+
+# ==========================================
+# 🗜️ VACUUM
+# ==========================================
+def _vacuum_sqlite(path):
+    conn = sqlite3.connect(path, timeout=5)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def cmd_vacuum(args):
+    for store_dir, backend, _ in STORES:
+        if not os.path.exists(store_dir):
+            continue
+        antes = tamanho(store_dir)
+        try:
+            if backend == "mmap":
+                MmapVectorStore(store_dir, None).compactar()
+            else:
+                client = chromadb.PersistentClient(path=store_dir)
+                try:
+                    # Descarta o log (WAL) já aplicado nos segmentos e depois compacta o SQLite
+                    from chromadb.db.impl.sqlite import SqliteDB
+                    db = client._system.instance(SqliteDB)
+                    for colecao in _colecoes(client):
+                        db.purge_log(colecao.id)
+                    db.vacuum()
+                except (ImportError, AttributeError):
+                    _soltar_chroma()
+                    _vacuum_sqlite(os.path.join(store_dir, "chroma.sqlite3"))
+                _soltar_chroma()
+        except Exception as e:
+            print(f"❌ [VACUUM] {store_dir}: {e} (o Argus está aberto?)")
+            continue
+        print(f"🗜️ [VACUUM] {store_dir}: {_mb(antes)} -> {_mb(tamanho(store_dir))}")
+
+    for path in SQLITE_CACHES:
+        if os.path.exists(path):
+            antes = tamanho(path)
+            try:
+                _vacuum_sqlite(path)
+                print(f"🗜️ [VACUUM] {path}: {_mb(antes)} -> {_mb(tamanho(path))}")
+            except sqlite3.Error as e:
+                print(f"❌ [VACUUM] {path}: {e}")
+
+
+# ==========================================
+# 🧽 LIMPEZA (ÓRFÃOS, DUPLICATAS, COLEÇÕES MORTAS)
+# ==========================================
+def cmd_limpar(args):
+    aplicar = args.aplicar
+    prefixo = "🗑️" if aplicar else "🔎 (simulação)"
+    usadas = _colecoes_em_uso()
+
+    for store_dir, backend, _ in STORES:
+        if not os.path.exists(store_dir):
+            continue
+
+        if backend == "mmap":
+            for nome in os.listdir(store_dir):
+                if nome.endswith(".tmp"):  # Sobra de uma compactação interrompida
+                    print(f"{prefixo} {store_dir}/{nome}: arquivo temporário órfão")
+                    if aplicar:
+                        os.remove(os.path.join(store_dir, nome))
+            continue
+
+        # 1. Pastas de segmento que o SQLite não conhece mais
+        segmentos = _segmentos(store_dir)
+        for nome in sorted(os.listdir(store_dir)):
+            path = os.path.join(store_dir, nome)
+            if os.path.isdir(path) and SEGMENT_RE.match(nome) and nome not in segmentos:
+                print(f"{prefixo} {path}: segmento órfão ({_mb(tamanho(path))})")
+                if aplicar:
+                    shutil.rmtree(path)
+
+        client = chromadb.PersistentClient(path=store_dir)
+        for colecao in _colecoes(client):
+            # 2. Coleções que nenhuma persona consulta
+            if store_dir == knowledge_router.LOCAL_DB_DIR and colecao.name not in usadas:
+                print(f"{prefixo} {store_dir}/{colecao.name}: coleção sem persona ({colecao.count()} fragmentos)")
+                if aplicar and args.remover_colecoes:
+                    client.delete_collection(colecao.name)
+                    continue
+                elif aplicar:
+                    print("   (use --remover-colecoes para apagar)")
+
+            # 3. O mesmo texto gravado várias vezes (treinos repetidos com IDs aleatórios)
+            vivos = set()
+            total, remover = _duplicatas(_coletando_ids(_varrer_textos(colecao), vivos))
+            if remover:
+                print(f"{prefixo} {store_dir}/{colecao.name}: {len(remover)}/{total} fragmentos duplicados")
+                if aplicar:
+                    for i in range(0, len(remover), SCAN_PAGE):
+                        colecao.delete(ids=remover[i:i + SCAN_PAGE])
+
+            # 4. BM25 do Córtex: sai o que saiu do banco (senão a busca híbrida devolve ids mortos)
+            lexico_path = os.path.join(store_dir, memory_core.LEXICAL_INDEX_NAME)
+            if colecao.name == memory_core.COLLECTION_NAME and os.path.exists(lexico_path):
+                lexical = LexicalIndex(lexico_path)
+                orfaos = lexical.ids() - (vivos - set(remover))
+                if orfaos:
+                    print(f"{prefixo} {lexico_path}: {len(orfaos)} fragmentos sem par no banco vetorial")
+                    if aplicar:
+                        lexical.remover(orfaos)
+                        lexical.salvar()
+        _soltar_chroma()
+
+    if LEGACY_DIR and os.path.exists(LEGACY_DIR):
+        print(f"ℹ️ '{LEGACY_DIR}' não é lido por ninguém ({_mb(tamanho(LEGACY_DIR))}). Apague à mão se não precisar.")
+    for nome in sorted(os.listdir(".")):
+        if BACKUP_SUFFIX in nome and os.path.isdir(nome):
+            print(f"ℹ️ Backup de reconstrução: '{nome}' ({_mb(tamanho(nome))}). Apague à mão depois de validar.")
+    if aplicar:
+        memory_core._marcar_escrita()
+
+
+# ==========================================
+# 🔁 RECONSTRUÇÃO (RETOMÁVEL)
+# ==========================================
+def _salvar_json(path, dados):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def cmd_reconstruir(args):
+    embedding = embedding_provider.ArgusEmbeddings(backend=args.backend, model=args.modelo)
+    config = {
+        "embedding": embedding.assinatura,
+        "store": args.store,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+    }
+    destino = memory_core.STORE_DIRS[args.store]
+    obra = destino + REBUILD_SUFFIX
+    progresso_path = os.path.join(obra, PROGRESS_FILE)
+
+    progresso = None
+    if os.path.exists(progresso_path):
+        with open(progresso_path, "r", encoding="utf-8") as f:
+            progresso = json.load(f)
+        if progresso.get("config") != config:
+            print("⚠️ [RECONSTRUÇÃO] Obra anterior com outra configuração. Começando do zero.")
+            progresso = None
+    if progresso is None:
+        if os.path.exists(obra):
+            shutil.rmtree(obra)
+        os.makedirs(obra)
+        progresso = {"config": config, "files": {}}
+        _salvar_json(progresso_path, progresso)
+    else:
+        print(f"↩️ [RECONSTRUÇÃO] Retomando: {len(progresso['files'])} arquivos já feitos.")
+
+    # Fonte: tudo que está no disco (arquivo morto + caixa de entrada), sem cópias repetidas
+    os.makedirs(memory_core.PROCESSED_DIR, exist_ok=True)
+    atuais, _ = memory_core._inventariar_arquivos(memory_core._carregar_manifesto())
+    pendentes = {h: p for h, p in atuais.items() if h not in progresso["files"]}
+    print(f"🔁 [RECONSTRUÇÃO] {len(atuais)} arquivos | {len(pendentes)} pendentes | {config}")
+
+    vector_db = memory_core.abrir_vector_store(obra, embedding, args.store)
+    lexical = LexicalIndex(os.path.join(obra, memory_core.LEXICAL_INDEX_NAME))
+    feitos = {c for info in progresso["files"].values() for c in info["chunks"]}
+
+    ordem = list(pendentes.items())
+    for inicio in range(0, len(ordem), REBUILD_FILES_PER_ROUND):
+        rodada = dict(ordem[inicio:inicio + REBUILD_FILES_PER_ROUND])
+        fragmentos, report = ingest_pipeline.executar_pipeline(
+            rodada, vector_db, feitos, args.chunk_size, args.chunk_overlap, ao_gravar=lexical.adicionar
+        )
+        if report.erros_escrita:
+            raise SystemExit(f"❌ [RECONSTRUÇÃO] Falha ao gravar: {report.erros_escrita[0]}. Rode de novo para retomar.")
+        for file_hash, path in rodada.items():
+            chunks = [chunk_id for chunk_id, _ in fragmentos.get(file_hash, [])]
+            feitos.update(chunks)
+            progresso["files"][file_hash] = {"path": path, "chunks": chunks, **memory_core._assinatura(path)}
+        lexical.salvar()
+        _salvar_json(progresso_path, progresso)  # Ponto de retomada
+        print(f"   ✅ {len(progresso['files'])}/{len(atuais)} arquivos")
+
+    # BM25 completo (uma retomada pode ter perdido lotes que não chegaram ao disco)
+    faltando = list(feitos - lexical.ids())
+    if faltando:
+        salvos = vector_db.get(ids=faltando, include=["documents", "metadatas"])
+        lexical.adicionar([
+            (chunk_id, Document(page_content=texto, metadata=meta or {}))
+            for chunk_id, texto, meta in zip(salvos["ids"], salvos["documents"], salvos["metadatas"])
+        ])
+    lexical.salvar()
+
+    embedding_provider.gravar_assinatura(obra, memory_core.COLLECTION_NAME, embedding.assinatura)
+    manifesto = {
+        "files": {h: info for h, info in progresso["files"].items() if h in atuais},
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "versao": 1,
+    }
+    _salvar_json(os.path.join(obra, os.path.basename(memory_core.MANIFEST_FILE)), manifesto)
+    os.remove(progresso_path)
+
+    # Troca: a pasta antiga vira backup, a obra vira o Córtex
+    del vector_db
+    _soltar_chroma()
+    if os.path.exists(destino):
+        backup = f"{destino}{BACKUP_SUFFIX}{int(time.time())}"
+        os.replace(destino, backup)
+        print(f"📦 [RECONSTRUÇÃO] Índice anterior guardado em '{backup}'.")
+    os.replace(obra, destino)
+    with open(os.path.join(destino, memory_core.VERSION_NAME), "w") as f:
+        f.write(str(time.time()))
+
+    print(f"💾 [RECONSTRUÇÃO] Córtex reconstruído em '{destino}' ({len(feitos)} fragmentos).")
+    if embedding.assinatura != memory_core.EMBEDDING_MODEL.assinatura:
+        print(f"⚠️ Defina ARGUS_EMBEDDING_BACKEND={args.backend} antes de abrir o Argus "
+              f"(senão a próxima ingestão reindexa com '{memory_core.EMBEDDING_MODEL.assinatura}').")
+    if args.store != memory_core.VECTOR_STORE_BACKEND:
+        print(f"⚠️ Defina ARGUS_VECTOR_STORE={args.store} para o Argus usar este índice.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção dos bancos vetoriais do Argus.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("stats", help="Fragmentos, tamanho, dimensão e duplicatas por coleção.")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("vacuum", help="Descarta o log já aplicado e compacta os SQLite/matrizes.")
+    p.set_defaults(func=cmd_vacuum)
+
+    p = sub.add_parser("limpar", help="Segmentos órfãos, duplicatas e coleções sem persona.")
+    p.add_argument("--aplicar", action="store_true", help="Sem isso, só simula.")
+    p.add_argument("--remover-colecoes", action="store_true", help="Também apaga coleções sem persona.")
+    p.set_defaults(func=cmd_limpar)
+
+    p = sub.add_parser("reconstruir", help="Reindexa o Córtex inteiro (retomável).")
+    p.add_argument("--backend", default=embedding_provider.EMBEDDING_BACKEND,
+                   choices=sorted(embedding_provider.DEFAULT_MODELS))
+    p.add_argument("--modelo", default=None)
+    p.add_argument("--store", default=memory_core.VECTOR_STORE_BACKEND, choices=sorted(memory_core.STORE_DIRS))
+    p.add_argument("--chunk-size", type=int, default=memory_core.CHUNK_SIZE)
+    p.add_argument("--chunk-overlap", type=int, default=memory_core.CHUNK_OVERLAP)
+    p.set_defaults(func=cmd_reconstruir)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
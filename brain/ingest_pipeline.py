@@ -0,0 +1,213 @@
+import os
+import time
+import queue
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_community.document_loaders import PyMuPDFLoader, TextLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# ==========================================
+# 🏭 PIPELINE DE INGESTÃO (PARALELO + LOTES)
+# ==========================================
+# Os leitores rodam num pool de THREADS, não de processos: no Windows o spawn
+# reimporta o __main__ (app.py) em cada filho, que subiria de novo voz, agenda,
+# vigia e threads de aquecimento. O ganho do paralelismo fica na E/S de disco
+# (a extração em Python ainda disputa o GIL), mas nada pesado é carregado duas vezes.
+CPU_COUNT = os.cpu_count() or 2
+PARSE_WORKERS = max(1, CPU_COUNT - 1)                        # Deixa um núcleo pro embedding
+EMBED_BATCH_SIZE = max(16, min(128, 16 * CPU_COUNT))         # Fragmentos por chamada de embedding
+QUEUE_MAX_BATCHES = 4                                        # Fila limitada (back-pressure)
+PROGRESS_INTERVAL = 5.0                                      # Segundos entre relatórios
+BACKGROUND_WORKERS = max(1, CPU_COUNT // 4)                  # Leitores quando roda em segundo plano
+BACKGROUND_NICE = 10                                         # Linux/macOS: "nice" da thread/processo
+
+
+def hash_texto(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def id_fragmento(texto, file_hash=None):
+    """ID do fragmento: conteúdo + arquivo de origem (o mesmo trecho em dois arquivos são dois
+    fragmentos, cada um com o seu 'source'). Sem file_hash: fragmento antigo, só o conteúdo."""
+    if not file_hash:
+        return hash_texto(texto)
+    return hash_texto(f"{file_hash}\0{texto}")
+
+
+def baixar_prioridade():
+    """Rebaixa a prioridade da thread atual (ingestão em segundo plano não disputa CPU com o chat)."""
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), -1)  # THREAD_PRIORITY_BELOW_NORMAL
+        else:
+            # No Linux o "nice" vale por thread (o id nativo é o da thread)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), BACKGROUND_NICE)
+    except Exception as e:
+        print(f"⚠️ [PIPELINE] Não consegui baixar a prioridade: {e}")
+
+
+def carregar_arquivo(path):
+    if path.lower().endswith(".pdf"):
+        loader = PyMuPDFLoader(path)
+    else:
+        loader = TextLoader(path, encoding="utf-8")
+
+    docs = []
+    for doc in loader.load():
+        # --- FILTRO DE CONTEÚDO VAZIO ---
+        if doc.page_content and len(doc.page_content.strip()) > 10:
+            docs.append(doc)
+    return docs
+
+
+def fragmentar_arquivo(path, file_hash, chunk_size, chunk_overlap):
+    """
+    Lê e quebra UM arquivo (roda numa thread do pool de leitores).
+    Devolve (file_hash, páginas, [(chunk_id, Document)], erro).
+    """
+    try:
+        documents = carregar_arquivo(path)
+    except Exception as e:
+        return file_hash, 0, [], str(e)
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    vistos = set()
+    for doc in text_splitter.split_documents(documents):
+        chunk_id = id_fragmento(doc.page_content, file_hash)
+        if chunk_id in vistos:
+            continue
+        vistos.add(chunk_id)
+        doc.metadata["file_hash"] = file_hash
+        doc.metadata["file_name"] = os.path.basename(path)
+        chunks.append((chunk_id, doc))
+    return file_hash, len(documents), chunks, None
+
+
+class IngestionReport:
+    """Contadores de progresso e vazão (páginas/s, fragmentos/s)."""
+    def __init__(self, total_arquivos):
+        self.total_arquivos = total_arquivos
+        self.arquivos = 0
+        self.paginas = 0
+        self.fragmentos = 0
+        self.gravados = 0
+        self.erros_escrita = []
+        self.inicio = time.time()
+        self.ultimo_print = self.inicio
+
+    def elapsed(self):
+        return max(time.time() - self.inicio, 1e-6)
+
+    def linha(self):
+        t = self.elapsed()
+        return (f"{self.arquivos}/{self.total_arquivos} arquivos | {self.paginas} pág ({self.paginas / t:.1f} pág/s) | "
+                f"{self.gravados}/{self.fragmentos} fragmentos gravados ({self.gravados / t:.1f} frag/s)")
+
+    def talvez_imprimir(self):
+        if time.time() - self.ultimo_print >= PROGRESS_INTERVAL:
+            self.ultimo_print = time.time()
+            print(f"   ⏱️ {self.linha()}")
+
+    def resumo(self):
+        return {
+            "arquivos": self.arquivos,
+            "paginas": self.paginas,
+            "fragmentos": self.fragmentos,
+            "gravados": self.gravados,
+            "segundos": round(self.elapsed(), 2),
+            "paginas_por_s": round(self.paginas / self.elapsed(), 2),
+            "fragmentos_por_s": round(self.gravados / self.elapsed(), 2),
+        }
+
+
+def _gravador(vector_db, fila, report, ao_gravar, baixa_prioridade=False):
+    """Thread consumidora: cada item da fila é um lote -> 1 embedding + 1 escrita."""
+    if baixa_prioridade:
+        baixar_prioridade()
+    while True:
+        lote = fila.get()
+        if lote is None:
+            break
+        if report.erros_escrita:
+            continue  # Já falhou: só esvazia a fila para o produtor não travar
+        try:
+            vector_db.add_documents([doc for _, doc in lote], ids=[chunk_id for chunk_id, _ in lote])
+            report.gravados += len(lote)
+            if ao_gravar:
+                ao_gravar(lote)
+        except Exception as e:
+            report.erros_escrita.append(str(e))
+
+
+def executar_pipeline(arquivos, vector_db, ids_existentes, chunk_size, chunk_overlap,
+                      workers=PARSE_WORKERS, batch_size=EMBED_BATCH_SIZE, ao_gravar=None,
+                      baixa_prioridade=False):
+    """
+    arquivos: {file_hash: caminho} a processar.
+    ao_gravar: callback opcional chamado com cada lote já gravado (ex: índice léxico).
+    baixa_prioridade: leitores e gravador rodam rebaixados (ingestão em segundo plano).
+    Lê os PDFs em paralelo (pool de threads), manda os fragmentos inéditos por
+    uma fila limitada para a thread de embedding/gravação e grava em lotes.
+    Devolve ({file_hash: [(chunk_id, Document)]}, IngestionReport).
+    """
+    report = IngestionReport(len(arquivos))
+    fragmentos = {}
+    if not arquivos:
+        return fragmentos, report
+
+    fila = queue.Queue(maxsize=QUEUE_MAX_BATCHES)
+    gravador = threading.Thread(
+        target=_gravador, args=(vector_db, fila, report, ao_gravar, baixa_prioridade), daemon=True
+    )
+    gravador.start()
+
+    agendados = set(ids_existentes)
+    pendentes = []
+
+    def processar_resultado(file_hash, paginas, chunks, erro):
+        path = arquivos[file_hash]
+        report.arquivos += 1
+        report.paginas += paginas
+        fragmentos[file_hash] = chunks
+        if erro:
+            print(f"⚠️ Erro ao ler arquivo {os.path.basename(path)}: {erro}")
+        elif not chunks:
+            print(f"⚠️ Aviso: '{os.path.basename(path)}' não gerou texto legível (imagem/scan?).")
+
+        for chunk_id, doc in chunks:
+            if chunk_id in agendados:
+                continue
+            agendados.add(chunk_id)
+            pendentes.append((chunk_id, doc))
+            report.fragmentos += 1
+            if len(pendentes) >= batch_size:
+                fila.put(list(pendentes))  # Bloqueia se o embedding estiver atrasado
+                pendentes.clear()
+        report.talvez_imprimir()
+
+    try:
+        if workers > 1 and len(arquivos) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(arquivos)), thread_name_prefix="ingestao-leitor",
+                                    initializer=baixar_prioridade if baixa_prioridade else None) as pool:
+                futures = [
+                    pool.submit(fragmentar_arquivo, path, file_hash, chunk_size, chunk_overlap)
+                    for file_hash, path in arquivos.items()
+                ]
+                for future in as_completed(futures):
+                    processar_resultado(*future.result())
+        else:
+            for file_hash, path in arquivos.items():
+                processar_resultado(*fragmentar_arquivo(path, file_hash, chunk_size, chunk_overlap))
+
+        if pendentes:
+            fila.put(list(pendentes))
+    finally:
+        fila.put(None)
+        gravador.join()
+
+    print(f"📈 [PIPELINE] {report.linha()} em {report.elapsed():.1f}s")
+    return fragmentos, report
@@ -0,0 +1,217 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from brain import memory_core, ingest_pipeline, embedding_provider
+from brain.lexical_index import fusao_rrf
+
+# ==========================================
+# 🧭 ROTEADOR DE CONHECIMENTO (POR PERSONA)
+# ==========================================
+# Cada persona (personas.json -> "collections") consulta as coleções treinadas
+# pelo testes/trainer.py em paralelo, junto com o Córtex do memory_core.
+LOCAL_DB_DIR = "chroma_db_local"
+CORTEX = "cortex"  # Coleção padrão do memory_core (chroma_db_permanent)
+# Coleções treinadas antes da assinatura usaram o Ollama (nomic-embed-text)
+LEGACY_SIGNATURE = "ollama:nomic-embed-text"
+
+ROUTER_BUDGET_S = float(os.getenv("ARGUS_RAG_BUDGET", "1.5"))  # Tempo máximo do RAG por turno
+ROUTER_WORKERS = 8
+RETRY_MISSING_S = 60  # Coleção ausente/quebrada só é testada de novo depois disso
+# Similaridade de cosseno mínima para um fragmento de coleção treinada entrar no merge
+# (mesma régua para todas as coleções: coleção sem nada relevante não manda nada)
+MIN_SIMILARITY = float(os.getenv("ARGUS_RAG_MIN_SIM", "0.3"))
+
+
+class KnowledgeRouter:
+    """
+    Faz o fan-out da pergunta para as coleções da persona, cada uma numa thread.
+    Coleção lenta estoura o orçamento e é ignorada; ausente é pulada.
+    O merge é por posição (RRF), depois de um corte global de similaridade.
+    """
+    def __init__(self, budget=ROUTER_BUDGET_S):
+        self.budget = budget
+        self.executor = ThreadPoolExecutor(max_workers=ROUTER_WORKERS, thread_name_prefix="rag")
+        self.lock = threading.Lock()
+        self.stores = {}
+        self.indisponiveis = {}  # nome -> timestamp da última falha
+        self.client = None
+        self.embeddings = embedding_provider.get_embeddings()
+
+    def colecoes_da_persona(self, brain_data):
+        colecoes = list((brain_data or {}).get("collections", []))
+        if CORTEX not in colecoes:
+            colecoes.append(CORTEX)
+        return colecoes
+
+    def _get_store(self, nome):
+        """Abre a coleção treinada uma vez (sem criar coleção vazia se ela não existir)."""
+        with self.lock:
+            if nome in self.stores:
+                return self.stores[nome]
+
+            falha = self.indisponiveis.get(nome)
+            if falha and time.time() - falha < RETRY_MISSING_S:
+                return None
+
+            try:
+                if not os.path.exists(LOCAL_DB_DIR):
+                    raise FileNotFoundError(LOCAL_DB_DIR)
+                if self.client is None:
+                    self.client = chromadb.PersistentClient(path=LOCAL_DB_DIR)
+                self.client.get_collection(nome)  # Levanta erro se não existir
+                # Cada coleção é consultada com o modelo que a gerou (nunca mistura espaços vetoriais)
+                assinatura = embedding_provider.ler_assinatura(LOCAL_DB_DIR, nome, padrao=LEGACY_SIGNATURE)
+                embeddings = embedding_provider.get_embeddings_da_assinatura(assinatura)
+                if embeddings is not self.embeddings:
+                    print(f"ℹ️ [ROTEADOR] Coleção '{nome}' treinada com '{assinatura}': consultada com esse modelo.")
+                store = Chroma(client=self.client, collection_name=nome, embedding_function=embeddings)
+                espaco = (store._collection.metadata or {}).get("hnsw:space", "l2")
+            except Exception as e:
+                print(f"⚠️ [ROTEADOR] Coleção '{nome}' indisponível: {e}")
+                self.indisponiveis[nome] = time.time()
+                return None
+
+            self.stores[nome] = (store, embeddings, espaco)
+            return self.stores[nome]
+
+    @staticmethod
+    def _vetor_da_pergunta(embeddings, query, vetores):
+        """Embedding da pergunta UMA vez por modelo neste turno (as coleções do mesmo modelo esperam a primeira)."""
+        with vetores["lock"]:
+            item = vetores.setdefault(embeddings.assinatura, [threading.Lock(), None])
+        with item[0]:
+            if item[1] is None:
+                item[1] = embeddings.embed_query(query)
+            return item[1]
+
+    def _buscar_colecao(self, nome, query, k, vetores):
+        """Devolve [(Document, similaridade ou None)] de UMA coleção, já em ordem."""
+        if nome == CORTEX:
+            # O Córtex já vem ordenado (RRF) e sem distância: entra só pela posição
+            return [(doc, None) for doc in memory_core.buscar_memoria(query, k=k)]
+
+        aberta = self._get_store(nome)
+        if aberta is None:
+            return []
+        store, embeddings, espaco = aberta
+        vetor = self._vetor_da_pergunta(embeddings, query, vetores)
+        resultados = store.similarity_search_by_vector_with_relevance_scores(vetor, k=k)
+        # Distância crua -> cosseno (vetores unitários), a mesma régua em todas as coleções
+        fator = 0.5 if espaco == "l2" else 1.0  # l2 do Chroma é a distância ao quadrado
+        relevantes = []
+        for doc, distancia in resultados:
+            similaridade = 1.0 - fator * distancia
+            if similaridade >= MIN_SIMILARITY:
+                relevantes.append((doc, similaridade))
+        return relevantes
+
+    def buscar(self, query, brain_data=None, k=3, budget=None):
+        budget = self.budget if budget is None else budget
+        inicio = time.time()
+
+        colecoes = self.colecoes_da_persona(brain_data)
+        vetores = {"lock": threading.Lock()}
+        futures = {
+            nome: self.executor.submit(self._buscar_colecao, nome, query, k, vetores)
+            for nome in colecoes
+        }
+        concluidos, atrasados = wait(futures.values(), timeout=budget)
+
+        for nome, future in futures.items():
+            if future in atrasados:
+                # Só desiste do que ainda está na fila; o que já roda termina sozinho
+                # (as chamadas ao Ollama têm timeout no cliente, ARGUS_EMBED_TIMEOUT)
+                future.cancel()
+                print(f"⏱️ [ROTEADOR] '{nome}' estourou o orçamento de {budget:.1f}s. Ignorada neste turno.")
+
+        # Merge por posição (RRF) na ordem da persona; o mesmo texto em duas coleções soma os votos
+        por_chave = {}
+        rankings = []
+        for nome, future in futures.items():
+            if future not in concluidos:
+                continue
+            ranking = []
+            try:
+                for doc, similaridade in future.result():
+                    chave = ingest_pipeline.hash_texto(doc.page_content)
+                    if chave in ranking:
+                        continue
+                    ranking.append(chave)
+                    if chave in por_chave:
+                        continue
+                    # Cópia: os documentos do Córtex vivem no cache LRU do recuperador
+                    meta = {**doc.metadata, "colecao": nome}
+                    if similaridade is not None:
+                        meta["similaridade"] = round(similaridade, 4)
+                    por_chave[chave] = Document(id=doc.id, page_content=doc.page_content, metadata=meta)
+            except Exception as e:
+                print(f"⚠️ [ROTEADOR] Erro na coleção '{nome}': {e}")
+            rankings.append(ranking)
+
+        docs = []
+        for posicao, chave in enumerate(fusao_rrf(rankings, k=k)):
+            doc = por_chave[chave]
+            doc.metadata["score"] = round(1.0 / (1 + posicao), 4)  # Relevância para o MMR do context_builder
+            docs.append(doc)
+
+        print(f"🧭 [ROTEADOR] {len(concluidos)}/{len(futures)} coleções em {(time.time() - inicio) * 1000:.0f}ms.")
+        return docs
+
+    def vetores_salvos(self, docs):
+        """
+        Vetores JÁ GRAVADOS dos candidatos (o MMR do context_builder não reembeda nada).
+        Devolve [(assinatura, vetor) ou None] na ordem dos docs; a assinatura diz
+        em que espaço vetorial o vetor está (coleções de modelos diferentes não se comparam).
+        """
+        vetores = [None] * len(docs)
+        por_colecao = {}
+        for i, doc in enumerate(docs):
+            if doc.id:
+                por_colecao.setdefault(doc.metadata.get("colecao"), []).append(i)
+
+        for nome, posicoes in por_colecao.items():
+            try:
+                if nome == CORTEX:
+                    store = memory_core.get_retriever()._get_db(esperar=False)
+                    assinatura = memory_core.ler_assinatura_cortex()
+                else:
+                    aberta = self._get_store(nome)
+                    store, embeddings, _ = aberta if aberta else (None, None, None)
+                    assinatura = embeddings.assinatura if embeddings else None
+                if store is None:
+                    continue
+                salvos = store.get(ids=[docs[i].id for i in posicoes], include=["embeddings"])
+                por_id = dict(zip(salvos["ids"], salvos["embeddings"]))
+                for i in posicoes:
+                    vetor = por_id.get(docs[i].id)
+                    if vetor is not None:
+                        vetores[i] = (assinatura, vetor)
+            except Exception as e:
+                print(f"⚠️ [ROTEADOR] Sem vetores salvos de '{nome}': {e}")
+        return vetores
+
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = KnowledgeRouter()
+    return _router
+
+
+def buscar_conhecimento(query, brain_data=None, k=3):
+    """Atalho usado pelo app.py: consulta as coleções da persona ativa."""
+    return get_router().buscar(query, brain_data, k=k)
+
+
+def vetores_salvos(docs):
+    """Atalho usado pelo app.py: vetores gravados dos candidatos, para o MMR."""
+    return get_router().vetores_salvos(docs)
@@ -0,0 +1,230 @@
+import os
+import time
+import threading
+from brain import memory_core, ingest_pipeline
+
+# ==========================================
+# 👁️ VIGIA DA CAIXA DE ENTRADA (INDEXAÇÃO AO VIVO)
+# ==========================================
+# Observa o knowledge_base e roda a ingestão incremental do memory_core sozinho,
+# em segundo plano e com prioridade baixa. As buscas continuam respondendo pelo
+# índice atual enquanto a ingestão grava (mesma instância do recuperador).
+# Só a caixa de entrada e o 'documentos_lidos' contam: as subpastas de persona
+# (knowledge_base/<brain_id>, do trainer) não são do Córtex e ficam de fora.
+#
+# Usa o watchdog (eventos do sistema de arquivos) quando instalado; sem ele,
+# cai para varredura periódica (tamanho + data de modificação).
+WATCHER_ENABLED = os.getenv("ARGUS_WATCHER", "1") != "0"
+DEBOUNCE_S = float(os.getenv("ARGUS_WATCHER_DEBOUNCE", "3"))  # Espera o arquivo "sossegar" (cópia de PDF grande)
+POLL_INTERVAL_S = 5.0      # Intervalo da varredura quando não há watchdog
+RETRY_AFTER_ERROR_S = 60   # Falhou? Tenta de novo depois disso (mesmo sem evento novo)
+RECENT_FILES = 20          # Quantos "últimos indexados" o status mostra
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.enfileirar(path)
+
+
+class KnowledgeWatcher:
+    def __init__(self, pasta=memory_core.KNOWLEDGE_DIR, debounce=DEBOUNCE_S, ao_mudar=None):
+        self.pasta = pasta
+        # Pastas que o memory_core lê (sem recursão)
+        self.pastas = [os.path.normpath(pasta), os.path.normpath(memory_core.PROCESSED_DIR)]
+        self.debounce = debounce
+        self.ao_mudar = ao_mudar  # Callback(status) a cada mudança de estado (ex: socket)
+        self.lock = threading.Lock()
+        self.evento = threading.Event()
+        self.pendentes = {}       # caminho -> horário do último evento
+        self.estado = "parado"    # parado | ocioso | aguardando | indexando | erro
+        self.modo = None          # watchdog | polling
+        self.ultima_indexacao = None
+        self.ultimo_erro = None
+        self.execucoes = 0
+        self.recentes = []        # [(caminho, timestamp, ação)] das últimas mudanças no índice
+        self.observer = None
+        self.rodando = False
+
+    # --- ENTRADA DE EVENTOS ---
+    def enfileirar(self, path):
+        if not path.lower().endswith(memory_core.SUPPORTED_EXTENSIONS):
+            return
+        if os.path.dirname(os.path.normpath(path)) not in self.pastas:
+            return  # Subpasta de persona (ou qualquer outra): não é do Córtex
+        with self.lock:
+            self.pendentes[os.path.normpath(path)] = time.time()
+            if self.estado in ("ocioso", "erro"):
+                self.estado = "aguardando"
+        self.evento.set()
+        self._notificar()
+
+    def _instantaneo(self):
+        """Tamanho + mtime de cada arquivo suportado (para o modo varredura)."""
+        foto = {}
+        for pasta in self.pastas:
+            try:
+                nomes = os.listdir(pasta)
+            except OSError:
+                continue
+            for nome in nomes:
+                if not nome.lower().endswith(memory_core.SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.normpath(os.path.join(pasta, nome))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                foto[path] = (stat.st_size, stat.st_mtime)
+        return foto
+
+    def _loop_varredura(self):
+        anterior = self._instantaneo()
+        while self.rodando:
+            time.sleep(POLL_INTERVAL_S)
+            atual = self._instantaneo()
+            for path in set(anterior) | set(atual):
+                if anterior.get(path) != atual.get(path):
+                    self.enfileirar(path)
+            anterior = atual
+
+    # --- INGESTÃO ---
+    def _loop_indexacao(self):
+        ingest_pipeline.baixar_prioridade()
+        # Arquivos que chegaram com o Argus desligado entram na primeira passada.
+        # Sem manifesto, essa passada seria a migração do Córtex inteiro: fica para o
+        # aprendizado manual (ou o primeiro arquivo novo), nunca sozinha no boot
+        if os.path.exists(memory_core.MANIFEST_FILE):
+            self._indexar([])
+        else:
+            print("ℹ️ [VIGIA] Córtex sem manifesto: sem passada inicial (rode o aprendizado para migrar).")
+        while self.rodando:
+            espera = RETRY_AFTER_ERROR_S if self.estado == "erro" else None
+            if not self.evento.wait(timeout=espera) and self.estado == "erro":
+                self._indexar([])
+                continue
+            self.evento.clear()
+
+            # Debounce: só indexa quando nada mudou nos últimos DEBOUNCE_S segundos
+            while self.rodando:
+                with self.lock:
+                    ultimo = max(self.pendentes.values(), default=0)
+                restante = ultimo + self.debounce - time.time()
+                if restante <= 0:
+                    break
+                time.sleep(restante)
+
+            with self.lock:
+                lote = list(self.pendentes)
+                self.pendentes.clear()
+            if lote:
+                self._indexar(lote)
+
+    def _indexar(self, lote):
+        with self.lock:
+            self.estado = "indexando"
+        self._notificar()
+        try:
+            resultado = memory_core.aprender_documentos(baixa_prioridade=True)
+            if resultado["erro"]:
+                raise RuntimeError(resultado["erro"])
+        except Exception as e:
+            print(f"❌ [VIGIA] Falha na indexação em segundo plano: {e}")
+            with self.lock:
+                self.estado = "erro"
+                self.ultimo_erro = str(e)
+                for path in lote:  # Volta pra fila: entra na próxima tentativa
+                    self.pendentes.setdefault(path, 0)
+        else:
+            agora = time.time()
+            with self.lock:
+                self.execucoes += 1
+                self.ultima_indexacao = agora
+                self.ultimo_erro = None
+                # Só entra o que mudou o índice (o arquivamento também gera eventos)
+                mudancas = [(p, agora, "indexado") for p in resultado["novos"]]
+                mudancas += [(p, agora, "esquecido") for p in resultado["removidos"]]
+                self.recentes = (mudancas + self.recentes)[:RECENT_FILES]
+                self.estado = "aguardando" if self.pendentes else "ocioso"
+        self._notificar()
+
+    # --- CICLO DE VIDA ---
+    def iniciar(self):
+        if self.rodando:
+            return self
+        for pasta in self.pastas:
+            os.makedirs(pasta, exist_ok=True)
+        self.rodando = True
+        self.estado = "ocioso"
+
+        if Observer is not None:
+            try:
+                self.observer = Observer()
+                for pasta in self.pastas:
+                    self.observer.schedule(_EventHandler(self), pasta, recursive=False)
+                self.observer.start()
+                self.modo = "watchdog"
+            except Exception as e:
+                print(f"⚠️ [VIGIA] watchdog indisponível ({e}). Usando varredura.")
+                self.observer = None
+        if self.observer is None:
+            self.modo = "polling"
+            threading.Thread(target=self._loop_varredura, daemon=True, name="vigia-varredura").start()
+
+        threading.Thread(target=self._loop_indexacao, daemon=True, name="vigia-ingestao").start()
+        print(f"👁️ [VIGIA] Observando '{self.pasta}' ({self.modo}).")
+        return self
+
+    def parar(self):
+        self.rodando = False
+        self.evento.set()
+        if self.observer is not None:
+            self.observer.stop()
+        with self.lock:
+            self.estado = "parado"
+
+    def status(self):
+        with self.lock:
+            return {
+                "estado": self.estado,
+                "modo": self.modo,
+                "fila": len(self.pendentes),
+                "ultima_indexacao": self.ultima_indexacao,
+                "ultimo_erro": self.ultimo_erro,
+                "execucoes": self.execucoes,
+                "recentes": [
+                    {"arquivo": os.path.basename(p), "acao": acao, "em": t} for p, t, acao in self.recentes
+                ],
+            }
+
+    def _notificar(self):
+        if self.ao_mudar:
+            try:
+                self.ao_mudar(self.status())
+            except Exception as e:
+                print(f"⚠️ [VIGIA] Falha ao notificar status: {e}")
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def get_watcher(ao_mudar=None):
+    global _watcher
+    if _watcher is None:
+        with _watcher_lock:
+            if _watcher is None:
+                _watcher = KnowledgeWatcher(ao_mudar=ao_mudar)
+    return _watcher
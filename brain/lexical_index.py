@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import math
+import threading
+import unicodedata
+from collections import Counter
+from langchain_core.documents import Document
+
+# ==========================================
+# 🔤 ÍNDICE LÉXICO (BM25)
+# ==========================================
+# Complementa a busca vetorial: acha identificadores exatos (códigos de chamado,
+# números de contrato, nomes de tabela SQL) que o embedding não diferencia.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Mantém códigos como "INC-2024/001", "tb_vendas" ou "10.2.3" inteiros (e também as partes)
+TOKEN_RE = re.compile(r"\w+(?:[-./:]\w+)*")
+SPLIT_RE = re.compile(r"[-./:_]")
+STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "um", "uma", "para", "por", "com", "que", "se", "ao", "the", "of", "and", "to", "in",
+}
+
+
+def tokenizar(texto):
+    """Minúsculas, sem acentos, preservando identificadores compostos."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+
+    tokens = []
+    for token in TOKEN_RE.findall(texto):
+        if token not in STOPWORDS:
+            tokens.append(token)
+        partes = [p for p in SPLIT_RE.split(token) if p]
+        if len(partes) > 1:
+            tokens.extend(p for p in partes if p not in STOPWORDS)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Índice invertido BM25 persistido em JSON.
+    Só carrega do disco na primeira busca/escrita (lazy).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.carregado = False
+        self.docs = {}       # chunk_id -> {"text", "meta", "tf", "len"}
+        self.postings = {}   # termo -> {chunk_id: frequência}
+        self.total_len = 0
+
+    # --- PERSISTÊNCIA ---
+    def carregar(self):
+        with self.lock:
+            if self.carregado:
+                return
+            self.carregado = True
+            if not os.path.exists(self.path):
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for chunk_id, doc in data.get("docs", {}).items():
+                    self._indexar(chunk_id, doc)
+            except Exception as e:
+                print(f"⚠️ [LÉXICO] Índice ilegível, será reconstruído: {e}")
+                self.docs, self.postings, self.total_len = {}, {}, 0
+
+    def salvar(self):
+        with self.lock:
+            self.carregar()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            docs = {i: {"text": d["text"], "meta": d["meta"], "tf": d["tf"]} for i, d in self.docs.items()}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"docs": docs}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    # --- ESCRITA ---
+    def _indexar(self, chunk_id, doc):
+        tf = doc["tf"]
+        doc["len"] = sum(tf.values())
+        self.docs[chunk_id] = doc
+        self.total_len += doc["len"]
+        for termo, freq in tf.items():
+            self.postings.setdefault(termo, {})[chunk_id] = freq
+
+    def adicionar(self, itens):
+        """itens: [(chunk_id, Document)]"""
+        with self.lock:
+            self.carregar()
+            for chunk_id, doc in itens:
+                if chunk_id in self.docs:
+                    continue
+                tf = dict(Counter(tokenizar(doc.page_content)))
+                self._indexar(chunk_id, {"text": doc.page_content, "meta": dict(doc.metadata), "tf": tf})
+
+    def remover(self, ids):
+        with self.lock:
+            self.carregar()
+            for chunk_id in ids:
+                doc = self.docs.pop(chunk_id, None)
+                if doc is None:
+                    continue
+                self.total_len -= doc["len"]
+                for termo in doc["tf"]:
+                    posting = self.postings.get(termo)
+                    if posting is not None:
+                        posting.pop(chunk_id, None)
+                        if not posting:
+                            del self.postings[termo]
+
+    def ids(self):
+        with self.lock:
+            self.carregar()
+            return set(self.docs)
+
+    # --- LEITURA ---
+    def buscar(self, query, k=3):
+        """Devolve [(chunk_id, score)] ordenado pelo BM25."""
+        with self.lock:
+            self.carregar()
+            n = len(self.docs)
+            if n == 0:
+                return []
+            avgdl = self.total_len / n
+
+            scores = {}
+            for termo in set(tokenizar(query)):
+                posting = self.postings.get(termo)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for chunk_id, freq in posting.items():
+                    dl = self.docs[chunk_id]["len"]
+                    denom = freq + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * freq * (BM25_K1 + 1) / denom
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def documento(self, chunk_id):
+        doc = self.docs.get(chunk_id)
+        if doc is None:
+            return None
+        return Document(id=chunk_id, page_content=doc["text"], metadata=dict(doc["meta"]))
+
+
+def fusao_rrf(rankings, k=3, constante=60):
+    """
+    Reciprocal Rank Fusion: junta várias listas ordenadas de IDs.
+    score(d) = soma de 1 / (constante + posição)
+    """
+    scores = {}
+    for ranking in rankings:
+        for posicao, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (constante + posicao)
+    return [chunk_id for chunk_id, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]]
@@ -0,0 +1,143 @@
+import os
+import zlib
+import time
+import random
+import asyncio
+from typing import Any, Iterator, AsyncIterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# ==========================================
+# 🔌 PROVEDORES DE LLM
+# ==========================================
+# Cada entrada do roster do model_manager é "provedor:modelo". Sem prefixo = Gemini
+# (compatível com os nomes antigos, ex: "models/gemini-2.5-flash").
+#   gemini -> Google Gemini (precisa de GOOGLE_API_KEY)
+#   ollama -> servidor Ollama local (OLLAMA_HOST): último degrau quando a rede/cota acaba
+#   mock   -> modelo falso determinístico, para teste de carga e benchmark offline
+# Todos devolvem um BaseChatModel do LangChain, então o resto do Argus (stream,
+# callbacks, disjuntores) não precisa saber quem está respondendo.
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+
+# --- MOCK (valores padrão; cada entrada pode sobrescrever: "mock:ttft=0.5,tps=30") ---
+MOCK_DEFAULTS = {
+    "ttft": float(os.getenv("ARGUS_MOCK_TTFT", "0.3")),      # Segundos até o 1º token
+    "tps": float(os.getenv("ARGUS_MOCK_TPS", "40")),         # Tokens por segundo depois disso
+    "tokens": int(os.getenv("ARGUS_MOCK_TOKENS", "120")),    # Tamanho da resposta
+    "seed": int(os.getenv("ARGUS_MOCK_SEED", "0")),
+    "falha": None,                                           # Ex: falha=429 simula cota estourada
+}
+MOCK_TEXT = os.getenv("ARGUS_MOCK_TEXT")  # Resposta fixa (senão, palavras sorteadas pela seed + prompt)
+MOCK_VOCAB = ("o", "a", "de", "que", "sistema", "dados", "chefe", "plano", "análise", "modelo",
+              "resposta", "tarefa", "código", "memória", "contexto", "rede", "relatório", "etapa")
+
+
+def separar(model_name):
+    """'ollama:llama3.2' -> ('ollama', 'llama3.2'); sem prefixo conhecido -> gemini."""
+    provedor, _, modelo = model_name.partition(":")
+    if modelo and provedor in ("gemini", "ollama", "mock"):
+        return provedor, modelo
+    return "gemini", model_name
+
+
+def precisa_chave(model_name):
+    return separar(model_name)[0] == "gemini"
+
+
+def criar_cliente(model_name, api_key=None, temperature=0.7):
+    """Instancia o chat model do provedor (o pool do model_manager guarda o resultado)."""
+    provedor, modelo = separar(model_name)
+    if provedor == "ollama":
+        from langchain_ollama import ChatOllama
+        return ChatOllama(model=modelo, base_url=OLLAMA_HOST, temperature=temperature)
+    if provedor == "mock":
+        return MockChatModel(perfil=modelo)
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=modelo,
+        google_api_key=api_key,
+        temperature=temperature,
+        streaming=True, # Essencial para voz/chat fluir
+        convert_system_message_to_human=True
+    )
+
+
+def ler_perfil(perfil):
+    """'ttft=0.5,tps=30,falha=429' -> dict com os padrões do MOCK_DEFAULTS."""
+    config = dict(MOCK_DEFAULTS)
+    for par in perfil.split(","):
+        chave, _, valor = par.partition("=")
+        chave = chave.strip()
+        if chave not in config or not valor:
+            continue  # Nome solto ("mock:rapido") só diferencia os disjuntores
+        config[chave] = valor if chave == "falha" else type(MOCK_DEFAULTS[chave])(valor)
+    return config
+
+
+class MockChatModel(BaseChatModel):
+    """
+    LLM falso e reproduzível: mesma seed + mesmo prompt = mesmos tokens, no mesmo
+    ritmo (atraso do 1º token + taxa fixa). Não usa rede nem cota.
+    """
+    perfil: str = ""
+
+    @property
+    def _llm_type(self):
+        return "argus-mock"
+
+    def _config(self):
+        return ler_perfil(self.perfil)
+
+    def _tokens(self, messages, config):
+        if MOCK_TEXT:
+            return [t + " " for t in MOCK_TEXT.split()]
+        prompt = "".join(str(m.content) for m in messages)
+        rng = random.Random(config["seed"] * 1000003 + zlib.crc32(prompt.encode("utf-8")))
+        return [rng.choice(MOCK_VOCAB) + " " for _ in range(config["tokens"])]
+
+    def _chunks(self, messages):
+        config = self._config()
+        if config["falha"]:
+            raise RuntimeError(f"{config['falha']} (falha simulada pelo mock)")
+        intervalo = 1.0 / config["tps"] if config["tps"] > 0 else 0.0
+        return config["ttft"], intervalo, self._tokens(messages, config)
+
+    @staticmethod
+    def _chunk(token, i, tokens, messages):
+        """O último chunk leva a contagem exata (como o usage_metadata do Gemini/Ollama)."""
+        if i < len(tokens) - 1:
+            return ChatGenerationChunk(message=AIMessageChunk(content=token))
+        entrada = sum(len(str(m.content).split()) for m in messages)
+        uso = {"input_tokens": entrada, "output_tokens": len(tokens), "total_tokens": entrada + len(tokens)}
+        return ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=uso))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        ttft, intervalo, tokens = self._chunks(messages)
+        time.sleep(ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(intervalo)
+            chunk = self._chunk(token, i, tokens, messages)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        # Versão nativa com asyncio.sleep: cancelar o turno interrompe o mock na hora
+        ttft, intervalo, tokens = self._chunks(messages)
+        await asyncio.sleep(ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(intervalo)
+            chunk = self._chunk(token, i, tokens, messages)
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        texto = "".join(c.message.content for c in self._stream(messages, stop, run_manager))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=texto))])
@@ -1,23 +1,336 @@
 import os
 import shutil
 import time
-from langchain_community.document_loaders import PyMuPDFLoader, TextLoader, DirectoryLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+import json
+import hashlib
+from collections import OrderedDict
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
+try:
+    from brain import ingest_pipeline, embedding_provider
+    from brain.lexical_index import LexicalIndex, fusao_rrf
+    from brain.vector_store import MmapVectorStore
+except ImportError:
+    # Rodando direto: python brain/memory_core.py
+    import ingest_pipeline
+    import embedding_provider
+    from lexical_index import LexicalIndex, fusao_rrf
+    from vector_store import MmapVectorStore
 
 # ==========================================
 # 🧠 CONFIGURAÇÃO DA MEMÓRIA (CORTEX)
 # ==========================================
 KNOWLEDGE_DIR = "knowledge_base"
 PROCESSED_DIR = os.path.join(KNOWLEDGE_DIR, "documentos_lidos") 
-DB_DIR = "chroma_db_permanent" 
+# --- BANCO VETORIAL (ARGUS_VECTOR_STORE) ---
+#   chroma -> Chroma (SQLite + HNSW), padrão histórico
+#   mmap   -> matriz NumPy mapeada em memória, busca exata (brain/vector_store.py)
+VECTOR_STORE_BACKEND = os.getenv("ARGUS_VECTOR_STORE", "chroma")
+STORE_DIRS = {"chroma": "chroma_db_permanent", "mmap": "cortex_mmap"}
+DB_DIR = STORE_DIRS.get(VECTOR_STORE_BACKEND, "chroma_db_permanent")
 
-EMBEDDING_MODEL = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# --- INGESTÃO INCREMENTAL ---
+MANIFEST_FILE = os.path.join(DB_DIR, "manifesto_ingestao.json")
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
 
-def aprender_documentos():
+# Provedor único (lazy): o modelo só carrega no primeiro embed
+EMBEDDING_MODEL = embedding_provider.get_embeddings()
+COLLECTION_NAME = "langchain"  # Coleção padrão do Chroma
+# Bancos criados antes da assinatura foram gerados com o MiniLM fp32
+LEGACY_SIGNATURE = "huggingface:sentence-transformers/all-MiniLM-L6-v2"
+
+# --- CACHE DO RECUPERADOR (RAG QUENTE) ---
+QUERY_CACHE_SIZE = 256   # Embeddings de perguntas guardados em RAM
+RESULT_CACHE_SIZE = 128  # Resultados de busca guardados em RAM
+# Arquivo "carimbo": toda escrita no banco atualiza ele (vale entre processos)
+VERSION_NAME = ".versao_memoria"
+VERSION_FILE = os.path.join(DB_DIR, VERSION_NAME)
+
+# --- BUSCA HÍBRIDA (BM25 + VETORIAL) ---
+LEXICAL_INDEX_NAME = "indice_lexico.json"
+LEXICAL_INDEX_FILE = os.path.join(DB_DIR, LEXICAL_INDEX_NAME)
+RETRIEVAL_MODE = os.getenv("ARGUS_RAG_MODE", "hibrido")  # hibrido | denso | lexico
+FUSION_CANDIDATES = 10  # Candidatos de cada buscador antes da fusão (RRF)
+
+
+class LRUCache:
+    """Cache LRU simples e thread-safe (OrderedDict + Lock)."""
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class MemoryRetriever:
     """
-    Lê arquivos, valida conteúdo, salva na memória e arquiva.
+    Recuperador de longa duração do Córtex.
+    Abre o Chroma UMA vez por processo, mantém o índice HNSW quente e reaproveita
+    o modelo de embeddings já carregado. Perguntas repetidas saem do cache LRU.
+    """
+    def __init__(self, persist_directory=DB_DIR, embedding=EMBEDDING_MODEL, backend=VECTOR_STORE_BACKEND):
+        self.persist_directory = persist_directory
+        self.embedding = embedding
+        self.backend = backend
+        self.vector_db = None
+        self.lock = threading.Lock()
+        self.query_cache = LRUCache(QUERY_CACHE_SIZE)
+        self.result_cache = LRUCache(RESULT_CACHE_SIZE)
+        # Índice léxico, carimbo e assinatura moram na pasta do próprio banco
+        self.lexical_path = os.path.join(persist_directory, LEXICAL_INDEX_NAME)
+        self.version_path = os.path.join(persist_directory, VERSION_NAME)
+        self.lexical = LexicalIndex(self.lexical_path)
+        self.aquecendo = False
+        self.espaco_incompativel = False
+        self.assinatura_store = None
+        self.versao = None
+        self.versao_propria = None  # Último carimbo gravado por ESTE processo
+
+    def _get_db(self, esperar=True):
+        """
+        Abre o banco na primeira chamada e devolve sempre a mesma instância.
+        esperar=False: se outra thread está abrindo (aquecimento), devolve None na hora
+        em vez de ficar parado na trava durante a abertura do Chroma.
+        """
+        vector_db = self.vector_db
+        if vector_db is not None:
+            return vector_db
+        if not self.lock.acquire(blocking=esperar):
+            return None
+        try:
+            if self.vector_db is None:
+                if not os.path.exists(self.persist_directory):
+                    return None
+                # Carimbo lido ANTES de abrir: o banco aberto tem pelo menos esta versão
+                # (sem isso a 1ª checagem acharia que outro processo escreveu e reabriria)
+                versao = _ler_versao(self.version_path)
+                self.vector_db = abrir_vector_store(self.persist_directory, self.embedding, self.backend)
+                self.versao_propria = versao
+            return self.vector_db
+        finally:
+            self.lock.release()
+
+    def _checar_versao(self):
+        """Se houve escrita no banco (aqui ou em outro processo), descarta o que está em cache."""
+        versao_atual = _ler_versao(self.version_path)
+        if versao_atual == self.versao:
+            return
+        self.versao = versao_atual
+        self.result_cache.clear()
+        self.lexical = LexicalIndex(self.lexical_path)  # Recarrega do disco na próxima busca
+
+        if isinstance(self.vector_db, MmapVectorStore):
+            self.vector_db.recarregar()  # Sidecar/matriz podem ter mudado em outro processo
+        elif self.vector_db is not None and versao_atual != self.versao_propria:
+            # Escrita de OUTRO processo: o cliente aberto ainda tem o HNSW antigo na RAM
+            print("🔄 [MEMÓRIA] Córtex alterado por outro processo. Reabrindo o banco...")
+            with self.lock:
+                self.vector_db = None
+                _soltar_cliente_chroma(self.persist_directory)
+
+        assinatura = ler_assinatura_cortex(self.persist_directory)
+        if assinatura != self.assinatura_store:
+            if self.assinatura_store is not None:
+                self.vector_db = None  # Reindexação recriou a coleção: reabre
+            self.assinatura_store = assinatura
+
+        # Vetores de outro modelo não são comparáveis: nesse caso só o BM25 responde
+        self.espaco_incompativel = assinatura != self.embedding.assinatura
+        if self.espaco_incompativel:
+            print(f"⚠️ [MEMÓRIA] Córtex indexado com '{assinatura}', provedor atual é "
+                  f"'{self.embedding.assinatura}'. Rode o aprendizado para reindexar. Usando só BM25.")
+
+    def embed_query(self, query):
+        """Embedding da pergunta, reaproveitado do cache LRU quando possível."""
+        vetor = self.query_cache.get(query)
+        if vetor is None:
+            vetor = self.embedding.embed_query(query)
+            self.query_cache.put(query, vetor)
+        return vetor
+
+    def buscar(self, query, k=3, modo=None):
+        """
+        modo: 'hibrido' (BM25 + vetorial com RRF), 'denso' ou 'lexico'.
+        Enquanto o modelo de embeddings não está carregado (ou o banco ainda está
+        abrindo), a busca responde só pelo BM25 (e o aquecimento segue em background).
+        """
+        modo = modo or RETRIEVAL_MODE
+        if not os.path.exists(self.persist_directory):
+            return []
+
+        self._checar_versao()
+        if self.espaco_incompativel:
+            modo = "lexico"
+        elif modo == "hibrido" and not self.embedding.carregado and not self.aquecendo:
+            threading.Thread(target=self.aquecer, daemon=True).start()
+        chave = (query, k, modo)
+        cached = self.result_cache.get(chave)
+        if cached is not None:
+            return list(cached)
+
+        # O caminho léxico é decidido ANTES de tocar no banco: o BM25 não espera o Chroma abrir
+        provisoria = modo == "hibrido" and not self.embedding.carregado
+        vector_db = None
+        if modo != "lexico" and not provisoria:
+            vector_db = self._get_db(esperar=False)
+            provisoria = vector_db is None  # Outra thread ainda está abrindo o banco
+
+        if modo == "lexico" or provisoria:
+            results = self._buscar_lexico(query, k)
+            if modo != "lexico":
+                return results  # Resposta provisória: não vai pro cache
+        elif modo == "denso":
+            results = self._buscar_denso(vector_db, query, k)
+        else:
+            results = self._buscar_hibrido(vector_db, query, k)
+
+        self.result_cache.put(chave, results)
+        return list(results)
+
+    def _buscar_denso(self, vector_db, query, k):
+        vetor = self.embed_query(query)
+        return vector_db.similarity_search_by_vector(vetor, k=k)
+
+    def _buscar_lexico(self, query, k):
+        return [self.lexical.documento(chunk_id) for chunk_id, _ in self.lexical.buscar(query, k=k)]
+
+    def _buscar_hibrido(self, vector_db, query, k):
+        candidatos = max(k * 3, FUSION_CANDIDATES)
+        lexico = self.lexical.buscar(query, k=candidatos)
+        try:
+            densos = self._buscar_denso(vector_db, query, candidatos)
+        except Exception as e:
+            print(f"⚠️ [RAG] Busca vetorial falhou, usando só BM25: {e}")
+            densos = []
+
+        por_id = {}
+        for doc in densos:
+            por_id[doc.id or ingest_pipeline.id_fragmento(doc.page_content, doc.metadata.get("file_hash"))] = doc
+        ranking_denso = list(por_id)
+        ranking_lexico = [chunk_id for chunk_id, _ in lexico]
+
+        results = []
+        for chunk_id in fusao_rrf([ranking_denso, ranking_lexico], k=k):
+            doc = por_id.get(chunk_id) or self.lexical.documento(chunk_id)
+            if doc is not None:
+                results.append(doc)
+        return results
+
+    def invalidar(self):
+        """Chamado após qualquer escrita no banco (ingestão)."""
+        self.result_cache.clear()
+        self.versao_propria = _ler_versao(self.version_path)  # Escrita nossa: o banco aberto já tem tudo
+        self.versao = None  # Força a revalidação (índice léxico e assinatura) na próxima busca
+
+    def aquecer(self):
+        """Abre o banco e faz uma busca falsa para carregar o HNSW e o modelo na RAM."""
+        if self.aquecendo:
+            return
+        inicio = time.time()
+        self.aquecendo = True
+        try:
+            self.lexical.carregar()  # BM25 primeiro: já serve de fallback
+            self._get_db()
+            self.buscar("aquecimento", k=1, modo="denso")
+            print(f"🔥 [MEMÓRIA] Córtex aquecido em {time.time() - inicio:.2f}s.")
+        except Exception as e:
+            print(f"⚠️ [MEMÓRIA] Falha ao aquecer o Córtex: {e}")
+        finally:
+            self.aquecendo = False
+
+    def stats(self):
+        return {
+            "query_hits": self.query_cache.hits,
+            "query_misses": self.query_cache.misses,
+            "result_hits": self.result_cache.hits,
+            "result_misses": self.result_cache.misses,
+        }
+
+
+def abrir_vector_store(persist_directory=DB_DIR, embedding=EMBEDDING_MODEL, backend=VECTOR_STORE_BACKEND):
+    """Abre o banco vetorial do backend escolhido (ambos falam a mesma interface)."""
+    if backend == "mmap":
+        return MmapVectorStore(persist_directory, embedding)
+    return Chroma(persist_directory=persist_directory, embedding_function=embedding)
+
+
+def _soltar_cliente_chroma(persist_directory):
+    """Tira do cache do chromadb o cliente desta pasta (senão o Chroma novo herda o índice velho)."""
+    try:
+        from chromadb.api.client import SharedSystemClient
+        system = SharedSystemClient._identifier_to_system.pop(str(persist_directory), None)
+        if system is not None:
+            system.stop()  # Fecha o SQLite e as threads do cliente velho
+    except Exception as e:
+        print(f"⚠️ [MEMÓRIA] Não consegui soltar o cliente do Chroma: {e}")
+
+
+def ler_assinatura_cortex(persist_directory=DB_DIR):
+    return embedding_provider.ler_assinatura(persist_directory, COLLECTION_NAME, padrao=LEGACY_SIGNATURE)
+
+
+def _ler_versao(path=VERSION_FILE):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _marcar_escrita():
+    """Atualiza o carimbo de versão e invalida o cache do recuperador deste processo."""
+    try:
+        with open(VERSION_FILE, "w") as f:
+            f.write(str(time.time()))
+    except OSError as e:
+        print(f"⚠️ [MEMÓRIA] Não consegui gravar o carimbo de versão: {e}")
+    if _retriever is not None:
+        _retriever.invalidar()
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+def get_retriever():
+    """Devolve o recuperador único do processo (cria na primeira chamada)."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = MemoryRetriever()
+    return _retriever
+
+
+def aprender_documentos(baixa_prioridade=False):
+    """
+    Ingestão incremental (endereçada por conteúdo + arquivo de origem).
+    Só lê/embeda arquivos novos ou alterados, apaga os fragmentos que o manifesto
+    registrou para documentos removidos e ignora arquivos que já estão no manifesto.
+    baixa_prioridade: modo do vigia em segundo plano (menos leitores, threads rebaixadas).
+    Devolve {"novos": [caminhos], "removidos": [caminhos], "erro": None | mensagem}.
     """
     print(f"🧠 [MEMÓRIA] Verificando Caixa de Entrada '{KNOWLEDGE_DIR}'...")
     
@@ -26,86 +339,242 @@ def aprender_documentos():
     if not os.path.exists(PROCESSED_DIR):
         os.makedirs(PROCESSED_DIR)
 
-    # 1. Carregadores
-    loaders = [
-        DirectoryLoader(KNOWLEDGE_DIR, glob="*.pdf", loader_cls=PyMuPDFLoader),
-        DirectoryLoader(KNOWLEDGE_DIR, glob="*.txt", loader_cls=TextLoader)
-    ]
-    
-    documents = []
-    files_found = []
+    # 0. Backend de embeddings mudou? Reindexa tudo (nunca mistura espaços vetoriais)
+    assinatura_antiga = ler_assinatura_cortex()
+    if os.path.exists(DB_DIR) and assinatura_antiga != EMBEDDING_MODEL.assinatura:
+        _resetar_vetores(assinatura_antiga)
 
-    for loader in loaders:
-        try:
-            docs = loader.load()
-            for doc in docs:
-                # --- NOVO: FILTRO DE CONTEÚDO VAZIO ---
-                if doc.page_content and len(doc.page_content.strip()) > 10:
-                    documents.append(doc)
-                    source = doc.metadata.get('source')
-                    if source and source not in files_found:
-                        files_found.append(source)
-                else:
-                    print(f"⚠️ Aviso: Página vazia ou imagem ignorada em: {doc.metadata.get('source')}")
-                    
-        except Exception as e:
-            print(f"⚠️ Erro ao ler arquivo: {e}")
+    manifesto = _carregar_manifesto()
+    primeira_execucao = "versao" not in manifesto
 
-    if not documents:
-        print("✅ Nenhum texto válido encontrado para processar.")
-        return
+    # 1. Inventário: hash de conteúdo de tudo que está na caixa de entrada e no arquivo
+    atuais, duplicados = _inventariar_arquivos(manifesto)
+    novos = {h: p for h, p in atuais.items() if h not in manifesto["files"]}
+    removidos = [h for h in manifesto["files"] if h not in atuais]
+    mantidos = {h: p for h, p in atuais.items() if h in manifesto["files"]}
 
-    print(f"📚 [MEMÓRIA] Processando {len(files_found)} arquivos com texto legível...")
+    for file_hash, path in mantidos.items():
+        if manifesto["files"][file_hash]["path"] != path:
+            print(f"   ↪️ Renomeado (sem reprocessar): {os.path.basename(path)}")
+        manifesto["files"][file_hash].update(_assinatura(path))
+        manifesto["files"][file_hash]["path"] = path
 
-    # 2. Quebrar em Pedaços
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
-    
-    # --- NOVO: VERIFICAÇÃO FINAL ANTES DO BANCO ---
-    if not chunks:
-        print("❌ Erro: O processamento gerou 0 fragmentos. Os arquivos podem ser imagens/scans.")
-        return
+    em_dia = not primeira_execucao and os.path.exists(LEXICAL_INDEX_FILE)
+    if not novos and not removidos and (em_dia or not os.path.exists(DB_DIR)):
+        _arquivar_caixa_de_entrada(manifesto, duplicados)
+        _salvar_manifesto(manifesto)
+        print("✅ Nenhuma alteração: conhecimento já está em dia.")
+        return {"novos": [], "removidos": [], "erro": None}
+
+    print(f"📚 [MEMÓRIA] {len(novos)} novos/alterados | {len(removidos)} removidos | {len(mantidos)} sem mudança.")
 
-    print(f"🧩 [MEMÓRIA] Gerando {len(chunks)} fragmentos neurais...")
+    # 2. IDs que já estão no banco (o pipeline não reembeda esses)
+    ids_vivos = set()
+    for file_hash in mantidos:
+        ids_vivos.update(manifesto["files"][file_hash]["chunks"])
+    ids_removidos = set()
+    for file_hash in removidos:
+        ids_removidos.update(manifesto["files"][file_hash]["chunks"])
 
-    # 3. Salvar no ChromaDB
     try:
-        vector_db = Chroma.from_documents(
-            documents=chunks,
-            embedding=EMBEDDING_MODEL,
-            persist_directory=DB_DIR
+        # Mesma instância do recuperador: as buscas continuam servindo enquanto gravamos
+        vector_db = get_retriever()._get_db() or abrir_vector_store()
+
+        if primeira_execucao and os.path.exists(DB_DIR):
+            # Migração: o Córtex antigo (sem manifesto) não diz de que arquivo veio cada fragmento.
+            # Os IDs dele são adotados como "legado" e NUNCA apagados aqui
+            # (para um índice limpo: python brain/index_maintenance.py reconstruir)
+            legado = set(vector_db.get(include=[])["ids"]) - ids_vivos
+            manifesto["legado"] = sorted(legado)
+            if legado:
+                print(f"🏛️ [MEMÓRIA] {len(legado)} fragmentos do Córtex antigo mantidos como legado.")
+        ids_vivos.update(manifesto.get("legado", []))
+        ids_existentes = ids_vivos | ids_removidos
+
+        # 3. Pipeline: leitura paralela -> fila limitada -> embedding/gravação em lotes
+        #    (o índice BM25 é alimentado junto, lote a lote)
+        indice_lexico = get_retriever().lexical
+        fragmentos_novos, report = ingest_pipeline.executar_pipeline(
+            novos, vector_db, ids_existentes,
+            # Uma reconstrução (brain/index_maintenance.py) pode ter gravado outro tamanho de fragmento
+            manifesto.get("chunk_size", CHUNK_SIZE), manifesto.get("chunk_overlap", CHUNK_OVERLAP),
+            ao_gravar=indice_lexico.adicionar,
+            workers=ingest_pipeline.BACKGROUND_WORKERS if baixa_prioridade else ingest_pipeline.PARSE_WORKERS,
+            baixa_prioridade=baixa_prioridade
         )
-        print("💾 [SUCESSO] Conhecimento gravado no Córtex!")
-        
-        # 4. ARQUIVAMENTO
-        print("📦 [ORGANIZAÇÃO] Arquivando documentos...")
-        
-        for file_path in files_found:
-            try:
-                file_name = os.path.basename(file_path)
-                destination = os.path.join(PROCESSED_DIR, file_name)
-                
-                if os.path.exists(destination):
-                    timestamp = int(time.time())
-                    name, ext = os.path.splitext(file_name)
-                    destination = os.path.join(PROCESSED_DIR, f"{name}_{timestamp}{ext}")
-                
-                shutil.move(file_path, destination)
-                print(f"   -> Movido: {file_name}")
-                
-            except Exception as move_err:
-                print(f"   ⚠️ Erro ao mover {file_name}: {move_err}")
-        
+        if report.erros_escrita:
+            raise RuntimeError(report.erros_escrita[0])
+
+        for chunks in fragmentos_novos.values():
+            ids_vivos.update(chunk_id for chunk_id, _ in chunks)
+        # Só apaga o que o próprio manifesto registrou como de um arquivo removido
+        para_apagar = list(ids_removidos - ids_vivos)
+
+        if para_apagar:
+            vector_db.delete(ids=para_apagar)
+            indice_lexico.remover(para_apagar)
+            print(f"🗑️ [MEMÓRIA] {len(para_apagar)} fragmentos obsoletos apagados.")
+
+        # Fragmentos que já estavam no Chroma mas ainda não no BM25 (índice novo/migração)
+        faltando = list(ids_vivos - indice_lexico.ids())
+        if faltando:
+            salvos = vector_db.get(ids=faltando, include=["documents", "metadatas"])
+            indice_lexico.adicionar([
+                (chunk_id, Document(page_content=texto, metadata=meta or {}))
+                for chunk_id, texto, meta in zip(salvos["ids"], salvos["documents"], salvos["metadatas"])
+            ])
+            print(f"🔤 [LÉXICO] {len(salvos['ids'])} fragmentos antigos indexados no BM25.")
+        indice_lexico.salvar()
+
+        if para_apagar or report.gravados:
+            print("💾 [SUCESSO] Conhecimento gravado no Córtex!")
+        embedding_provider.gravar_assinatura(DB_DIR, COLLECTION_NAME, EMBEDDING_MODEL.assinatura)
+
     except Exception as e:
         print(f"❌ Erro Crítico ao gravar no banco: {e}")
+        return {"novos": [], "removidos": [], "erro": str(e)}
+    finally:
+        # Mesmo numa falha parcial, o que entrou no banco precisa invalidar o cache
+        _marcar_escrita()
+
+    # 4. Manifesto só é atualizado depois que o banco aceitou as escritas
+    resultado = {
+        "novos": list(novos.values()),
+        "removidos": [manifesto["files"][h]["path"] for h in removidos],
+        "erro": None,
+    }
+    for file_hash in removidos:
+        print(f"   -> Esquecido: {os.path.basename(manifesto['files'][file_hash]['path'])}")
+        del manifesto["files"][file_hash]
+    for file_hash, path in novos.items():
+        manifesto["files"][file_hash] = {
+            "path": path,
+            "chunks": [chunk_id for chunk_id, _ in fragmentos_novos[file_hash]],
+            **_assinatura(path),
+        }
+
+    # 5. ARQUIVAMENTO
+    print("📦 [ORGANIZAÇÃO] Arquivando documentos...")
+    _arquivar_caixa_de_entrada(manifesto, duplicados)
+    _salvar_manifesto(manifesto)
+    return resultado
+
+
+def _resetar_vetores(assinatura_antiga):
+    """Apaga os vetores e o manifesto: a próxima ingestão reembeda todos os documentos."""
+    print(f"🔁 [MEMÓRIA] Backend de embeddings mudou ({assinatura_antiga} -> {EMBEDDING_MODEL.assinatura}). "
+          f"Reindexando o Córtex inteiro...")
+    abrir_vector_store().delete_collection()
+    if os.path.exists(MANIFEST_FILE):
+        os.remove(MANIFEST_FILE)
+    if _retriever is not None:
+        _retriever.vector_db = None
+    _marcar_escrita()
+
+
+# ==========================================
+# 📒 MANIFESTO DE INGESTÃO (HASHES)
+# ==========================================
+def _carregar_manifesto():
+    if os.path.exists(MANIFEST_FILE):
+        try:
+            with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("files"), dict):
+                return data
+        except Exception as e:
+            print(f"⚠️ [MEMÓRIA] Manifesto ilegível, reconstruindo: {e}")
+    return {"files": {}}
+
+
+def _salvar_manifesto(manifesto):
+    manifesto["versao"] = 1
+    os.makedirs(DB_DIR, exist_ok=True)
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+
+def _hash_arquivo(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
 
-def buscar_memoria(query, k=3):
-    if not os.path.exists(DB_DIR):
-        return []
 
-    vector_db = Chroma(persist_directory=DB_DIR, embedding_function=EMBEDDING_MODEL)
-    results = vector_db.similarity_search(query, k=k)
-    return results
+def _assinatura(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+
+def _inventariar_arquivos(manifesto):
+    """
+    Devolve ({hash_do_conteúdo: caminho}, [(caminho, hash)] de cópias repetidas).
+    Pula o hash quando tamanho+mtime batem com o manifesto.
+    """
+    por_caminho = {info["path"]: (h, info) for h, info in manifesto["files"].items()}
+    atuais = {}
+    duplicados = []
+
+    for pasta in (PROCESSED_DIR, KNOWLEDGE_DIR):
+        for nome in sorted(os.listdir(pasta)):
+            path = os.path.join(pasta, nome)
+            if not os.path.isfile(path) or os.path.splitext(nome)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            try:
+                conhecido = por_caminho.get(path)
+                if conhecido and conhecido[1].get("size") == os.path.getsize(path) \
+                        and conhecido[1].get("mtime") == os.path.getmtime(path):
+                    file_hash = conhecido[0]
+                else:
+                    file_hash = _hash_arquivo(path)
+            except OSError as e:
+                print(f"⚠️ Erro ao ler arquivo {nome}: {e}")
+                continue
+
+            # Mesmo conteúdo em dois lugares: fica a primeira cópia, as outras são descartadas
+            if file_hash in atuais:
+                duplicados.append((path, file_hash))
+            else:
+                atuais[file_hash] = path
+    return atuais, duplicados
+
+
+def _arquivar_caixa_de_entrada(manifesto, duplicados):
+    """Move para 'documentos_lidos' o que já foi indexado. Cópias repetidas são descartadas."""
+    for info in manifesto["files"].values():
+        path = info["path"]
+        if os.path.dirname(path) != KNOWLEDGE_DIR or not info["chunks"]:
+            continue  # Já arquivado, ou sem texto legível (fica na caixa de entrada)
+
+        file_name = os.path.basename(path)
+        try:
+            destination = os.path.join(PROCESSED_DIR, file_name)
+            if os.path.exists(destination):
+                timestamp = int(time.time())
+                name, ext = os.path.splitext(file_name)
+                destination = os.path.join(PROCESSED_DIR, f"{name}_{timestamp}{ext}")
+
+            shutil.move(path, destination)
+            info["path"] = destination
+            info.update(_assinatura(destination))
+            print(f"   -> Movido: {file_name}")
+
+        except Exception as move_err:
+            print(f"   ⚠️ Erro ao mover {file_name}: {move_err}")
+
+    for path, file_hash in duplicados:
+        if file_hash in manifesto["files"] and os.path.dirname(path) == KNOWLEDGE_DIR:
+            try:
+                os.remove(path)
+                print(f"   -> Duplicado descartado: {os.path.basename(path)}")
+            except OSError as e:
+                print(f"   ⚠️ Erro ao descartar {os.path.basename(path)}: {e}")
+
+def buscar_memoria(query, k=3):
+    return get_retriever().buscar(query, k=k)
 
 if __name__ == "__main__":
     print("--- INICIANDO ROTINA DE APRENDIZADO ---")
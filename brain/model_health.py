@@ -0,0 +1,233 @@
+import os
+import json
+import math
+import time
+import threading
+
+# ==========================================
+# 🩺 SAÚDE DOS MODELOS (CIRCUIT BREAKERS)
+# ==========================================
+# Cada modelo do roster tem um disjuntor:
+#   fechado     -> recebe tráfego normalmente
+#   aberto      -> falhou (cota, 404, auth...): fica de fora até o fim da janela
+#   meio_aberto -> janela venceu: uma sonda em background testa antes de liberar
+# A ordem de tentativa é refeita pela taxa de sucesso e pela latência recentes.
+# O estado é salvo em disco, então um 429 continua valendo depois de reiniciar.
+HEALTH_FILE = "model_health.json"
+PROBE_INTERVAL_S = 5.0     # De quanto em quanto tempo a sonda procura janelas vencidas
+EWMA_ALPHA = 0.3           # Peso da última chamada nas médias móveis
+LATENCY_BUCKET_S = 2.0     # Diferenças de latência menores que isso não reordenam o roster
+RECOVERY_S = 600.0         # Falhas antigas "esquecem": a taxa volta a 1 com essa constante de tempo
+
+# Janela inicial e teto (segundos) por classe de erro; dobra a cada falha seguida
+BACKOFF = {
+    "cota": (60, 900),                 # 429 / ResourceExhausted
+    "nao_encontrado": (6 * 3600, 6 * 3600),  # 404: modelo aposentado
+    "auth": (1800, 1800),              # Chave inválida / sem permissão
+    "transitorio": (10, 120),          # 5xx, timeout, conexão
+}
+# "pedido": o modelo não suporta algo DESTE pedido (ex: imagem num modelo só de texto).
+# Não abre o disjuntor: o turno passa para o próximo modelo e o chat de texto segue normal.
+CAPABILITY_MARKERS = ("is not supported", "not supported", "does not support", "unsupported")
+
+
+def classificar_erro(erro):
+    """Classifica a exceção do provedor: cota | nao_encontrado | auth | pedido | transitorio."""
+    texto = f"{type(erro).__name__} {erro}".lower()
+    if any(s in texto for s in ("429", "resourceexhausted", "quota", "rate limit", "cota")):
+        return "cota"
+    if any(s in texto for s in ("404", "notfound", "not found")):
+        return "nao_encontrado"
+    if any(s in texto for s in CAPABILITY_MARKERS):
+        return "pedido"
+    if any(s in texto for s in ("401", "403", "permissiondenied", "unauthenticated", "api key", "api_key")):
+        return "auth"
+    return "transitorio"
+
+
+class CircuitBreaker:
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.estado = "fechado"
+        self.aberto_ate = 0.0
+        self.falhas_seguidas = 0
+        self.classe = None
+        self.ultimo_erro = None
+        self.taxa_sucesso = 1.0   # Média móvel (1 = sempre funciona)
+        self.latencia = None      # Média móvel do tempo até o 1º token (s)
+        self.atualizado_em = 0.0
+
+    def taxa_atual(self, agora):
+        """Taxa de sucesso com as falhas antigas perdoadas aos poucos (modelo parado não fica rebaixado pra sempre)."""
+        return 1 - (1 - self.taxa_sucesso) * math.exp(-(agora - self.atualizado_em) / RECOVERY_S)
+
+    def registrar_sucesso(self, latencia):
+        agora = time.time()
+        self.taxa_sucesso = self.taxa_atual(agora)
+        self.atualizado_em = agora
+        self.estado = "fechado"
+        self.falhas_seguidas = 0
+        self.classe = None
+        self.taxa_sucesso = (1 - EWMA_ALPHA) * self.taxa_sucesso + EWMA_ALPHA
+        if latencia is not None:
+            self.latencia = latencia if self.latencia is None else \
+                (1 - EWMA_ALPHA) * self.latencia + EWMA_ALPHA * latencia
+
+    def registrar_falha(self, classe, mensagem):
+        agora = time.time()
+        self.taxa_sucesso = (1 - EWMA_ALPHA) * self.taxa_atual(agora)
+        self.atualizado_em = agora
+        self.falhas_seguidas += 1
+        self.classe = classe
+        self.ultimo_erro = mensagem[:200]
+        inicial, teto = BACKOFF[classe]
+        janela = min(inicial * 2 ** (self.falhas_seguidas - 1), teto)
+        self.estado = "aberto"
+        self.aberto_ate = time.time() + janela
+        return janela
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, dados):
+        breaker = cls(dados["modelo"])
+        breaker.__dict__.update(dados)
+        if breaker.estado == "meio_aberto":
+            breaker.estado = "aberto"  # Sonda interrompida pelo restart: testa de novo
+        return breaker
+
+
+class ModelHealth:
+    def __init__(self, path=HEALTH_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.breakers = {}
+        self.sonda = None        # Callable(modelo) que faz uma chamada mínima (levanta erro se falhar)
+        self._sonda_thread = None
+        self._carregar()
+
+    # --- PERSISTÊNCIA ---
+    def _carregar(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for dados in json.load(f).values():
+                    self.breakers[dados["modelo"]] = CircuitBreaker.from_dict(dados)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _salvar(self):
+        dados = {m: b.to_dict() for m, b in self.breakers.items()}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(dados, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ [SAÚDE] Não consegui salvar o estado dos modelos: {e}")
+
+    def _breaker(self, modelo):
+        if modelo not in self.breakers:
+            self.breakers[modelo] = CircuitBreaker(modelo)
+        return self.breakers[modelo]
+
+    # --- ROTEAMENTO ---
+    def ordem(self, roster):
+        """
+        Modelos fechados, do mais saudável para o menos (empate: ordem do roster).
+        Se todos estiverem abertos, devolve o que reabre primeiro (melhor que desistir).
+        """
+        with self.lock:
+            agora = time.time()
+            disponiveis = []
+            for indice, modelo in enumerate(roster):
+                breaker = self._breaker(modelo)
+                if breaker.estado == "fechado":
+                    latencia = int(breaker.latencia // LATENCY_BUCKET_S) if breaker.latencia else 0
+                    disponiveis.append(((-round(breaker.taxa_atual(agora), 1), latencia, indice), modelo))
+            if disponiveis:
+                return [modelo for _, modelo in sorted(disponiveis)]
+            return sorted(roster, key=lambda m: self.breakers[m].aberto_ate)[:1]
+
+    def sucesso(self, modelo, latencia=None):
+        with self.lock:
+            breaker = self._breaker(modelo)
+            mudou = breaker.estado != "fechado"
+            breaker.registrar_sucesso(latencia)
+            self._salvar()
+        if mudou:
+            print(f"✅ [SAÚDE] {modelo} voltou.")
+
+    def falha(self, modelo, erro):
+        """Registra a falha e devolve a classe do erro."""
+        classe = classificar_erro(erro)
+        if classe == "pedido":
+            print(f"↪️ [SAÚDE] {modelo} não atende este pedido ({str(erro)[:120]}). Continua no roster.")
+            return classe
+        with self.lock:
+            janela = self._breaker(modelo).registrar_falha(classe, str(erro))
+            self._salvar()
+        print(f"🔌 [SAÚDE] {modelo} fora por {janela:.0f}s ({classe}).")
+        self._garantir_sonda()
+        return classe
+
+    # --- SONDA (MEIO-ABERTO) ---
+    def configurar_sonda(self, sonda):
+        """Define a chamada de teste e já agenda as janelas que vieram abertas do disco."""
+        self.sonda = sonda
+        if any(b.estado != "fechado" for b in self.breakers.values()):
+            self._garantir_sonda()
+
+    def _garantir_sonda(self):
+        if self.sonda is None or (self._sonda_thread and self._sonda_thread.is_alive()):
+            return
+        self._sonda_thread = threading.Thread(target=self._loop_sonda, daemon=True, name="sonda-modelos")
+        self._sonda_thread.start()
+
+    def _loop_sonda(self):
+        while True:
+            time.sleep(PROBE_INTERVAL_S)
+            with self.lock:
+                vencidos = [b for b in self.breakers.values()
+                            if b.estado == "aberto" and b.aberto_ate <= time.time()]
+                for breaker in vencidos:
+                    breaker.estado = "meio_aberto"
+                abertos = any(b.estado != "fechado" for b in self.breakers.values())
+            for breaker in vencidos:
+                inicio = time.time()
+                try:
+                    self.sonda(breaker.modelo)
+                    self.sucesso(breaker.modelo, time.time() - inicio)
+                except Exception as e:
+                    if self.falha(breaker.modelo, e) == "pedido":
+                        # Recusou só o pedido da sonda: o modelo respondeu, então está de pé
+                        # (sem isso o breaker ficaria meio-aberto para sempre, fora do roster)
+                        self.sucesso(breaker.modelo, time.time() - inicio)
+            if not abertos:
+                return  # Tudo fechado: a sonda dorme até a próxima falha
+
+    def stats(self):
+        with self.lock:
+            agora = time.time()
+            return {
+                modelo: {
+                    "estado": b.estado,
+                    "reabre_em_s": max(round(b.aberto_ate - agora), 0) if b.estado != "fechado" else 0,
+                    "classe": b.classe,
+                    "taxa_sucesso": round(b.taxa_atual(agora), 3),
+                    "latencia_s": round(b.latencia, 3) if b.latencia is not None else None,
+                }
+                for modelo, b in self.breakers.items()
+            }
+
+
+_health = None
+_health_lock = threading.Lock()
+
+def get_health():
+    global _health
+    if _health is None:
+        with _health_lock:
+            if _health is None:
+                _health = ModelHealth()
+    return _health
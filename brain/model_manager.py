@@ -1,6 +1,11 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+import time
+import asyncio
+import threading
+import concurrent.futures
+from langchain_core.messages import HumanMessage, SystemMessage
+from brain import model_health, llm_providers, prompt_cache
+from brain.prompt_cache import PromptMontado
 
 # --- LISTA DE PRIORIDADE (ROSTER) ---
 # Copiado da sua lista de disponíveis. 
@@ -14,68 +19,469 @@ MODEL_ROSTER = [
     "models/gemini-pro-latest"                  # 6. Último recurso (Lento mas funciona)
 ]
 
-def get_fallback_model(callbacks=[]):
+# --- DEGRAU LOCAL ---
+# Sem rede ou sem cota, o Ollama local ainda responde (ARGUS_LOCAL_LLM=0 desliga).
+LOCAL_MODEL = os.getenv("ARGUS_LOCAL_MODEL", "llama3.2")
+if os.getenv("ARGUS_LOCAL_LLM", "1") != "0":
+    MODEL_ROSTER.append(f"ollama:{LOCAL_MODEL}")
+
+# Roster inteiro por variável (ex: teste de carga offline):
+#   ARGUS_LLM_ROSTER="mock:ttft=0.2,tps=50"
+#   ARGUS_LLM_ROSTER="mock:lento,ttft=4;mock:rapido,ttft=0.3"   (separador ';')
+if os.getenv("ARGUS_LLM_ROSTER"):
+    MODEL_ROSTER = [m.strip() for m in os.environ["ARGUS_LLM_ROSTER"].split(";") if m.strip()]
+
+# --- POOL DE CLIENTES ---
+# Um chat model por (modelo, configuração), reaproveitado entre turnos:
+# o transporte (gRPC/HTTP + TLS) é aberto uma vez só. Os callbacks NÃO ficam no
+# cliente; vão em cada chamada (config={"callbacks": ...}).
+DEFAULT_TEMPERATURE = 0.7
+WARMUP_ENABLED = os.getenv("ARGUS_LLM_WARMUP", "1") != "0"
+WARMUP_PROMPT = "Responda apenas: ok"
+
+_client_pool = {}
+_pool_lock = threading.Lock()
+
+
+def get_client(model_name, api_key, temperature=DEFAULT_TEMPERATURE):
+    """Devolve o cliente do pool (cria na primeira vez)."""
+    chave = (model_name, api_key, temperature)
+    llm = _client_pool.get(chave)
+    if llm is None:
+        with _pool_lock:
+            llm = _client_pool.get(chave)
+            if llm is None:
+                llm = llm_providers.criar_cliente(model_name, api_key, temperature)
+                _client_pool[chave] = llm
+    return llm
+
+
+def roster_disponivel():
+    """Roster sem os modelos Gemini quando não há GOOGLE_API_KEY (sobra o local/mock)."""
+    if os.getenv("GOOGLE_API_KEY"):
+        return list(MODEL_ROSTER)
+    return [m for m in MODEL_ROSTER if not llm_providers.precisa_chave(m)]
+
+
+def montar_mensagem(prompt, image_data=None, sem_prefixo=False):
+    """
+    Texto puro ou mensagem multimodal (texto + imagem em base64).
+    PromptMontado vira [sistema: prefixo estável, humano: sufixo]; sem_prefixo=True
+    quando o prefixo já está num cache explícito do provedor.
+    """
+    texto = prompt.sufixo if isinstance(prompt, PromptMontado) else prompt
+    if image_data:
+        conteudo = [
+            {"type": "text", "text": texto},
+            {
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}
+            }
+        ]
+    elif isinstance(prompt, PromptMontado):
+        conteudo = texto
+    else:
+        return prompt
+    mensagens = [HumanMessage(content=conteudo)]
+    if isinstance(prompt, PromptMontado) and not sem_prefixo:
+        mensagens.insert(0, SystemMessage(content=prompt.prefixo))
+    return mensagens
+
+
+def aquecer_clientes(tentativas=3):
+    """
+    Abre a conexão do primeiro modelo do roster que responder (chamada mínima),
+    para o 1º turno não pagar o handshake. Roda em background no app.py.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not WARMUP_ENABLED:
+        return
+    for model_name in health.ordem(roster_disponivel())[:tentativas]:
+        inicio = time.time()
+        try:
+            get_client(model_name, api_key).invoke(WARMUP_PROMPT)
+            health.sucesso(model_name)
+            print(f"🔥 [MODELOS] {model_name} aquecido em {time.time() - inicio:.2f}s.")
+            return
+        except Exception as e:
+            print(f"⚠️ [MODELOS] Aquecimento falhou em {model_name}: {str(e).split(':')[0]}")
+            health.falha(model_name, e)
+
+
+def _sondar(model_name):
+    """Chamada mínima usada pelo disjuntor meio-aberto."""
+    get_client(model_name, os.getenv("GOOGLE_API_KEY")).invoke(WARMUP_PROMPT)
+
+
+health = model_health.get_health()
+health.configurar_sonda(_sondar)
+prefix_cache = prompt_cache.get_prefix_cache()
+
+
+# ==========================================
+# ⚡ GERAÇÃO ASSÍNCRONA (astream)
+# ==========================================
+# Uma única máquina de geração para todo o app: astream() entrega os tokens como
+# iterador assíncrono, com a cascata do roster, os disjuntores, o hedge e prazos.
+# Os chamadores síncronos (handlers do Socket.IO, wrapper antigo) usam o
+# GeracaoStream, que roda o astream num loop asyncio de fundo e puxa um token
+# por vez: se o consumidor (voz, socket) atrasa, o modelo não é lido à frente
+# (back-pressure), e cancelar fecha o stream HTTP na hora.
+GENERATION_DEADLINE_S = float(os.getenv("ARGUS_LLM_DEADLINE", "120"))         # Turno inteiro
+FIRST_TOKEN_DEADLINE_S = float(os.getenv("ARGUS_LLM_FIRST_TOKEN_DEADLINE", "20"))  # Por modelo da cascata
+
+# --- HEDGE (CORTA A CAUDA DE LATÊNCIA) ---
+# Se o 1º token do modelo principal não chegar até o prazo, dispara o próximo
+# modelo saudável em paralelo. Quem transmitir primeiro vence; o outro é fechado.
+# Só os tokens do vencedor saem do astream, então o usuário nunca ouve duas
+# respostas misturadas. Custa uma chamada extra só nos turnos lentos.
+# Desligado por padrão (ARGUS_HEDGE=1 liga).
+HEDGE_ENABLED = os.getenv("ARGUS_HEDGE", "0") == "1"
+HEDGE_DEADLINE_S = float(os.getenv("ARGUS_HEDGE_DEADLINE", "2.5"))
+
+_hedge_stats = {"turnos": 0, "hedges": 0, "vitorias_primario": 0, "vitorias_hedge": 0}
+_hedge_lock = threading.Lock()
+
+
+class PrazoEsgotado(Exception):
+    """O turno passou do ARGUS_LLM_DEADLINE (ou nenhum modelo mandou o 1º token a tempo)."""
+
+
+def _contar(campo):
+    with _hedge_lock:
+        _hedge_stats[campo] += 1
+
+
+def hedge_stats():
+    with _hedge_lock:
+        dados = dict(_hedge_stats)
+    dados["ativo"] = HEDGE_ENABLED
+    dados["prazo_s"] = HEDGE_DEADLINE_S
+    return dados
+
+
+def _texto(chunk):
+    """Conteúdo de um AIMessageChunk (string ou lista de partes multimodais)."""
+    conteudo = getattr(chunk, "content", chunk)
+    if isinstance(conteudo, list):
+        return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in conteudo)
+    return conteudo or ""
+
+
+async def _fechar(stream):
+    try:
+        await stream.aclose()
+    except Exception:
+        pass
+
+
+# --- TELEMETRIA ---
+# Cada turno vira um registro (modelo, persona, tokens, TTFT, latência, tokens/s,
+# profundidade na cascata e classe do erro). O app.py liga o destino (SQLite + socket)
+# com configurar_telemetria(); aqui o model_manager só mede.
+_telemetria = None
+
+
+def configurar_telemetria(destino):
+    """destino(registro) é chamado fora do loop de geração, uma vez por turno."""
+    global _telemetria
+    _telemetria = destino
+
+
+def _estimar_tokens(texto):
+    return len(texto) // 4  # ~4 caracteres por token (mesma conta do context_builder)
+
+
+def _novo_registro(prompt, persona, tamanho_cascata):
+    return {
+        "modelo": None, "persona": persona,
+        "tokens_prompt": _estimar_tokens(prompt), "tokens_saida": 0,
+        "ttft_ms": None, "latencia_ms": None, "tokens_por_s": None,
+        "profundidade": tamanho_cascata, "classe_erro": None, "hedge": False,
+    }
+
+
+def _fechar_registro(registro, inicio_turno, texto, uso):
+    """Preenche os totais; usa a contagem do provedor (usage_metadata) quando ele manda."""
+    duracao = time.time() - inicio_turno
+    registro["latencia_ms"] = round(duracao * 1000)
+    registro["tokens_saida"] = _estimar_tokens(texto)
+    if uso:
+        registro["tokens_prompt"] = uso.get("input_tokens") or registro["tokens_prompt"]
+        registro["tokens_saida"] = uso.get("output_tokens") or registro["tokens_saida"]
+    if registro["ttft_ms"] is not None and registro["tokens_saida"]:
+        geracao_s = duracao - registro["ttft_ms"] / 1000
+        registro["tokens_por_s"] = round(registro["tokens_saida"] / geracao_s, 1) if geracao_s > 0 else None
+
+
+def _entregar_telemetria(registro):
+    try:
+        _telemetria(registro)
+    except Exception as e:
+        print(f"⚠️ [TELEMETRIA] Falha ao registrar geração: {e}")
+
+
+async def _largada(ordem, api_key, prompt, image_data, limite, registro):
+    """
+    Percorre a cascata até um modelo mandar o 1º chunk (com hedge entre os dois
+    primeiros, se ligado). Devolve (modelo, stream, 1º chunk, inicio).
+    """
+    loop = asyncio.get_running_loop()
+    restantes = list(ordem)
+    last_error = None
+    hedge = HEDGE_ENABLED and len(restantes) > 1
+    if hedge:
+        _contar("turnos")
+
+    while restantes:
+        corredores = {}  # task do próximo chunk -> (modelo, stream, inicio)
+
+        async def largar(model_name):
+            inicio = time.time()
+            extras = {}
+            if isinstance(prompt, PromptMontado) and llm_providers.precisa_chave(model_name):
+                nome = await loop.run_in_executor(
+                    None, prefix_cache.cache_explicito, llm_providers.separar(model_name)[1], prompt, api_key
+                )
+                if nome:
+                    extras["cached_content"] = nome
+            mensagem = montar_mensagem(prompt, image_data, sem_prefixo=bool(extras))
+            stream = get_client(model_name, api_key).astream(mensagem, **extras).__aiter__()
+            corredores[asyncio.ensure_future(stream.__anext__())] = (model_name, stream, inicio)
+
+        await largar(restantes.pop(0))
+        primario = next(iter(corredores.values()))[0]
+        hedge_em = loop.time() + HEDGE_DEADLINE_S if hedge and restantes else None
+        prazo = min(loop.time() + FIRST_TOKEN_DEADLINE_S, limite)
+        hedge = False  # A corrida só acontece na 1ª rodada da cascata
+        disparou_hedge = False
+
+        try:
+            while corredores:
+                espera = (hedge_em if hedge_em is not None else prazo) - loop.time()
+                feitos, _ = await asyncio.wait(list(corredores), timeout=max(espera, 0),
+                                               return_when=asyncio.FIRST_COMPLETED)
+                if not feitos:
+                    if hedge_em is not None and loop.time() < prazo:
+                        print(f"🏁 [HEDGE] {primario} sem token em {HEDGE_DEADLINE_S}s. "
+                              f"Disparando {restantes[0]} em paralelo.")
+                        _contar("hedges")
+                        registro["hedge"] = True
+                        await largar(restantes.pop(0))
+                        hedge_em = None
+                        disparou_hedge = True
+                        continue
+                    # Ninguém falou dentro do prazo: conta como falha de todos que estavam correndo
+                    for tarefa, (model_name, stream, _) in corredores.items():
+                        tarefa.cancel()
+                        await _fechar(stream)
+                        last_error = f"sem resposta em {FIRST_TOKEN_DEADLINE_S}s"
+                        print(f"⏱️ Falha no {model_name}: {last_error}")
+                        registro["modelo"] = model_name
+                        health.falha(model_name, TimeoutError(last_error))
+                    corredores.clear()
+                    break
+
+                for tarefa in feitos:
+                    model_name, stream, inicio = corredores.pop(tarefa)
+                    try:
+                        chunk = tarefa.result()
+                    except StopAsyncIteration:
+                        chunk = None  # Resposta vazia: ainda é uma resposta
+                    except Exception as e:
+                        last_error = str(e)
+                        print(f"⚠️ Falha no {model_name}: {last_error.split(':')[0]}")
+                        registro["modelo"] = model_name
+                        await _fechar(stream)
+                        if health.falha(model_name, e) == "auth":
+                            # Chave inválida: os outros Gemini vão falhar igual (o local não usa chave)
+                            restantes[:] = [m for m in restantes if not llm_providers.precisa_chave(m)]
+                        continue
+
+                    # Vencedor: fecha quem ainda estava correndo
+                    for outra, (_, outro_stream, _) in corredores.items():
+                        outra.cancel()
+                        await _fechar(outro_stream)
+                    if disparou_hedge:
+                        _contar("vitorias_primario" if model_name == primario else "vitorias_hedge")
+                        print(f"🏁 [HEDGE] Venceu: {model_name} (1º token em {time.time() - inicio:.2f}s).")
+                    return model_name, stream, chunk, inicio
+        except asyncio.CancelledError:
+            # Turno cancelado antes do 1º token (esperando a corrida, disparando o hedge
+            # ou fechando um perdedor): ninguém fica correndo à toa
+            for tarefa, (_, stream, _) in corredores.items():
+                tarefa.cancel()
+                await _fechar(stream)
+            raise
+
+        if loop.time() >= limite:
+            break
+
+    if loop.time() >= limite:
+        raise PrazoEsgotado(f"Nenhum modelo respondeu dentro do prazo ({last_error}).")
+    raise RuntimeError(f"Todos os modelos falharam. Erro final: {last_error}")
+
+
+async def astream(prompt, image_data=None, deadline_s=None, persona=None):
+    """
+    Gera a resposta token a token (async generator de strings).
+    Cancelar a task que consome (ou chamar aclose()) fecha o stream do modelo.
+    Levanta PrazoEsgotado se o turno passar de deadline_s.
+    Ao terminar (sucesso, falha ou cancelamento) publica um registro de telemetria.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    roster = roster_disponivel()
+    if not roster:
+        raise RuntimeError("'GOOGLE_API_KEY' não encontrada no .env e nenhum modelo local no roster")
+    if image_data:
+        print("📸 Enviando imagem para o modelo...")
+
+    loop = asyncio.get_running_loop()
+    prazo_s = deadline_s or GENERATION_DEADLINE_S
+    limite = loop.time() + prazo_s
+    ordem = health.ordem(roster)
+    registro = _novo_registro(str(prompt), persona, len(ordem))
+    if isinstance(prompt, PromptMontado):
+        registro["prefixo_reusado"] = prefix_cache.registrar(prompt)
+    inicio_turno = time.time()
+    stream = None
+    uso = None
+    texto = []
+    try:
+        model_name, stream, chunk, inicio = await _largada(ordem, api_key, prompt, image_data, limite, registro)
+        registro["modelo"] = model_name
+        registro["profundidade"] = ordem.index(model_name)
+        ttft = time.time() - inicio
+        registro["ttft_ms"] = round((time.time() - inicio_turno) * 1000)
+        while chunk is not None:
+            uso = getattr(chunk, "usage_metadata", None) or uso
+            token = _texto(chunk)
+            if token:
+                texto.append(token)
+                yield token
+            restante = limite - loop.time()
+            if restante <= 0:
+                raise PrazoEsgotado(f"{model_name} passou do prazo de {prazo_s}s.")
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), restante)
+            except StopAsyncIteration:
+                chunk = None
+            except asyncio.TimeoutError:
+                raise PrazoEsgotado(f"{model_name} passou do prazo de {prazo_s}s.")
+        health.sucesso(model_name, ttft)
+    except PrazoEsgotado:
+        registro["classe_erro"] = "prazo"
+        raise  # Prazo do turno não é culpa do modelo
+    except (asyncio.CancelledError, GeneratorExit):
+        registro["classe_erro"] = "cancelado"
+        raise
+    except Exception as e:
+        registro["classe_erro"] = model_health.classificar_erro(e)
+        if stream is not None:
+            # Caiu no meio da resposta: não dá pra trocar de modelo sem repetir texto
+            health.falha(model_name, e)
+        raise
+    finally:
+        if stream is not None:
+            await _fechar(stream)
+        _fechar_registro(registro, inicio_turno, "".join(texto), uso)
+        prefix_cache.registrar_uso(uso)
+        if _telemetria is not None:
+            loop.run_in_executor(None, _entregar_telemetria, registro)
+
+
+# --- PONTE SÍNCRONA ---
+_loop = None
+_loop_lock = threading.Lock()
+
+def _loop_de_fundo():
+    """Loop asyncio dedicado às gerações (uma thread, muitas conversas)."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True, name="llm-async").start()
+                _loop = loop
+    return _loop
+
+
+class GeracaoStream:
+    """
+    Iterador síncrono sobre o astream. Cada next() pede UM token ao loop de
+    fundo e espera por ele: o modelo só é lido no ritmo do consumidor.
+    cancelar() pode ser chamado de outra thread (ex: evento 'cancel_generation').
+    """
+    def __init__(self, prompt, image_data=None, deadline_s=None, persona=None):
+        self.loop = _loop_de_fundo()
+        self._agen = astream(prompt, image_data=image_data, deadline_s=deadline_s, persona=persona)
+        self._pendente = None
+        self._lock = threading.Lock()
+        self.cancelado = False
+        self.texto = ""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._lock:
+            if self.cancelado:
+                raise StopIteration
+            self._pendente = asyncio.run_coroutine_threadsafe(self._agen.__anext__(), self.loop)
+        try:
+            token = self._pendente.result()
+        except (StopAsyncIteration, concurrent.futures.CancelledError):
+            raise StopIteration
+        self.texto += token
+        return token
+
+    def cancelar(self):
+        with self._lock:
+            if self.cancelado:
+                return
+            self.cancelado = True
+            if self._pendente is not None and not self._pendente.done():
+                self._pendente.cancel()  # Interrompe o await do chunk: o finally do astream fecha o stream
+            else:
+                asyncio.run_coroutine_threadsafe(self._agen.aclose(), self.loop)
+
+
+class RespostaGerada:
+    """O que o wrapper devolve (mesma interface do AIMessage que o app usa: .content)."""
+    def __init__(self, content, falhou=False):
+        self.content = content
+        self.falhou = falhou  # Não entra no cache semântico
+
+
+def get_fallback_model(callbacks=[], persona=None):
     """
     Gerenciador de Modelos com Sistema de Cascata.
     Tenta invocar os modelos da lista em ordem. Se um falhar (Cota/404), tenta o próximo.
+    Versão síncrona: consome o astream e repassa cada token aos callbacks.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    
-    if not api_key:
+    if not roster_disponivel():
         print("❌ ERRO CRÍTICO: 'GOOGLE_API_KEY' não encontrada no .env")
         return None
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("⚠️ [MODELOS] Sem 'GOOGLE_API_KEY': usando só os modelos locais do roster.")
 
     # Função Wrapper que será chamada pelo app.py
-    def gemini_wrapper(prompt, image_data=None):
-        last_error = None
-        
-        # --- LOOP DE TENTATIVAS (CASCATA) ---
-        for model_name in MODEL_ROSTER:
-            try:
-                # print(f"🔄 Tentando conectar no modelo: {model_name}...")
-                
-                # 1. Configura o modelo da vez
-                llm = ChatGoogleGenerativeAI(
-                    model=model_name,
-                    google_api_key=api_key,
-                    temperature=0.7,
-                    streaming=True, # Essencial para voz/chat fluir
-                    callbacks=callbacks,
-                    convert_system_message_to_human=True
-                )
-                
-                # 2. Prepara a mensagem (Texto ou Multimodal)
-                if image_data:
-                    print(f"📸 Enviando imagem para {model_name}...")
-                    message = HumanMessage(
-                        content=[
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}
-                            }
-                        ]
-                    )
-                    # Tenta invocar (Aqui é onde o erro acontece se falhar)
-                    return llm.invoke([message])
-                
-                else:
-                    # Modo Texto Normal
-                    return llm.invoke(prompt)
-
-            except Exception as e:
-                # Se deu erro (404, 429, etc), captura e tenta o próximo
-                error_str = str(e)
-                print(f"⚠️ Falha no {model_name}: {error_str.split(':')[0]}") # Printa só o resumo do erro
-                last_error = error_str
-                continue # Pula para o próximo modelo da lista
-        
-        # --- FIM DO LOOP (SE TODOS FALHAREM) ---
-        print("❌ TODOS OS MODELOS FALHARAM.")
-        
-        class FakeResponse:
-            content = f"Desculpe, chefe. Todos os sistemas neurais estão fora do ar. Erro final: {last_error}"
-        return FakeResponse()
+    def gemini_wrapper(prompt, image_data=None, ao_iniciar=None):
+        geracao = GeracaoStream(prompt, image_data=image_data, persona=persona)
+        if ao_iniciar:
+            ao_iniciar(geracao)  # Ex: job do app, para poder cancelar no meio
+        try:
+            for token in geracao:
+                for callback in callbacks:
+                    callback.on_llm_new_token(token)
+            return RespostaGerada(geracao.texto, falhou=geracao.cancelado)
+        except Exception as e:
+            print(f"❌ GERAÇÃO FALHOU: {str(e).split(':')[0]}")
+            if geracao.texto:
+                return RespostaGerada(geracao.texto, falhou=True)  # Fica o que já foi falado
+            return RespostaGerada(
+                f"Desculpe, chefe. Todos os sistemas neurais estão fora do ar. {e}", falhou=True
+            )
 
     # Retorna a função wrapper pronta para uso
-    return gemini_wrapper
\ No newline at end of file
+    return gemini_wrapper
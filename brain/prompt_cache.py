@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import datetime
+import threading
+
+# ==========================================
+# 🧷 CACHE DE PREFIXO DO PROMPT
+# ==========================================
+# Todo prompt do Argus vira PREFIXO estável (instrução da persona + regras fixas
+# do template) + SUFIXO volátil (contexto do RAG, log, pergunta). O prefixo vai
+# primeiro e idêntico byte a byte entre turnos, como mensagem de sistema: é o que
+# deixa o cache implícito do provedor (Gemini/Ollama) reaproveitar o começo.
+#
+# Com ARGUS_PROMPT_CACHE=explicito, prefixos grandes o bastante viram um
+# CachedContent do Gemini (o modelo lê o prefixo do cache e só cobra o sufixo).
+# Abaixo do mínimo do provedor, ou em outros provedores, fica só o controle
+# local por hash, que alimenta as estatísticas de reaproveitamento.
+CACHE_MODE = os.getenv("ARGUS_PROMPT_CACHE", "implicito")      # implicito | explicito
+GEMINI_MIN_TOKENS = int(os.getenv("ARGUS_PROMPT_CACHE_MIN_TOKENS", "1024"))  # Mínimo do CachedContent
+CACHE_TTL_S = int(os.getenv("ARGUS_PROMPT_CACHE_TTL", "3600"))
+RENEW_MARGIN_S = 60        # Recria o cache explícito um pouco antes de expirar
+MAX_PREFIXES = 256         # Prefixos distintos acompanhados localmente
+CHARS_PER_TOKEN = 4
+
+
+class PromptMontado:
+    """Prompt dividido em prefixo cacheável + sufixo volátil."""
+    def __init__(self, prefixo, sufixo):
+        self.prefixo = prefixo.strip()
+        self.sufixo = sufixo.strip()
+        self.chave = hashlib.sha256(self.prefixo.encode("utf-8")).hexdigest()[:16]
+
+    def __str__(self):
+        return f"{self.prefixo}\n\n{self.sufixo}"
+
+
+def montar(prefixo, sufixo):
+    return PromptMontado(prefixo, sufixo)
+
+
+class PrefixCache:
+    def __init__(self, modo=CACHE_MODE):
+        self.modo = modo
+        self.lock = threading.Lock()
+        self.prefixos = {}       # chave -> {"tokens", "usos", "ultimo_uso"}
+        self.explicitos = {}     # (modelo, chave) -> (nome do CachedContent, expira_em)
+        self.sem_suporte = {}    # modelo -> até quando não tentar de novo o CachedContent
+        self.contadores = {"turnos": 0, "reusos": 0, "tokens_reusados": 0,
+                           "explicitos_criados": 0, "explicitos_usados": 0, "explicitos_erros": 0,
+                           "tokens_lidos_do_cache": 0}
+
+    # --- CONTROLE LOCAL ---
+    def registrar(self, prompt):
+        """Conta o turno; devolve True se o prefixo já tinha sido enviado antes."""
+        tokens = len(prompt.prefixo) // CHARS_PER_TOKEN
+        with self.lock:
+            self.contadores["turnos"] += 1
+            info = self.prefixos.get(prompt.chave)
+            if info is None:
+                if len(self.prefixos) >= MAX_PREFIXES:
+                    antigo = min(self.prefixos, key=lambda c: self.prefixos[c]["ultimo_uso"])
+                    del self.prefixos[antigo]
+                info = self.prefixos[prompt.chave] = {"tokens": tokens, "usos": 0, "ultimo_uso": 0}
+            reuso = info["usos"] > 0
+            info["usos"] += 1
+            info["ultimo_uso"] = time.time()
+            if reuso:
+                self.contadores["reusos"] += 1
+                self.contadores["tokens_reusados"] += tokens
+        return reuso
+
+    def registrar_uso(self, uso):
+        """Tokens que o provedor disse ter lido do cache (usage_metadata.input_token_details)."""
+        lidos = ((uso or {}).get("input_token_details") or {}).get("cache_read") or 0
+        if lidos:
+            with self.lock:
+                self.contadores["tokens_lidos_do_cache"] += lidos
+
+    # --- CACHE EXPLÍCITO (GEMINI) ---
+    def cache_explicito(self, model_name, prompt, api_key):
+        """Nome do CachedContent para (modelo, prefixo), criando se valer a pena; None = manda o prefixo inteiro."""
+        if self.modo != "explicito" or self.sem_suporte.get(model_name, 0) > time.time():
+            return None
+        if len(prompt.prefixo) // CHARS_PER_TOKEN < GEMINI_MIN_TOKENS:
+            return None
+        chave = (model_name, prompt.chave)
+        with self.lock:
+            nome, expira_em = self.explicitos.get(chave, (None, 0))
+            if nome and expira_em - RENEW_MARGIN_S > time.time():
+                self.contadores["explicitos_usados"] += 1
+                return nome
+        try:
+            import google.generativeai as genai
+            from google.generativeai import caching
+            genai.configure(api_key=api_key)
+            cache = caching.CachedContent.create(
+                model=model_name, system_instruction=prompt.prefixo,
+                ttl=datetime.timedelta(seconds=CACHE_TTL_S)
+            )
+        except Exception as e:
+            print(f"⚠️ [PROMPT CACHE] {model_name} não aceitou cache explícito: {str(e).split(':')[0]}")
+            with self.lock:
+                self.sem_suporte[model_name] = time.time() + CACHE_TTL_S
+                self.contadores["explicitos_erros"] += 1
+            return None
+        with self.lock:
+            self.explicitos[chave] = (cache.name, time.time() + CACHE_TTL_S)
+            self.contadores["explicitos_criados"] += 1
+        print(f"🧷 [PROMPT CACHE] Prefixo {prompt.chave} em cache no {model_name} ({CACHE_TTL_S}s).")
+        return cache.name
+
+    def stats(self):
+        with self.lock:
+            dados = dict(self.contadores)
+            dados["prefixos_distintos"] = len(self.prefixos)
+        dados["modo"] = self.modo
+        dados["taxa_reuso"] = round(dados["reusos"] / dados["turnos"], 3) if dados["turnos"] else 0.0
+        return dados
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_prefix_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PrefixCache()
+    return _cache
@@ -0,0 +1,108 @@
+import os
+import re
+import time
+import threading
+
+# ==========================================
+# 🪪 SESSÕES POR CLIENTE
+# ==========================================
+# Cada tela do dashboard tem a sua sessão: persona ativa, tarefa em foco e a
+# conversa (memória de curto prazo). A chave é o id que o navegador guarda no
+# localStorage e manda no connect (auth.cliente): recarregar a página ou cair a
+# rede não perde a sessão; sem id, a sessão vale só para aquele sid.
+# O ouvido (listen_core) e a visão (vision_core) entram como cliente "host":
+# uma sessão só para quem fala/gesticula na frente da máquina do Argus.
+# Microfone, alto-falante e câmera são da máquina, não da sessão: ficam no app.
+HOST_CLIENT = "host"
+SESSION_TTL_S = int(os.getenv("ARGUS_SESSION_TTL", str(24 * 3600)))  # Sessão sem tela aberta some depois disso
+MAX_SESSIONS = 200
+
+
+def _limpar_id(cliente):
+    cliente = re.sub(r"[^\w\-]", "", str(cliente or ""))[:64]
+    return cliente or None
+
+
+class Sessao:
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.conversa = f"cliente:{cliente}"  # Chave na conversation_memory
+        self.active_brain = None               # dict da persona (None = padrão)
+        self.focus_task = None
+        self.sids = set()
+        self.criada_em = time.time()
+        self.ultimo_uso = self.criada_em
+
+
+class SessionStore:
+    def __init__(self, ttl_s=SESSION_TTL_S):
+        self.ttl_s = ttl_s
+        self.lock = threading.Lock()
+        self.sessoes = {}      # cliente -> Sessao
+        self.por_sid = {}      # sid -> cliente
+
+    def conectar(self, sid, cliente=None):
+        """Liga o sid à sessão do cliente (cria se for nova)."""
+        cliente = _limpar_id(cliente) or f"sid-{sid}"
+        with self.lock:
+            self._podar()
+            sessao = self.sessoes.get(cliente)
+            if sessao is None:
+                sessao = self.sessoes[cliente] = Sessao(cliente)
+            sessao.sids.add(sid)
+            sessao.ultimo_uso = time.time()
+            self.por_sid[sid] = cliente
+            return sessao
+
+    def desconectar(self, sid):
+        with self.lock:
+            cliente = self.por_sid.pop(sid, None)
+            sessao = self.sessoes.get(cliente)
+            if sessao:
+                sessao.sids.discard(sid)
+                sessao.ultimo_uso = time.time()
+
+    def de(self, sid):
+        """Sessão do sid (evento antes do connect, ex: servidor reiniciado, cai numa sessão própria)."""
+        with self.lock:
+            cliente = self.por_sid.get(sid)
+            sessao = self.sessoes.get(cliente)
+            if sessao is not None:
+                sessao.ultimo_uso = time.time()
+                return sessao
+        return self.conectar(sid)
+
+    def foco_recente(self):
+        """Tarefa em foco mais recente entre as sessões (o 'gerar plano' falado usa a da tela)."""
+        with self.lock:
+            com_foco = [s for s in self.sessoes.values() if s.focus_task]
+            return max(com_foco, key=lambda s: s.ultimo_uso).focus_task if com_foco else None
+
+    def _podar(self):
+        """Remove sessões sem tela aberta há mais de ttl_s (chamar com o lock)."""
+        agora = time.time()
+        ociosas = sorted((s for s in self.sessoes.values() if not s.sids), key=lambda s: s.ultimo_uso)
+        for sessao in ociosas:
+            if agora - sessao.ultimo_uso <= self.ttl_s and len(self.sessoes) < MAX_SESSIONS:
+                break  # Daqui pra frente são mais novas
+            del self.sessoes[sessao.cliente]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sessoes": len(self.sessoes),
+                "conectadas": sum(1 for s in self.sessoes.values() if s.sids),
+                "sids": len(self.por_sid),
+            }
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+def get_sessions():
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                _sessions = SessionStore()
+    return _sessions
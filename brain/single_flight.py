@@ -0,0 +1,134 @@
+import re
+import hashlib
+import threading
+
+# ==========================================
+# 🛫 SINGLE-FLIGHT (PEDIDOS IGUAIS EM VOO)
+# ==========================================
+# Duplo clique, ou o ouvido (listen_core) e a caixa de texto mandando a mesma
+# frase ao mesmo tempo, não disparam duas gerações: o segundo pedido com a mesma
+# chave (pergunta normalizada + persona + impressão digital do contexto) se pendura
+# no voo que já está no ar. Quem chega atrasado recebe o que já saiu (replay) e
+# depois os tokens novos, na mesma ordem do líder.
+# O voo sai do registro quando termina: o pedido seguinte gera de novo (ou cai
+# no cache semântico).
+
+
+def normalizar(texto):
+    """Minúsculas, espaços colapsados, sem pontuação no fim ('Oi  Argus!' == 'oi argus')."""
+    return re.sub(r"\s+", " ", (texto or "").lower()).strip().rstrip(".!?…;, ")
+
+
+def chave(*partes):
+    return hashlib.sha1("|".join(normalizar(str(p)) for p in partes).encode("utf-8")).hexdigest()
+
+
+class Voo:
+    """Uma geração em andamento, com a lista de quem está assistindo."""
+    def __init__(self, chave_voo):
+        self.chave = chave_voo
+        self.lock = threading.Lock()
+        self.tokens = []
+        self.assinantes = []      # Objetos com on_llm_new_token(token)
+        self.destinos = set()     # Para onde o stream já está indo (ex: sid); None = todo mundo
+        self.concluido = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.pedidos = 1          # Quantos pedidos foram atendidos por este voo
+
+    def anexar(self, destino, assinante, iniciar=None):
+        """
+        Pendura um destino no voo. Quem chega atrasado recebe primeiro o que já
+        foi gerado (replay). Devolve False se o voo já pousou (aí é tarde: trate
+        como pedido novo ou use o resultado). Todo assinante entra, mesmo com o
+        destino já coberto: cada pedido tem o próprio stream e é concluído no pouso.
+        """
+        with self.lock:
+            if self.concluido.is_set():
+                return False
+            if iniciar:
+                iniciar()
+            for token in self.tokens:
+                assinante.on_llm_new_token(token)
+            self.assinantes.append(assinante)
+            self.destinos.add(destino)
+            return True
+
+    def on_llm_new_token(self, token, **kwargs):
+        """O líder publica aqui (mesma interface dos callbacks do LangChain)."""
+        with self.lock:
+            self.tokens.append(token)
+            for assinante in self.assinantes:
+                try:
+                    assinante.on_llm_new_token(token)
+                except Exception as e:
+                    print(f"⚠️ [SINGLE-FLIGHT] Assinante falhou: {e}")
+
+    def texto(self):
+        with self.lock:
+            return "".join(self.tokens)
+
+    def aguardar(self, timeout=None):
+        """Para quem precisa do resultado final (ex: URL do Notion)."""
+        self.concluido.wait(timeout)
+        if self.erro is not None:
+            raise self.erro
+        return self.resultado
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.voos = {}
+        self.coalescidos = 0
+
+    def entrar(self, chave_voo):
+        """Devolve (voo, lider). lider=True: quem chamou gera e depois chama concluir()."""
+        with self.lock:
+            voo = self.voos.get(chave_voo)
+            if voo is not None:
+                voo.pedidos += 1
+                self.coalescidos += 1
+                return voo, False
+            voo = self.voos[chave_voo] = Voo(chave_voo)
+            return voo, True
+
+    def concluir(self, voo, resultado=None, erro=None):
+        """Tira o voo do registro; devolve os destinos para o aviso de fim."""
+        with self.lock:
+            if self.voos.get(voo.chave) is voo:
+                del self.voos[voo.chave]
+        with voo.lock:
+            voo.resultado = resultado
+            voo.erro = erro
+            voo.concluido.set()
+            return set(voo.destinos)
+
+    def executar(self, chave_voo, funcao):
+        """Chamada comum (sem stream): pedidos iguais em voo recebem o mesmo retorno."""
+        voo, lider = self.entrar(chave_voo)
+        if not lider:
+            return voo.aguardar()
+        try:
+            resultado = funcao()
+        except Exception as e:
+            self.concluir(voo, erro=e)
+            raise
+        self.concluir(voo, resultado)
+        return resultado
+
+    def stats(self):
+        with self.lock:
+            return {"em_voo": len(self.voos), "coalescidos": self.coalescidos}
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight():
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+
+# ==========================================
+# 📦 AGRUPADOR DE TOKENS DO 'ai_stream'
+# ==========================================
+# Um emit por token = milhares de frames minúsculos num plano longo, cada um com
+# seu JSON e sua trava no socket. Aqui os tokens de cada resposta (um canal por
+# job) se juntam e saem num frame só quando passa a janela de tempo ou o buffer
+# enche; no fim do stream sai tudo na hora, antes do 'ai_stream_end'.
+# Cada frame leva 'seq' (1, 2, 3...): o navegador percebe buraco e, depois de
+# reconectar, pede o resto com 'stream_resume' (os frames ficam guardados até
+# RESUME_TTL_S depois do fim).
+WINDOW_S = int(os.getenv("ARGUS_STREAM_WINDOW_MS", "40")) / 1000   # Espera máxima de um token no buffer
+MAX_BYTES = int(os.getenv("ARGUS_STREAM_MAX_BYTES", "512"))          # Buffer cheio sai antes da janela
+RESUME_TTL_S = 120
+
+
+class Canal:
+    """Stream de uma resposta para um destino (sid ou None = todos)."""
+    def __init__(self, batcher, destino, job_id=None, sessao=None):
+        self.batcher = batcher
+        self.destino = destino
+        self.job_id = job_id
+        self.sessao = sessao       # Só a mesma sessão pode retomar o canal
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.bytes = 0
+        self.desde = None          # Quando o token mais velho do buffer chegou
+        self.seq = 0
+        self.frames = []           # Para o 'stream_resume'
+        self.fim = None            # O 'ai_stream_end' enviado (reenviado na retomada)
+        self.fechado_em = None
+
+    def enviar(self, token):
+        with self.lock:
+            if self.fechado_em is not None:
+                return
+            if not self.buffer:
+                self.desde = time.monotonic()
+            self.buffer.append(token)
+            self.bytes += len(token)
+            if self.bytes >= self.batcher.max_bytes or time.monotonic() - self.desde >= self.batcher.janela_s:
+                self._esvaziar()
+
+    def _esvaziar(self):
+        """Manda o buffer como um frame (chamar com o lock: a ordem dos frames é a ordem dos tokens)."""
+        if not self.buffer:
+            return
+        texto = "".join(self.buffer)
+        self.batcher.contar(len(self.buffer))
+        self.buffer = []
+        self.bytes = 0
+        self.seq += 1
+        frame = {'chunk': texto, 'job': self.job_id, 'seq': self.seq}
+        self.frames.append(frame)
+        self.batcher.emitir('ai_stream', frame, self.destino)
+
+    def vencido(self, agora):
+        with self.lock:
+            if self.buffer and agora - self.desde >= self.batcher.janela_s:
+                self._esvaziar()
+
+    def fechar(self, dados=None):
+        """Fim do stream: esvazia o buffer e manda o 'ai_stream_end' com o último seq."""
+        with self.lock:
+            if self.fechado_em is not None:
+                return
+            self._esvaziar()
+            self.fechado_em = time.monotonic()
+            self.fim = {**(dados or {}), 'job': self.job_id, 'seq': self.seq}
+            self.batcher.emitir('ai_stream_end', self.fim, self.destino)
+
+    def retomar(self, destino, desde_seq):
+        """Reenvia os frames depois de desde_seq para o sid novo e passa a transmitir para ele."""
+        with self.lock:
+            if self.destino is not None:
+                self.destino = destino
+            perdidos = [f for f in self.frames if f['seq'] > desde_seq]
+            for frame in perdidos:
+                self.batcher.emitir('ai_stream', frame, destino)
+            self._esvaziar()  # O que estava no buffer sai depois, já com o seq seguinte
+            if self.fim is not None:
+                self.batcher.emitir('ai_stream_end', self.fim, destino)
+            return len(perdidos), self.fim is not None
+
+
+class StreamBatcher:
+    def __init__(self, emitir, janela_s=WINDOW_S, max_bytes=MAX_BYTES):
+        self.emitir = emitir        # Callable(evento, dados, destino)
+        self.janela_s = janela_s
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.canais = {}            # job_id -> Canal (abertos + fechados há pouco)
+        self.contadores = {"tokens": 0, "frames": 0, "retomadas": 0}
+        self._vigia = None
+
+    def contar(self, tokens):
+        with self.lock:
+            self.contadores["tokens"] += tokens
+            self.contadores["frames"] += 1
+
+    def abrir(self, destino, job_id=None, sessao=None):
+        canal = Canal(self, destino, job_id, sessao)
+        with self.lock:
+            self.canais[job_id if job_id is not None else f"anon-{id(canal)}"] = canal
+            if self._vigia is None:
+                self._vigia = threading.Thread(target=self._vigiar, daemon=True, name="stream-batcher")
+                self._vigia.start()
+        return canal
+
+    def _vigiar(self):
+        """Esvazia buffers parados (o último token antes de uma pausa do modelo não fica preso)."""
+        while True:
+            time.sleep(self.janela_s / 2)
+            agora = time.monotonic()
+            with self.lock:
+                canais = list(self.canais.values())
+                for job_id, canal in list(self.canais.items()):
+                    if canal.fechado_em is not None and agora - canal.fechado_em > RESUME_TTL_S:
+                        del self.canais[job_id]
+            for canal in canais:
+                if canal.fechado_em is None:
+                    canal.vencido(agora)
+
+    def retomar(self, job_id, sessao, destino, desde_seq):
+        """'stream_resume' do navegador. Devolve (frames reenviados, stream já terminou) ou None."""
+        with self.lock:
+            canal = self.canais.get(job_id)
+        if canal is None or canal.sessao != sessao:
+            return None
+        with self.lock:
+            self.contadores["retomadas"] += 1
+        return canal.retomar(destino, desde_seq)
+
+    def stats(self):
+        with self.lock:
+            dados = dict(self.contadores)
+            dados["canais"] = len(self.canais)
+        dados["tokens_por_frame"] = round(dados["tokens"] / dados["frames"], 2) if dados["frames"] else 0.0
+        return dados
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher(emitir=None):
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = StreamBatcher(emitir)
+    return _batcher
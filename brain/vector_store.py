@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from langchain_core.documents import Document
+
+# ==========================================
+# 🗂️ ÍNDICE VETORIAL MMAP (BUSCA EXATA)
+# ==========================================
+# Alternativa leve ao Chroma para bases pequenas: uma matriz NumPy num arquivo
+# mapeado em memória + um sidecar JSONL com texto/metadados. A busca é exata
+# (produto de matriz vetorizado), sem SQLite nem HNSW.
+#
+# Fala o mesmo "dialeto" do Chroma que o memory_core usa (add_documents,
+# delete, get, similarity_search_by_vector...), então os dois são trocáveis.
+MMAP_DTYPE = os.getenv("ARGUS_MMAP_DTYPE", "float16")  # float16 (metade do disco/RAM) ou float32
+SEARCH_BLOCK_ROWS = 65536   # Linhas por bloco no produto de matriz (limita RAM extra por busca)
+COMPACT_RATIO = 0.3         # Compacta sozinho quando 30% das linhas são lápides
+
+# O header aponta qual matriz/sidecar estão valendo. A compactação grava arquivos
+# NOVOS e troca só o header: no Windows não dá pra substituir um arquivo que outro
+# leitor (thread ou processo) ainda tem mapeado.
+HEADER_FILE = "header.json"
+MATRIX_FILE = "vectors.bin"      # Nomes da primeira geração (e de índices antigos)
+SIDECAR_FILE = "meta.jsonl"
+
+
+class MmapVectorStore:
+    def __init__(self, persist_directory, embedding_function, dtype=MMAP_DTYPE):
+        self.persist_directory = persist_directory
+        self.embedding = embedding_function
+        self.lock = threading.RLock()
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        self.arquivo_matriz = MATRIX_FILE
+        self.arquivo_sidecar = SIDECAR_FILE
+        self._limpar_estado()
+        self.recarregar()
+
+    def _limpar_estado(self):
+        self.matriz = None   # np.memmap (linhas, dim) normalizada
+        self.ids = []        # id por linha
+        self.textos = []
+        self.metas = []
+        self.vivos = np.zeros(0, dtype=bool)
+        self.linha_por_id = {}
+
+    def _path(self, nome):
+        return os.path.join(self.persist_directory, nome)
+
+    def _gravar_header(self):
+        """Troca atômica do header (é ele que decide quais arquivos valem)."""
+        tmp_path = self._path(HEADER_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name,
+                       "matriz": self.arquivo_matriz, "sidecar": self.arquivo_sidecar}, f)
+        os.replace(tmp_path, self._path(HEADER_FILE))
+
+    # --- LEITURA DO DISCO ---
+    def recarregar(self):
+        """(Re)lê o sidecar e remapeia a matriz. Chamado após escritas de outro processo."""
+        with self.lock:
+            self._limpar_estado()
+            if not os.path.exists(self._path(HEADER_FILE)):
+                return
+            with open(self._path(HEADER_FILE), "r", encoding="utf-8") as f:
+                header = json.load(f)
+            self.dim = header["dim"]
+            self.dtype = np.dtype(header["dtype"])
+            self.arquivo_matriz = header.get("matriz", MATRIX_FILE)
+            self.arquivo_sidecar = header.get("sidecar", SIDECAR_FILE)
+
+            vivos = []
+            if not os.path.exists(self._path(self.arquivo_sidecar)):
+                # Header sem sidecar (escrita interrompida antes da 1ª linha): índice vazio
+                print(f"⚠️ [MMAP] '{self.arquivo_sidecar}' não existe em '{self.persist_directory}'. Índice vazio.")
+                return
+            with open(self._path(self.arquivo_sidecar), "r", encoding="utf-8") as f:
+                for linha in f:
+                    if not linha.strip():
+                        continue
+                    try:
+                        item = json.loads(linha)
+                    except ValueError:
+                        # Linha cortada (append interrompido): dali pra frente nada foi confirmado
+                        print(f"⚠️ [MMAP] Sidecar corrompido depois da linha {len(self.ids)}. Ignorando o resto.")
+                        break
+                    if item["op"] == "add":
+                        row = len(self.ids)
+                        self.ids.append(item["id"])
+                        self.textos.append(item["text"])
+                        self.metas.append(item["meta"])
+                        vivos.append(True)
+                        antiga = self.linha_por_id.get(item["id"])
+                        if antiga is not None:
+                            vivos[antiga] = False
+                        self.linha_por_id[item["id"]] = row
+                    elif item["op"] == "del" and item["row"] < len(vivos):
+                        vivos[item["row"]] = False
+                        if self.linha_por_id.get(self.ids[item["row"]]) == item["row"]:
+                            del self.linha_por_id[self.ids[item["row"]]]
+            self.vivos = np.array(vivos, dtype=bool)
+            self._mapear()
+
+    def _mapear(self):
+        linhas = len(self.ids)
+        # Só mapeia as linhas confirmadas no sidecar (um append interrompido fica de fora)
+        if linhas == 0 or self.dim is None:
+            self.matriz = None
+            return
+        self.matriz = np.memmap(self._path(self.arquivo_matriz), dtype=self.dtype, mode="r", shape=(linhas, self.dim))
+
+    # --- ESCRITA ---
+    def _normalizar(self, vetores):
+        vetores = np.asarray(vetores, dtype=np.float32)
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return vetores / normas
+
+    def add_documents(self, documents, ids=None):
+        documents = list(documents)
+        if not documents:
+            return []
+        ids = list(ids) if ids is not None else [doc.id for doc in documents]
+        vetores = self._normalizar(self.embedding.embed_documents([doc.page_content for doc in documents]))
+
+        with self.lock:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            if self.dim is None:
+                self.dim = vetores.shape[1]
+                self._gravar_header()
+            elif vetores.shape[1] != self.dim:
+                raise ValueError(f"Dimensão {vetores.shape[1]} diferente do índice ({self.dim}).")
+
+            # Matriz primeiro, sidecar depois: o sidecar é quem "confirma" as linhas
+            tamanho = len(self.ids) * self.dim * self.dtype.itemsize
+            matriz_path = self._path(self.arquivo_matriz)
+            if os.path.exists(matriz_path) and os.path.getsize(matriz_path) > tamanho:
+                self.matriz = None  # Descarta restos de um append interrompido
+                with open(matriz_path, "r+b") as f:
+                    f.truncate(tamanho)
+            with open(matriz_path, "ab") as f:
+                f.write(vetores.astype(self.dtype).tobytes())
+
+            novos_vivos = []
+            with open(self._path(self.arquivo_sidecar), "a", encoding="utf-8") as f:
+                for chunk_id, doc in zip(ids, documents):
+                    antiga = self.linha_por_id.get(chunk_id)
+                    if antiga is not None:
+                        self.vivos[antiga] = False  # Upsert: a linha antiga vira lápide
+                    row = len(self.ids)
+                    self.ids.append(chunk_id)
+                    self.textos.append(doc.page_content)
+                    self.metas.append(dict(doc.metadata))
+                    self.linha_por_id[chunk_id] = row
+                    novos_vivos.append(True)
+                    f.write(json.dumps({"op": "add", "id": chunk_id, "text": doc.page_content,
+                                        "meta": dict(doc.metadata)}, ensure_ascii=False) + "\n")
+            self.vivos = np.concatenate([self.vivos, np.array(novos_vivos, dtype=bool)])
+            self._mapear()
+        return ids
+
+    def delete(self, ids=None):
+        if not ids:
+            return
+        with self.lock:
+            if not self.linha_por_id:
+                return
+            with open(self._path(self.arquivo_sidecar), "a", encoding="utf-8") as f:
+                for chunk_id in ids or []:
+                    row = self.linha_por_id.pop(chunk_id, None)
+                    if row is None:
+                        continue
+                    self.vivos[row] = False
+                    f.write(json.dumps({"op": "del", "row": row}) + "\n")
+
+            if len(self.ids) and 1 - self.vivos.mean() > COMPACT_RATIO:
+                self.compactar()
+
+    def compactar(self):
+        """Reescreve matriz e sidecar só com as linhas vivas (remove lápides) numa geração nova."""
+        with self.lock:
+            if self.matriz is None:
+                return
+            linhas = np.flatnonzero(self.vivos)
+            antes = len(self.ids)
+            geracao = int(time.time() * 1000)
+            nova_matriz = f"vectors.{geracao}.bin"
+            novo_sidecar = f"meta.{geracao}.jsonl"
+
+            with open(self._path(nova_matriz), "wb") as f:
+                for inicio in range(0, len(linhas), SEARCH_BLOCK_ROWS):
+                    f.write(np.asarray(self.matriz[linhas[inicio:inicio + SEARCH_BLOCK_ROWS]]).tobytes())
+            with open(self._path(novo_sidecar), "w", encoding="utf-8") as f:
+                for row in linhas:
+                    f.write(json.dumps({"op": "add", "id": self.ids[row], "text": self.textos[row],
+                                        "meta": self.metas[row]}, ensure_ascii=False) + "\n")
+
+            # A troca é só o header; buscas em andamento seguem lendo a matriz antiga
+            self.arquivo_matriz, self.arquivo_sidecar = nova_matriz, novo_sidecar
+            self._gravar_header()
+            self.recarregar()
+            self._apagar_sobras()
+            print(f"🗜️ [MMAP] Compactado: {antes} -> {len(self.ids)} linhas.")
+
+    def _apagar_sobras(self):
+        """Apaga matrizes/sidecars de gerações antigas. Ainda mapeado (Windows)? Fica pra próxima."""
+        em_uso = {HEADER_FILE, self.arquivo_matriz, self.arquivo_sidecar}
+        for nome in os.listdir(self.persist_directory):
+            antigo = nome.startswith(("vectors.", "meta.")) and nome.endswith((".bin", ".jsonl"))
+            if antigo and nome not in em_uso:
+                try:
+                    os.remove(self._path(nome))
+                except OSError:
+                    pass
+
+    def delete_collection(self):
+        with self.lock:
+            self.matriz = None
+            for nome in (HEADER_FILE, self.arquivo_matriz, self.arquivo_sidecar):
+                if os.path.exists(self._path(nome)):
+                    os.remove(self._path(nome))
+            self.dim = None
+            self.arquivo_matriz = MATRIX_FILE
+            self.arquivo_sidecar = SIDECAR_FILE
+            self._limpar_estado()
+            if os.path.isdir(self.persist_directory):
+                self._apagar_sobras()
+
+    def get(self, ids=None, include=None):
+        with self.lock:
+            if ids is None:
+                rows = list(self.linha_por_id.values())
+            else:
+                rows = [self.linha_por_id[i] for i in ids if i in self.linha_por_id]
+            dados = {
+                "ids": [self.ids[r] for r in rows],
+                "documents": [self.textos[r] for r in rows],
+                "metadatas": [self.metas[r] for r in rows],
+            }
+            if include and "embeddings" in include:
+                dados["embeddings"] = [np.asarray(self.matriz[r], dtype=np.float32) for r in rows]
+            return dados
+
+    # --- BUSCA ---
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        """Top-k exato por similaridade de cosseno. Devolve [(Document, score)]."""
+        # Foto de TUDO sob a trava: recarregar()/compactar() trocam as listas no meio da busca.
+        # As listas só crescem por append (índices antigos continuam válidos); vivos é copiado
+        with self.lock:
+            matriz, vivos = self.matriz, self.vivos.copy()
+            ids, textos, metas = self.ids, self.textos, self.metas
+        if matriz is None or not vivos.any():
+            return []
+
+        q = self._normalizar([embedding])[0]
+        scores = np.empty(len(vivos), dtype=np.float32)
+        for inicio in range(0, len(vivos), SEARCH_BLOCK_ROWS):
+            bloco = matriz[inicio:inicio + SEARCH_BLOCK_ROWS]
+            scores[inicio:inicio + len(bloco)] = bloco.astype(np.float32) @ q
+        scores[~vivos] = -np.inf
+
+        k = min(k, int(vivos.sum()))
+        melhores = np.argpartition(-scores, k - 1)[:k]
+        melhores = melhores[np.argsort(-scores[melhores])]
+        return [
+            (Document(id=ids[r], page_content=textos[r], metadata=dict(metas[r])), float(scores[r]))
+            for r in melhores
+        ]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k=k)
+
+    def similarity_search_with_relevance_scores(self, query, k=4, **kwargs):
+        # Cosseno [-1, 1] -> relevância [0, 1]
+        resultados = self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k=k)
+        return [(doc, (score + 1) / 2) for doc, score in resultados]
+
+    def stats(self):
+        with self.lock:
+            tamanho = sum(
+                os.path.getsize(self._path(n)) for n in (HEADER_FILE, self.arquivo_matriz, self.arquivo_sidecar)
+                if os.path.exists(self._path(n))
+            )
+            return {
+                "linhas": len(self.ids),
+                "vivas": int(self.vivos.sum()),
+                "dim": self.dim,
+                "dtype": self.dtype.name,
+                "bytes": tamanho,
+            }
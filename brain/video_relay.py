@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+
+# ==========================================
+# 🎥 RELAY DO VÍDEO DA VISÃO
+# ==========================================
+# O vision_core manda cada JPEG em binário (sem base64) e o servidor só repassa
+# para quem assinou o vídeo (painel da câmera aberto e aba visível).
+# Cada espectador tem no máximo UM frame em voo: enquanto o navegador não
+# confirma (ack) o anterior, o frame novo só substitui o pendente. Cliente lento
+# vê menos quadros, mas sempre o mais recente, e nada se acumula na fila do socket.
+# Sem espectador, o relay avisa a fonte (sala SOURCE_ROOM) para parar de codificar.
+SOURCE_ROOM = "video_fontes"
+ACK_TIMEOUT_S = float(os.getenv("ARGUS_VIDEO_ACK_TIMEOUT", "2.0"))  # Ack perdido não trava o espectador
+
+
+class Espectador:
+    def __init__(self, sid):
+        self.sid = sid
+        self.em_voo_desde = None   # Frame enviado e ainda sem ack
+        self.pendente = None       # Último frame que chegou enquanto esperava o ack
+        self.seq = 0               # Número do frame em voo (ack de frame velho não libera nada)
+
+
+class VideoRelay:
+    def __init__(self, emitir):
+        self.emitir = emitir       # Callable(sid, frame, ack)
+        self.lock = threading.Lock()
+        self.espectadores = {}     # sid -> Espectador
+        self.contadores = {"recebidos": 0, "enviados": 0, "descartados": 0, "bytes_enviados": 0}
+
+    def assinar(self, sid):
+        """Devolve True se este é o primeiro espectador (a fonte precisa voltar a transmitir)."""
+        with self.lock:
+            primeiro = not self.espectadores
+            self.espectadores.setdefault(sid, Espectador(sid))
+            return primeiro
+
+    def sair(self, sid):
+        """Devolve True se não sobrou ninguém assistindo (a fonte pode parar de codificar)."""
+        with self.lock:
+            if self.espectadores.pop(sid, None) is None:
+                return False
+            return not self.espectadores
+
+    def tem_espectadores(self):
+        with self.lock:
+            return bool(self.espectadores)
+
+    def publicar(self, frame):
+        """Frame novo da fonte: vai na hora para quem está livre; para os outros vira o pendente."""
+        agora = time.monotonic()
+        envios = []
+        with self.lock:
+            self.contadores["recebidos"] += 1
+            for esp in self.espectadores.values():
+                if esp.em_voo_desde is not None and agora - esp.em_voo_desde < ACK_TIMEOUT_S:
+                    if esp.pendente is not None:
+                        self.contadores["descartados"] += 1  # O pendente velho nunca vai sair
+                    esp.pendente = frame
+                    continue
+                if esp.pendente is not None:
+                    # Ack perdido: o frame novo vai no lugar do pendente, que morre aqui
+                    self.contadores["descartados"] += 1
+                    esp.pendente = None
+                esp.em_voo_desde = agora
+                esp.seq += 1
+                envios.append((esp.sid, esp.seq))
+        for sid, seq in envios:
+            self._enviar(sid, frame, seq)
+
+    def _enviar(self, sid, frame, seq):
+        with self.lock:
+            self.contadores["enviados"] += 1
+            self.contadores["bytes_enviados"] += len(frame)
+        self.emitir(sid, frame, lambda *args: self._confirmado(sid, seq))
+
+    def _confirmado(self, sid, seq):
+        """Ack do navegador: se chegou frame enquanto esperava, manda o mais recente."""
+        with self.lock:
+            esp = self.espectadores.get(sid)
+            if esp is None or seq != esp.seq:
+                return  # Ack atrasado de um frame que já venceu: o frame em voo é outro
+            frame, esp.pendente = esp.pendente, None
+            esp.em_voo_desde = time.monotonic() if frame is not None else None
+            if frame is not None:
+                esp.seq += 1
+                seq = esp.seq
+        if frame is not None:
+            self._enviar(sid, frame, seq)
+
+    def stats(self):
+        with self.lock:
+            dados = dict(self.contadores)
+            dados["espectadores"] = len(self.espectadores)
+        return dados
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+def get_relay(emitir=None):
+    global _relay
+    if _relay is None:
+        with _relay_lock:
+            if _relay is None:
+                _relay = VideoRelay(emitir)
+    return _relay
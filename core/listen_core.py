@@ -24,7 +24,7 @@ except Exception as e:
 sio = socketio.Client()
 
 try:
-    sio.connect(ARGUS_URL)
+    sio.connect(ARGUS_URL, auth={'cliente': 'host'})  # Sessão da máquina do Argus
     print("🔗 Conectado ao Servidor Argus!")
 except:
     print("⚠️ Servidor Argus offline. Modo Debug.")
@@ -2,14 +2,26 @@ import cv2
 import mediapipe as mp
 import socketio
 import time
-import base64
 
 # Configuração do Cliente SocketIO
 sio = socketio.Client()
 ARGUS_URL = 'http://localhost:5000'
 
+# Só codifica/manda vídeo quando alguma tela está assistindo (o servidor avisa)
+transmitir = False
+
+@sio.event
+def connect():
+    sio.emit('video_source')  # Entra na sala das fontes; a resposta é um 'video_demand'
+
+@sio.on('video_demand')
+def on_video_demand(data):
+    global transmitir
+    transmitir = bool(data.get('ativo'))
+    print(f"🎥 Preview {'LIGADO' if transmitir else 'DESLIGADO'} (espectadores no dashboard).")
+
 try:
-    sio.connect(ARGUS_URL)
+    sio.connect(ARGUS_URL, auth={'cliente': 'host'})  # Sessão da máquina do Argus
     print("👁️ Vision Core conectado ao Argus!")
 except:
     print("⚠️ Aviso: Argus Offline. Vision Core rodando em modo isolado.")
@@ -121,15 +133,15 @@ def run_vision():
             process_logic(image, detected_gesture)
 
             # --- STREAMING PARA O FRONTEND ---
-            # 1. Codifica para JPG
-            _, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-            # 2. Converte para Base64
-            jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-            # 3. Envia
-            try:
-                sio.emit('video_stream', {'image': jpg_as_text})
-            except:
-                pass
+            # Sem ninguém assistindo não codifica nada (os gestos continuam funcionando)
+            if transmitir and sio.connected:
+                # 1. Codifica para JPG
+                _, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
+                # 2. Envia em binário (anexo do Socket.IO, sem base64)
+                try:
+                    sio.emit('video_frame', buffer.tobytes())
+                except:
+                    pass
 
             # Janela Local (Opcional - Pode comentar se quiser só no site)
             #cv2.imshow('Argus Vision Core', image)
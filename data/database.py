@@ -1,6 +1,8 @@
 import sqlite3
 import datetime
 import json
+import math
+import threading
 
 DB_NAME = "jarvis_memory.db"
 
@@ -8,9 +10,16 @@ class DataManager:
     def __init__(self):
         self.conn = sqlite3.connect(DB_NAME, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        # Conexão e cursor são compartilhados: TODO método que usa o cursor pega a trava
+        # (telemetria, feedback e curiosidades chegam de threads diferentes)
+        self.lock = threading.Lock()
         self.create_tables()
 
     def create_tables(self):
+        with self.lock:
+            self._criar_tabelas()
+
+    def _criar_tabelas(self):
         # Tabela 1: Recompensas (O "Dopamina" do Sistema)
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS recompensas (
@@ -46,6 +55,27 @@ class DataManager:
             )
         ''')
         
+        # Tabela 4: Telemetria de Geração (1 linha por turno do LLM)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS telemetria_geracao (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME,
+                modelo TEXT,
+                persona TEXT,
+                tokens_prompt INTEGER,
+                tokens_saida INTEGER,
+                ttft_ms INTEGER,
+                latencia_ms INTEGER,
+                tokens_por_s REAL,
+                profundidade INTEGER, -- Posição do modelo na cascata (0 = primeira escolha)
+                classe_erro TEXT,     -- NULL, cota, nao_encontrado, auth, pedido, transitorio, prazo, cancelado
+                hedge INTEGER
+            )
+        ''')
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_telemetria_data ON telemetria_geracao (timestamp, modelo)"
+        )
+
         # Tabelas Legadas (Mantidas para compatibilidade)
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS historico_comandos (
@@ -60,24 +90,91 @@ class DataManager:
 
     def registrar_recompensa(self, brain_id, query, response, score, notes=""):
         """Registra feedback positivo (+1) ou negativo (-1)"""
-        self.cursor.execute('''
-            INSERT INTO recompensas (brain_id, timestamp, user_query, bot_response, reward_score, feedback_notes)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (brain_id, datetime.datetime.now(), query, response, score, notes))
-        self.conn.commit()
+        with self.lock:
+            self.cursor.execute('''
+                INSERT INTO recompensas (brain_id, timestamp, user_query, bot_response, reward_score, feedback_notes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (brain_id, datetime.datetime.now(), query, response, score, notes))
+            self.conn.commit()
 
     def adicionar_curiosidade(self, tema, contexto):
         """Registra algo que o Argus não sabe e precisa pesquisar depois"""
-        self.cursor.execute('''
-            INSERT INTO pontos_curiosidade (tema, origem_contexto, data_descoberta)
-            VALUES (?, ?, ?)
-        ''', (tema, contexto, datetime.datetime.now()))
-        self.conn.commit()
+        with self.lock:
+            self.cursor.execute('''
+                INSERT INTO pontos_curiosidade (tema, origem_contexto, data_descoberta)
+                VALUES (?, ?, ?)
+            ''', (tema, contexto, datetime.datetime.now()))
+            self.conn.commit()
 
     def get_curiosidades_pendentes(self):
         """Busca o que precisa ser estudado"""
-        self.cursor.execute("SELECT * FROM pontos_curiosidade WHERE status_pesquisa = 'Pendente'")
-        return self.cursor.fetchall()
+        with self.lock:
+            self.cursor.execute("SELECT * FROM pontos_curiosidade WHERE status_pesquisa = 'Pendente'")
+            return self.cursor.fetchall()
+
+    # --- TELEMETRIA DE GERAÇÃO ---
+
+    def registrar_geracao(self, registro):
+        """Grava um turno do LLM (dict montado pelo model_manager)."""
+        with self.lock:
+            self.cursor.execute('''
+                INSERT INTO telemetria_geracao (timestamp, modelo, persona, tokens_prompt, tokens_saida,
+                    ttft_ms, latencia_ms, tokens_por_s, profundidade, classe_erro, hedge)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (datetime.datetime.now(), registro.get("modelo"), registro.get("persona"),
+                  registro.get("tokens_prompt"), registro.get("tokens_saida"), registro.get("ttft_ms"),
+                  registro.get("latencia_ms"), registro.get("tokens_por_s"), registro.get("profundidade"),
+                  registro.get("classe_erro"), int(bool(registro.get("hedge")))))
+            self.conn.commit()
+
+    def rollup_geracao(self, dias=7):
+        """p50/p95 de TTFT, latência e tokens/s por modelo por dia (últimos `dias`)."""
+        desde = datetime.datetime.now() - datetime.timedelta(days=dias)
+        with self.lock:
+            self.cursor.execute('''
+                SELECT date(timestamp), modelo, ttft_ms, latencia_ms, tokens_por_s, profundidade, classe_erro
+                FROM telemetria_geracao WHERE timestamp >= ? ORDER BY timestamp
+            ''', (desde,))
+            linhas = self.cursor.fetchall()
+
+        grupos = {}
+        for dia, modelo, ttft, latencia, tps, profundidade, erro in linhas:
+            g = grupos.setdefault((dia, modelo), {"turnos": 0, "falhas": 0, "ttft": [], "latencia": [],
+                                                  "tps": [], "profundidade": []})
+            g["turnos"] += 1
+            if erro and erro != "cancelado":
+                g["falhas"] += 1
+            if ttft is not None:
+                g["ttft"].append(ttft)
+            if latencia is not None and not erro:
+                g["latencia"].append(latencia)
+            if tps is not None:
+                g["tps"].append(tps)
+            if profundidade is not None:
+                g["profundidade"].append(profundidade)
+
+        return [{
+            "dia": dia,
+            "modelo": modelo,
+            "turnos": g["turnos"],
+            "falhas": g["falhas"],
+            "ttft_ms_p50": _percentil(g["ttft"], 50),
+            "ttft_ms_p95": _percentil(g["ttft"], 95),
+            "latencia_ms_p50": _percentil(g["latencia"], 50),
+            "latencia_ms_p95": _percentil(g["latencia"], 95),
+            "tokens_por_s_p50": _percentil(g["tps"], 50),
+            "profundidade_media": round(sum(g["profundidade"]) / len(g["profundidade"]), 2) if g["profundidade"] else None,
+        } for (dia, modelo), g in sorted(grupos.items(), key=lambda item: (item[0][0], str(item[0][1])))]
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        with self.lock:
+            self.conn.close()
+
+
+def _percentil(valores, p):
+    """Percentil por posição mais próxima (o SQLite não tem PERCENTILE)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
@@ -1,4 +1,5 @@
 import os
+import threading
 import notion_client
 from notion_client import Client
 from datetime import datetime
@@ -31,6 +32,11 @@ class NotionManager:
             self.client_play = None
             print("⚠️ [NOTION] Chave Playground não encontrada.")
 
+        # Planos já publicados nesta execução: a busca do Notion demora a enxergar
+        # página nova, então a trava de duplicidade também olha aqui
+        self.planos_criados = {}  # título do plano -> url
+        self.planos_lock = threading.Lock()
+
     # ==========================================================
     # 🔍 LEITURA (GET) - BANCO OFICIAL
     # ==========================================================
@@ -92,6 +98,9 @@ class NotionManager:
         
         # O padrão de nome que usamos é "Plano: [Nome da Tarefa]"
         plan_title = f"Plano: {task_title}"
+        if plan_title in self.planos_criados:
+            print(f"⚠️ [NOTION] Plano duplicado encontrado: {plan_title}")
+            return True
         
         try:
             response = self.client_play.databases.query(
@@ -163,6 +172,20 @@ class NotionManager:
             print(f"❌ Erro ao postar Insight: {e}")
             return None
 
+    def create_plan(self, task_title, content):
+        """
+        Publica o plano da tarefa uma vez só (idempotente): se ele já foi criado
+        nesta execução, devolve a mesma URL em vez de criar outra página.
+        """
+        plan_title = f"Plano: {task_title}"
+        with self.planos_lock:
+            if plan_title in self.planos_criados:
+                return self.planos_criados[plan_title]
+            url = self.create_insight(title=plan_title, content=content)
+            if url:
+                self.planos_criados[plan_title] = url
+            return url
+
     def create_daily_log(self, summary):
         """Cria o Diário de Bordo Automático (Daily Log)"""
         if not self.client_play: return None
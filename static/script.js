@@ -3,7 +3,13 @@ console.log("📂 [SYSTEM] script.js carregado.");
 // ==========================================
 // 1. VARIÁVEIS GLOBAIS
 // ==========================================
-var socket = io();
+// Id da sessão desta tela (persona, tarefa em foco e conversa sobrevivem ao F5)
+var clienteId = localStorage.getItem('argus_cliente');
+if (!clienteId) {
+    clienteId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : String(Date.now()) + Math.random().toString(16).slice(2);
+    localStorage.setItem('argus_cliente', clienteId);
+}
+var socket = io({ auth: { cliente: clienteId } });
 const synth = window.speechSynthesis;
 
 // ==========================================
@@ -51,6 +57,14 @@ window.sendMessage = function() {
 }; 
 
 
+// Interrompe a resposta em andamento (tecla Esc)
+window.cancelGeneration = function() {
+    socket.emit('cancel_generation', { 'job': jobAtual });
+};
+document.addEventListener('keydown', (e) => {
+    if (e.key === 'Escape' && document.getElementById('temp-msg')) window.cancelGeneration();
+});
+
 // Troca Manual de Cérebro
 window.manualSwitch = function(brainKey) {
     console.log("🔘 Troca manual solicitada para:", brainKey);
@@ -70,6 +84,11 @@ window.toggleVoice = function() {
 
 socket.on('connect', () => {
     console.log("✅ [SOCKET] Conectado ao Argus Core.");
+    // Sid novo: assina o vídeo de novo se o painel estiver ligado
+    assinandoVideo = false;
+    atualizarAssinaturaVideo();
+    // Caiu no meio de uma resposta? Pede o que ficou faltando
+    if (jobAtual) socket.emit('stream_resume', { 'job': jobAtual, 'seq': ultimoSeq });
 });
 
 // --- O CORE DA MUDANÇA DE COR ---
@@ -146,7 +165,26 @@ socket.on('brain_change', (data) => {
 });
 
 // Streaming de Texto (Efeito Digitação)
-socket.on('ai_stream_start', () => {
+// Cada resposta tem um job; chunk atrasado de um job substituído/cancelado é descartado.
+// Os frames chegam agrupados e numerados (seq): repetido é ignorado, buraco pede reenvio.
+var jobAtual = null;
+var ultimoSeq = 0;
+var retomadaPedida = -1;
+
+function fecharBalao(temp) {
+    // Renderiza Markdown final
+    if(typeof marked !== 'undefined') temp.innerHTML = marked.parse(temp.innerText);
+    if(typeof hljs !== 'undefined') hljs.highlightAll();
+    // Remove o ID para que a próxima mensagem crie um novo
+    temp.removeAttribute('id');
+}
+
+socket.on('ai_stream_start', (data) => {
+    jobAtual = (data && data.job) || null;
+    ultimoSeq = 0;
+    retomadaPedida = -1;
+    const anterior = document.getElementById('temp-msg');
+    if (anterior) fecharBalao(anterior);  // Resposta substituída: fica o que já tinha chegado
     const chatBox = document.getElementById('chatHistory');
     // Cria o balão vazio do bot
     chatBox.innerHTML += `<div class="msg bot"><span id="temp-msg" class="typing">...</span></div>`;
@@ -154,6 +192,16 @@ socket.on('ai_stream_start', () => {
 });
 
 socket.on('ai_stream', (data) => {
+    if (data.job && data.job !== jobAtual) return;
+    if (data.seq) {
+        if (data.seq <= ultimoSeq) return;  // Já chegou (reenvio)
+        if (data.seq > ultimoSeq + 1) {
+            if (retomadaPedida !== ultimoSeq) socket.emit('stream_resume', { 'job': data.job, 'seq': ultimoSeq });
+            retomadaPedida = ultimoSeq;
+            return;  // O reenvio traz este frame de novo, na ordem
+        }
+        ultimoSeq = data.seq;
+    }
     const temp = document.getElementById('temp-msg');
     if (temp) {
         // Remove os três pontinhos iniciais na primeira letra
@@ -170,15 +218,14 @@ socket.on('ai_stream', (data) => {
 });
 
 socket.on('ai_stream_end', (data) => {
+    if (data && data.job && data.job !== jobAtual) return;
     const temp = document.getElementById('temp-msg');
     if (temp) {
-        // Renderiza Markdown final
-        if(typeof marked !== 'undefined') temp.innerHTML = marked.parse(temp.innerText);
-        if(typeof hljs !== 'undefined') hljs.highlightAll();
-        
-        // Remove o ID para que a próxima mensagem crie um novo
-        temp.removeAttribute('id');
+        // Faltou frame no caminho: o texto completo vem junto do fim
+        if (data && data.seq && data.seq !== ultimoSeq && data.full_text) temp.innerText = data.full_text;
+        fecharBalao(temp);
     }
+    jobAtual = null;
 });
 
 // Visão Computacional (Feedback na UI)
@@ -212,6 +259,7 @@ function toggleVisionModule() {
     
     console.log(`🔌 Enviando comando de visão: ${action.toUpperCase()}`);
     socket.emit('toggle_vision', { 'action': action });
+    atualizarAssinaturaVideo();
     
     // Se desligou, limpa a tela imediatamente
     if (action === 'stop') {
@@ -254,6 +302,7 @@ socket.on('vision_status', (data) => {
             img.src = ""; // Limpa o buffer da imagem
         }
     }
+    atualizarAssinaturaVideo();
 });
 
 // ==========================================
@@ -346,25 +395,40 @@ socket.on('system_stats', (data) => {
     else cpuBar.style.backgroundColor = 'var(--accent)';
 });
 
-// Recebe o Streaming de Vídeo
-socket.on('video_stream', (data) => {
+// Recebe o Streaming de Vídeo (JPEG binário; o ack libera o próximo quadro)
+var videoUrl = null;
+socket.on('video_frame', (frame, ack) => {
     const imgElement = document.getElementById('live-vision');
     const placeholder = document.getElementById('camera-feed');
-    const noSignalText = placeholder.querySelector('.overlay-text');
-    const reticle = placeholder.querySelector('.reticle');
 
-    if (imgElement) {
+    if (imgElement && placeholder) {
+        const noSignalText = placeholder.querySelector('.overlay-text');
+        const reticle = placeholder.querySelector('.reticle');
         // Mostra a imagem
         imgElement.style.display = 'block';
-        imgElement.src = "data:image/jpeg;base64," + data.image;
+        if (videoUrl) URL.revokeObjectURL(videoUrl);
+        videoUrl = URL.createObjectURL(new Blob([frame], { type: 'image/jpeg' }));
+        imgElement.src = videoUrl;
         
         // Esconde o texto "NO SIGNAL"
         if(noSignalText) noSignalText.style.display = 'none';
         // Mantém a mira (reticle) por cima
         if(reticle) reticle.style.zIndex = "10";
     }
+    if (ack) ack();
 });
 
+// Só assina o vídeo com o painel da câmera na tela, ligado e a aba visível
+var assinandoVideo = false;
+function atualizarAssinaturaVideo() {
+    const checkbox = document.getElementById('vision-toggle');
+    const querVer = !!document.getElementById('live-vision') && !!checkbox && checkbox.checked && !document.hidden;
+    if (querVer === assinandoVideo) return;
+    assinandoVideo = querVer;
+    socket.emit(querVer ? 'video_subscribe' : 'video_unsubscribe', {});
+}
+document.addEventListener('visibilitychange', atualizarAssinaturaVideo);
+
 // ==========================================
 // 4. EVENT LISTENERS GERAIS
 // ==========================================
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import numpy as np
+
+# ==========================================
+# 📏 BENCHMARK DE GERAÇÃO (LLM)
+# ==========================================
+# Dispara N conversas simultâneas pelo caminho real de geração
+# (model_manager.GeracaoStream) e mede:
+#   - tempo até o 1º token (p50/p95/p99)
+#   - duração do turno e tokens/s por conversa
+#   - vazão total do processo (tokens/s somando todas)
+# Por padrão usa o provedor mock (sem rede, sem cota, reproduzível pela seed).
+#
+# Exemplos:
+#   python testes/bench_geracao.py --conversas 50
+#   python testes/bench_geracao.py --roster "mock:lento,ttft=4;mock:rapido,ttft=0.3" --hedge
+#   python testes/bench_geracao.py --roster "ollama:llama3.2" --conversas 2
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados_bench")
+
+
+def percentis(valores):
+    if not valores:
+        return {}
+    return {f"p{p}": round(float(np.percentile(valores, p)), 4) for p in (50, 95, 99)}
+
+
+def uma_conversa(model_manager, indice, prompt, resultados):
+    inicio = time.perf_counter()
+    ttft = None
+    tokens = 0
+    erro = None
+    try:
+        for _ in model_manager.GeracaoStream(f"{prompt} #{indice}"):
+            if ttft is None:
+                ttft = time.perf_counter() - inicio
+            tokens += 1
+    except Exception as e:
+        erro = str(e)
+    duracao = time.perf_counter() - inicio
+    resultados[indice] = {"ttft": ttft, "duracao": duracao, "tokens": tokens, "erro": erro}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de geração do Argus (latência e vazão).")
+    parser.add_argument("--conversas", type=int, default=20, help="Conversas simultâneas")
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--roster", default="mock:ttft=0.3,tps=40,tokens=120",
+                        help="ARGUS_LLM_ROSTER usado no teste (separador ';')")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hedge", action="store_true", help="Liga o ARGUS_HEDGE durante o teste")
+    parser.add_argument("--prompt", default="Resuma o plano de ação da semana.")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON (padrão: testes/resultados_bench/)")
+    args = parser.parse_args()
+
+    # O model_manager lê a configuração no import
+    os.environ["ARGUS_LLM_ROSTER"] = args.roster
+    os.environ["ARGUS_MOCK_SEED"] = str(args.seed)
+    os.environ["ARGUS_LLM_WARMUP"] = "0"
+    if args.hedge:
+        os.environ["ARGUS_HEDGE"] = "1"
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from brain import model_manager, model_health
+    # Disjuntores do benchmark num arquivo temporário (não mexem no model_health.json do Argus)
+    health_path = os.path.join(tempfile.gettempdir(), "argus_bench_health.json")
+    if os.path.exists(health_path):
+        os.remove(health_path)
+    model_manager.health = model_health.ModelHealth(path=health_path)
+
+    print(f"🏁 Roster: {model_manager.MODEL_ROSTER} | {args.conversas} conversas x {args.rodadas} rodadas")
+    todas = []
+    inicio_total = time.perf_counter()
+    for rodada in range(args.rodadas):
+        resultados = {}
+        threads = [
+            threading.Thread(target=uma_conversa, args=(model_manager, i, args.prompt, resultados))
+            for i in range(args.conversas)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"   rodada {rodada + 1}: {time.perf_counter() - t0:.2f}s")
+        todas.extend(resultados.values())
+    tempo_total = time.perf_counter() - inicio_total
+
+    ok = [r for r in todas if r["erro"] is None]
+    tokens = sum(r["tokens"] for r in ok)
+    relatorio = {
+        "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "maquina": {"python": platform.python_version(), "so": platform.platform()},
+        "config": vars(args),
+        "turnos": len(todas),
+        "falhas": len(todas) - len(ok),
+        "ttft_s": percentis([r["ttft"] for r in ok if r["ttft"] is not None]),
+        "duracao_s": percentis([r["duracao"] for r in ok]),
+        "tokens_por_s_conversa": percentis([r["tokens"] / r["duracao"] for r in ok if r["duracao"] > 0]),
+        "tokens_por_s_total": round(tokens / tempo_total, 1) if tempo_total else 0,
+        "hedge": model_manager.hedge_stats(),
+    }
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+    saida = args.saida or os.path.join(RESULTS_DIR, f"geracao_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultado salvo em {saida}")
+
+
+if __name__ == "__main__":
+    main()
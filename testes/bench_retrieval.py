@@ -0,0 +1,366 @@
+import os
+import sys
+import re
+import gc
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# Permite rodar direto (python testes/bench_retrieval.py) importando os módulos da raiz
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from brain import memory_core, ingest_pipeline, embedding_provider
+from brain.lexical_index import LexicalIndex
+from brain.vector_store import MMAP_DTYPE
+
+# ==========================================
+# 📏 BENCHMARK DE RECUPERAÇÃO (RAG)
+# ==========================================
+# Monta um corpus (sintético ou a partir de uma pasta de PDFs/TXTs), indexa em
+# cada backend do memory_core e mede o caminho real de busca (MemoryRetriever):
+#   - latência p50/p95/p99 por consulta (embed da pergunta incluso)
+#   - tempo de build e tamanho do índice em disco
+#   - pico de RSS do processo
+#   - recall@k contra a busca exata (força bruta em NumPy) e acerto do trecho de origem
+# O resultado vai para um JSON, para comparar execuções ao longo do tempo.
+#
+# Exemplos:
+#   python testes/bench_retrieval.py --chunks 10000
+#   python testes/bench_retrieval.py --chunks 1000000 --backends mmap --modos denso
+#   python testes/bench_retrieval.py --fixture knowledge_base/documentos_lidos --embedder real
+#
+# Obs.: o pico de RSS é do processo inteiro (só cresce). Para números isolados
+# de um backend, rode um backend por execução (--backends mmap).
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados_bench")
+STUB_DIM = 384           # Mesma dimensão do MiniLM
+BUILD_BATCH = 1000       # Fragmentos por add_documents (Chroma aceita no máx. ~5k)
+GROUND_TRUTH_BLOCK = 20000
+WARMUP_QUERIES = 5
+VOCAB_SIZE = 5000
+SILABAS = ["ba", "be", "ca", "da", "de", "fa", "ga", "la", "le", "ma", "me", "na", "ne", "pa",
+           "pe", "ra", "re", "sa", "se", "ta", "te", "va", "vi", "xo", "zu", "ção", "ões", "tro"]
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+# --- EMBEDDER DETERMINÍSTICO (OFFLINE) ---
+class StubEmbeddings(Embeddings):
+    """
+    Feature hashing: cada token cai numa dimensão fixa (crc32) com sinal fixo.
+    Sem rede, sem modelo e estável entre processos; textos com palavras em
+    comum ficam próximos, então recall e ranking continuam significativos.
+    """
+    def __init__(self, dim=STUB_DIM):
+        self.dim = dim
+        self.assinatura = f"stub:hash-{dim}"
+        self.carregado = True
+        self._tokens = {}
+
+    def carregar(self):
+        return self
+
+    def _posicao(self, token):
+        pos = self._tokens.get(token)
+        if pos is None:
+            h = zlib.crc32(token.encode("utf-8"))
+            pos = (h % self.dim, 1.0 if (h >> 16) & 1 else -1.0)
+            self._tokens[token] = pos
+        return pos
+
+    def _vetor(self, texto):
+        vetor = np.zeros(self.dim, dtype=np.float32)
+        for token in TOKEN_RE.findall(texto.lower()):
+            idx, sinal = self._posicao(token)
+            vetor[idx] += sinal
+        norma = np.linalg.norm(vetor)
+        return vetor / norma if norma > 0 else vetor
+
+    def embed_documents(self, texts):
+        return [self._vetor(t).tolist() for t in texts]
+
+    def embed_query(self, text):
+        return self._vetor(text).tolist()
+
+
+# --- CORPORA ---
+class CorpusSintetico:
+    """Fragmentos gerados sob demanda (determinísticos por semente), sem guardar tudo na RAM."""
+    def __init__(self, tamanho, seed=42):
+        self.tamanho = tamanho
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        vocab = set()
+        while len(vocab) < VOCAB_SIZE:
+            vocab.add("".join(rng.choice(SILABAS, size=rng.integers(2, 5))))
+        self.vocab = np.array(sorted(vocab))
+        pesos = 1.0 / np.arange(1, VOCAB_SIZE + 1)  # Zipf: poucas palavras muito comuns
+        self.pesos = pesos / pesos.sum()
+
+    def __len__(self):
+        return self.tamanho
+
+    def texto(self, i):
+        rng = np.random.default_rng((self.seed, i))
+        palavras = self.vocab[rng.choice(VOCAB_SIZE, size=rng.integers(40, 90), p=self.pesos)]
+        # Identificadores (INC-, CT-) exercitam o BM25 do jeito que os documentos reais fazem
+        return f"Registro INC-{i:07d} CT-{rng.integers(0, 10000):04d}: " + " ".join(palavras)
+
+    def consulta(self, i, rng):
+        palavras = self.texto(i).split()
+        termos = list(rng.choice(palavras[3:], size=min(6, len(palavras) - 3), replace=False))
+        if rng.random() < 0.5:
+            termos.append(palavras[1])  # Metade das perguntas cita o identificador
+        return " ".join(termos)
+
+
+class CorpusFixture:
+    """Fragmentos reais de uma pasta (mesmo splitter da ingestão), replicados até o tamanho pedido."""
+    def __init__(self, pasta, tamanho=None):
+        self.base = []
+        for raiz, _, arquivos in os.walk(pasta):
+            for nome in sorted(arquivos):
+                if not nome.lower().endswith(memory_core.SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.join(raiz, nome)
+                _, _, chunks, erro = ingest_pipeline.fragmentar_arquivo(
+                    path, nome, memory_core.CHUNK_SIZE, memory_core.CHUNK_OVERLAP
+                )
+                if erro:
+                    print(f"⚠️ [BENCH] Ignorando '{nome}': {erro}")
+                self.base.extend(doc.page_content for _, doc in chunks)
+        if not self.base:
+            raise SystemExit(f"❌ Nenhum fragmento encontrado em '{pasta}'.")
+        self.tamanho = tamanho or len(self.base)
+
+    def __len__(self):
+        return self.tamanho
+
+    def texto(self, i):
+        original = self.base[i % len(self.base)]
+        copia = i // len(self.base)
+        return original if copia == 0 else f"{original} (variação {copia})"
+
+    def consulta(self, i, rng):
+        palavras = self.texto(i).split()
+        if len(palavras) <= 8:
+            return " ".join(palavras)
+        inicio = rng.integers(0, len(palavras) - 8)
+        return " ".join(palavras[inicio:inicio + 8])
+
+
+def iterar_lotes(corpus, tamanho_lote):
+    for inicio in range(0, len(corpus), tamanho_lote):
+        yield inicio, [corpus.texto(i) for i in range(inicio, min(inicio + tamanho_lote, len(corpus)))]
+
+
+# --- MÉTRICAS DO PROCESSO ---
+def pico_rss_mb():
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux devolve KB; macOS devolve bytes
+        return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+    except ImportError:
+        import psutil  # Windows
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+
+
+def tamanho_pasta(path):
+    total = 0
+    for raiz, _, arquivos in os.walk(path):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except OSError:
+                pass
+    return total
+
+
+def percentis_ms(latencias):
+    valores = np.array(latencias) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(valores, 50)), 3),
+        "p95_ms": round(float(np.percentile(valores, 95)), 3),
+        "p99_ms": round(float(np.percentile(valores, 99)), 3),
+        "media_ms": round(float(valores.mean()), 3),
+    }
+
+
+# --- GABARITO (BUSCA EXATA) ---
+def gabarito_exato(corpus, embedding, consultas, k):
+    """Top-k exato por cosseno, em blocos (não precisa da matriz inteira na RAM)."""
+    q = np.asarray(embedding.embed_documents(consultas), dtype=np.float32)
+    q /= np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+    melhores_scores = np.full((len(consultas), 0), -np.inf, dtype=np.float32)
+    melhores_linhas = np.zeros((len(consultas), 0), dtype=np.int64)
+
+    for inicio, textos in iterar_lotes(corpus, GROUND_TRUTH_BLOCK):
+        bloco = np.asarray(embedding.embed_documents(textos), dtype=np.float32)
+        bloco /= np.maximum(np.linalg.norm(bloco, axis=1, keepdims=True), 1e-12)
+        scores = np.concatenate([melhores_scores, q @ bloco.T], axis=1)
+        linhas = np.concatenate([melhores_linhas, np.broadcast_to(
+            np.arange(inicio, inicio + len(textos)), (len(consultas), len(textos)))], axis=1)
+        topo = np.argsort(-scores, axis=1)[:, :k]
+        melhores_scores = np.take_along_axis(scores, topo, axis=1)
+        melhores_linhas = np.take_along_axis(linhas, topo, axis=1)
+
+    return [[ingest_pipeline.hash_texto(corpus.texto(int(r))) for r in linhas] for linhas in melhores_linhas]
+
+
+# --- BUILD + CONSULTAS ---
+def construir_indice(corpus, embedding, backend, pasta, com_lexico):
+    os.makedirs(pasta, exist_ok=True)
+    inicio = time.perf_counter()
+    store = memory_core.abrir_vector_store(pasta, embedding, backend)
+    for _, textos in iterar_lotes(corpus, BUILD_BATCH):
+        ids = [ingest_pipeline.hash_texto(t) for t in textos]
+        store.add_documents([Document(page_content=t, metadata={"source": "bench"}) for t in textos], ids=ids)
+    tempo_vetorial = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if com_lexico:
+        lexical = LexicalIndex(os.path.join(pasta, memory_core.LEXICAL_INDEX_NAME))
+        for _, textos in iterar_lotes(corpus, BUILD_BATCH):
+            lexical.adicionar([(ingest_pipeline.hash_texto(t), Document(page_content=t)) for t in textos])
+        lexical.salvar()
+    tempo_lexico = time.perf_counter() - inicio
+
+    embedding_provider.gravar_assinatura(pasta, memory_core.COLLECTION_NAME, embedding.assinatura)
+    with open(os.path.join(pasta, memory_core.VERSION_NAME), "w") as f:
+        f.write(str(time.time()))
+    del store
+    gc.collect()
+    return {
+        "build_vetorial_s": round(tempo_vetorial, 3),
+        "build_lexico_s": round(tempo_lexico, 3),
+        "indice_bytes": tamanho_pasta(pasta),
+        "pico_rss_mb_apos_build": pico_rss_mb(),
+    }
+
+
+def medir_consultas(retriever, consultas, origens, gabarito, k, modo):
+    for consulta in consultas[:WARMUP_QUERIES]:
+        retriever.buscar(consulta, k=k, modo=modo)
+
+    latencias, recall, acertos = [], [], 0
+    for consulta, origem, esperado in zip(consultas, origens, gabarito):
+        # Sem cache: mede o caminho completo (embed da pergunta + busca)
+        retriever.result_cache.clear()
+        retriever.query_cache.clear()
+        inicio = time.perf_counter()
+        docs = retriever.buscar(consulta, k=k, modo=modo)
+        latencias.append(time.perf_counter() - inicio)
+
+        ids = [doc.id or ingest_pipeline.hash_texto(doc.page_content) for doc in docs]
+        recall.append(len(set(ids) & set(esperado)) / max(len(esperado), 1))
+        acertos += origem in ids
+
+    return {
+        **percentis_ms(latencias),
+        f"recall@{k}": round(float(np.mean(recall)), 4),
+        f"acerto_origem@{k}": round(acertos / len(consultas), 4),
+    }
+
+
+def criar_embedder(nome, dim):
+    if nome == "stub":
+        return StubEmbeddings(dim)
+    # Sem cache em disco: o build mede o custo real de embedar
+    return embedding_provider.ArgusEmbeddings(disk_cache=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recuperação do Córtex (memory_core).")
+    parser.add_argument("--chunks", type=int, default=10000, help="Tamanho do corpus (1k a 1M).")
+    parser.add_argument("--fixture", help="Pasta com PDFs/TXTs reais no lugar do corpus sintético.")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--backends", default="chroma,mmap")
+    parser.add_argument("--modos", default="denso,hibrido,lexico")
+    parser.add_argument("--embedder", choices=["stub", "real"], default="stub")
+    parser.add_argument("--dim", type=int, default=STUB_DIM, help="Dimensão do embedder stub.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pasta", help="Onde montar os índices (padrão: pasta temporária).")
+    parser.add_argument("--manter", action="store_true", help="Não apaga os índices no final.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída.")
+    args = parser.parse_args()
+
+    backends = [b for b in args.backends.split(",") if b]
+    modos = [m for m in args.modos.split(",") if m]
+    embedding = criar_embedder(args.embedder, args.dim)
+
+    if args.fixture:
+        corpus = CorpusFixture(args.fixture, args.chunks if args.chunks > 0 else None)
+    else:
+        corpus = CorpusSintetico(args.chunks, seed=args.seed)
+    print(f"📏 [BENCH] Corpus com {len(corpus)} fragmentos | embedder '{embedding.assinatura}'")
+
+    rng = np.random.default_rng(args.seed)
+    alvos = rng.choice(len(corpus), size=min(args.consultas, len(corpus)), replace=False)
+    consultas = [corpus.consulta(int(i), rng) for i in alvos]
+    origens = [ingest_pipeline.hash_texto(corpus.texto(int(i))) for i in alvos]
+
+    inicio = time.perf_counter()
+    gabarito = gabarito_exato(corpus, embedding, consultas, args.k)
+    print(f"🎯 [BENCH] Gabarito exato calculado em {time.perf_counter() - inicio:.1f}s.")
+
+    raiz = args.pasta or tempfile.mkdtemp(prefix="argus_bench_")
+    resultados = []
+    try:
+        for backend in backends:
+            pasta = os.path.join(raiz, backend)
+            if os.path.exists(pasta):
+                shutil.rmtree(pasta)
+            print(f"🏗️ [BENCH] Indexando no backend '{backend}'...")
+            build = construir_indice(corpus, embedding, backend, pasta, com_lexico=any(m != "denso" for m in modos))
+            print(f"   build {build['build_vetorial_s'] + build['build_lexico_s']:.1f}s | "
+                  f"{build['indice_bytes'] / (1024 * 1024):.1f} MB em disco")
+
+            retriever = memory_core.MemoryRetriever(persist_directory=pasta, embedding=embedding, backend=backend)
+            for modo in modos:
+                medidas = medir_consultas(retriever, consultas, origens, gabarito, args.k, modo)
+                resultado = {"backend": backend, "modo": modo, **build, **medidas,
+                             "pico_rss_mb": pico_rss_mb()}
+                resultados.append(resultado)
+                print(f"   [{modo:>7}] p50 {medidas['p50_ms']:.2f}ms | p95 {medidas['p95_ms']:.2f}ms | "
+                      f"p99 {medidas['p99_ms']:.2f}ms | recall@{args.k} {medidas[f'recall@{args.k}']:.3f}")
+            del retriever
+            gc.collect()
+    finally:
+        if not args.manter and not args.pasta:
+            shutil.rmtree(raiz, ignore_errors=True)
+
+    relatorio = {
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "chunks": len(corpus),
+            "corpus": f"fixture:{args.fixture}" if args.fixture else "sintetico",
+            "consultas": len(consultas),
+            "k": args.k,
+            "embedder": embedding.assinatura,
+            "seed": args.seed,
+        },
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "mmap_dtype": MMAP_DTYPE,
+        },
+        "resultados": resultados,
+    }
+
+    saida = args.saida or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"💾 [BENCH] Relatório salvo em {saida}")
+
+
+if __name__ == "__main__":
+    main()
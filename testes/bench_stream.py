@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+# ==========================================
+# 📏 BENCHMARK DO 'ai_stream' (UM EMIT POR TOKEN x FRAMES AGRUPADOS)
+# ==========================================
+# Simula N respostas simultâneas no ritmo do LLM e mede, para cada modo:
+#   - frames enviados e tokens por frame
+#   - CPU do processo por token (json + trava do socket, como o emit do Socket.IO)
+#   - bytes no fio (cabeçalho do pacote Socket.IO incluído)
+# Não precisa de servidor: o "socket" é uma fila com trava que serializa em JSON.
+#
+# Exemplo:
+#   python testes/bench_stream.py --conversas 20 --tokens 1500 --tps 80
+
+
+class SocketFalso:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.bytes = 0
+
+    def emit(self, evento, dados, destino=None):
+        pacote = "42" + json.dumps([evento, dados], separators=(",", ":"))  # Mesmo formato do Socket.IO
+        with self.lock:
+            self.frames += 1
+            self.bytes += len(pacote.encode("utf-8"))
+
+
+def uma_resposta(enviar, fechar, tokens, intervalo):
+    for i in range(tokens):
+        enviar(f"tok{i % 97} ")
+        time.sleep(intervalo)
+    fechar()
+
+
+def rodar(modo, args):
+    from brain import stream_batcher
+    socket = SocketFalso()
+    batcher = stream_batcher.StreamBatcher(socket.emit, janela_s=args.janela_ms / 1000, max_bytes=args.max_bytes)
+    threads = []
+    for i in range(args.conversas):
+        if modo == "por_token":
+            enviar = lambda t, i=i: socket.emit('ai_stream', {'chunk': t, 'job': f"chat-{i}"}, f"sid-{i}")
+            fechar = lambda i=i: socket.emit('ai_stream_end', {'job': f"chat-{i}"}, f"sid-{i}")
+        else:
+            canal = batcher.abrir(f"sid-{i}", f"chat-{i}", "bench")
+            enviar, fechar = canal.enviar, canal.fechar
+        threads.append(threading.Thread(target=uma_resposta, args=(enviar, fechar, args.tokens, 1 / args.tps)))
+
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cpu, duracao = time.process_time() - cpu0, time.perf_counter() - t0
+    total = args.conversas * args.tokens
+    return {
+        "frames": socket.frames,
+        "tokens_por_frame": round(total / socket.frames, 2),
+        "bytes": socket.bytes,
+        "cpu_us_por_token": round(cpu / total * 1e6, 2),
+        "duracao_s": round(duracao, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do agrupador de frames do ai_stream.")
+    parser.add_argument("--conversas", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=1000, help="Tokens por resposta")
+    parser.add_argument("--tps", type=float, default=80, help="Tokens por segundo de cada resposta")
+    parser.add_argument("--janela-ms", type=int, default=40)
+    parser.add_argument("--max-bytes", type=int, default=512)
+    args = parser.parse_args()
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    relatorio = {"config": vars(args)}
+    for modo in ("por_token", "agrupado"):
+        relatorio[modo] = rodar(modo, args)
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,24 @@
 import os
+import sys
 import time
 from langchain_community.document_loaders import PyMuPDFLoader, TextLoader 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
 import shutil
 
+# Permite rodar direto (python testes/trainer.py) importando os módulos da raiz
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from brain import embedding_provider
+
 # --- CONFIGURAÇÃO ---
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
 KNOWLEDGE_DIR = "knowledge_base"
 DB_DIR = "chroma_db_local"
+# Coleções treinadas antes da assinatura usaram o Ollama (nomic-embed-text)
+LEGACY_SIGNATURE = "ollama:nomic-embed-text"
 
-# Configura Embeddings
+# Configura Embeddings (provedor único do Argus: ARGUS_EMBEDDING_BACKEND)
 #embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=API_KEY)
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
+embeddings = embedding_provider.get_embeddings()
 
 def carregar_documentos(pasta_brain):
     """Lê todos os PDFs e TXTs de uma pasta específica"""
@@ -58,12 +63,23 @@ def treinar_cerebro(brain_id):
 
     # 3. Salva no Banco Vetorial (COM RATE LIMITING MANUAL)
     
+    # Coleção que já tem dados continua com o modelo que a gerou (não mistura espaços
+    # vetoriais nem apaga o treino antigo); coleção nova usa o provedor atual
+    assinatura = embedding_provider.ler_assinatura(DB_DIR, brain_id, padrao=LEGACY_SIGNATURE)
+    embeddings_colecao = embedding_provider.get_embeddings_da_assinatura(assinatura)
+
     # Inicializa a conexão com o banco (sem adicionar dados ainda)
     vectorstore = Chroma(
         persist_directory=DB_DIR,
-        embedding_function=embeddings,
+        embedding_function=embeddings_colecao,
         collection_name=brain_id
     )
+    if vectorstore._collection.count() == 0 and embeddings_colecao is not embeddings:
+        vectorstore = Chroma(persist_directory=DB_DIR, embedding_function=embeddings, collection_name=brain_id)
+        embeddings_colecao = embeddings
+    elif embeddings_colecao is not embeddings:
+        print(f"  ℹ️ Coleção gerada com '{assinatura}': continua com esse modelo.")
+    embedding_provider.gravar_assinatura(DB_DIR, brain_id, embeddings_colecao.assinatura)
 
     # Configuração do Lote
     batch_size = 5  # Processa apenas 5 pedaços por vez